@@ -0,0 +1,42 @@
+"""lesson frontiers
+
+Revision ID: 20261018_0002
+Revises: 20241112_0001
+Create Date: 2026-10-18 00:00:00
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "20261018_0002"
+down_revision: Union[str, None] = "20241112_0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+  op.create_table(
+      "lesson_frontiers",
+      sa.Column("id", postgresql.UUID(as_uuid=True), server_default=sa.text("gen_random_uuid()"), nullable=False),
+      sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+      sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+      sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+      sa.Column("learning_path_id", postgresql.UUID(as_uuid=True), nullable=False),
+      sa.Column("module_id", postgresql.UUID(as_uuid=True), nullable=True),
+      sa.Column("lesson_id", postgresql.UUID(as_uuid=True), nullable=True),
+      sa.PrimaryKeyConstraint("id", name=op.f("pk_lesson_frontiers")),
+      sa.ForeignKeyConstraint(["user_id"], ["users.id"], name=op.f("fk_lesson_frontiers_user_id_users"), ondelete="CASCADE"),
+      sa.ForeignKeyConstraint(["learning_path_id"], ["learning_paths.id"], name=op.f("fk_lesson_frontiers_learning_path_id_learning_paths"), ondelete="CASCADE"),
+      sa.ForeignKeyConstraint(["module_id"], ["modules.id"], name=op.f("fk_lesson_frontiers_module_id_modules"), ondelete="CASCADE"),
+      sa.ForeignKeyConstraint(["lesson_id"], ["lessons.id"], name=op.f("fk_lesson_frontiers_lesson_id_lessons"), ondelete="CASCADE"),
+      sa.UniqueConstraint("user_id", "learning_path_id", name=op.f("uq_lesson_frontier_user_path")),
+  )
+
+
+def downgrade() -> None:
+  op.drop_table("lesson_frontiers")
@@ -0,0 +1,50 @@
+"""prune redundant locked progress rows
+
+Revision ID: 20261018_0003
+Revises: 20261018_0002
+Create Date: 2026-10-18 00:00:00
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20261018_0003"
+down_revision: Union[str, None] = "20261018_0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10_000
+
+
+def upgrade() -> None:
+  # A missing user_progress row is read as "locked", so rows that are locked and
+  # carry no history are redundant. Delete them in small batches, each committed
+  # on its own outside the migration transaction, so row locks and WAL are
+  # released batch by batch instead of being held until the migration ends.
+  statement = sa.text(
+      """
+      DELETE FROM user_progress
+      WHERE id IN (
+          SELECT id FROM user_progress
+          WHERE status = 'locked'
+            AND xp_earned = 0
+            AND last_attempt_at IS NULL
+          LIMIT :batch_size
+      )
+      """
+  )
+  with op.get_context().autocommit_block():
+    connection = op.get_bind()
+    while True:
+      result = connection.execute(statement, {"batch_size": BATCH_SIZE})
+      if result.rowcount < BATCH_SIZE:
+        break
+
+
+def downgrade() -> None:
+  # Locked rows are implicit; nothing needs to be recreated.
+  pass
@@ -0,0 +1,37 @@
+"""curriculum versions
+
+Revision ID: 20261018_0004
+Revises: 20261018_0003
+Create Date: 2026-10-18 00:00:00
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "20261018_0004"
+down_revision: Union[str, None] = "20261018_0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+  op.create_table(
+      "curriculum_versions",
+      sa.Column("id", postgresql.UUID(as_uuid=True), server_default=sa.text("gen_random_uuid()"), nullable=False),
+      sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+      sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+      sa.Column("key", sa.String(length=64), nullable=False),
+      sa.Column("version", sa.Integer(), nullable=False, server_default="0"),
+      sa.PrimaryKeyConstraint("id", name=op.f("pk_curriculum_versions")),
+      sa.UniqueConstraint("key", name=op.f("uq_curriculum_versions_key")),
+  )
+  op.execute("INSERT INTO curriculum_versions (key, version) VALUES ('curriculum', 1)")
+
+
+def downgrade() -> None:
+  op.drop_table("curriculum_versions")
@@ -0,0 +1,48 @@
+"""user counters
+
+Revision ID: 20261018_0005
+Revises: 20261018_0004
+Create Date: 2026-10-18 00:00:00
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "20261018_0005"
+down_revision: Union[str, None] = "20261018_0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+  op.create_table(
+      "user_counters",
+      sa.Column("id", postgresql.UUID(as_uuid=True), server_default=sa.text("gen_random_uuid()"), nullable=False),
+      sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+      sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+      sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+      sa.Column("key", sa.String(length=64), nullable=False),
+      sa.Column("value", sa.Integer(), nullable=False, server_default="0"),
+      sa.PrimaryKeyConstraint("id", name=op.f("pk_user_counters")),
+      sa.ForeignKeyConstraint(["user_id"], ["users.id"], name=op.f("fk_user_counters_user_id_users"), ondelete="CASCADE"),
+      sa.UniqueConstraint("user_id", "key", name=op.f("uq_user_counter_key")),
+  )
+  # seed the completed-lesson counters from existing progress
+  op.execute(
+      """
+      INSERT INTO user_counters (user_id, key, value)
+      SELECT user_id, 'lessons_completed:' || learning_path_id::text, count(*)
+      FROM user_progress
+      WHERE status = 'completed'
+      GROUP BY user_id, learning_path_id
+      """
+  )
+
+
+def downgrade() -> None:
+  op.drop_table("user_counters")
@@ -0,0 +1,36 @@
+"""attempt status
+
+Revision ID: 20261018_0006
+Revises: 20261018_0005
+Create Date: 2026-10-18 00:00:00
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20261018_0006"
+down_revision: Union[str, None] = "20261018_0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+  op.add_column("lesson_attempts", sa.Column("status", sa.String(length=16), nullable=False, server_default="completed"))
+  op.add_column("lesson_attempts", sa.Column("outcome", sa.JSON(), nullable=False, server_default=sa.text("'{}'::jsonb")))
+  # background workers re-queue pending attempts on startup
+  op.create_index(
+      op.f("ix_lesson_attempts_pending"),
+      "lesson_attempts",
+      ["created_at"],
+      postgresql_where=sa.text("status = 'pending'"),
+  )
+
+
+def downgrade() -> None:
+  op.drop_index(op.f("ix_lesson_attempts_pending"), table_name="lesson_attempts")
+  op.drop_column("lesson_attempts", "outcome")
+  op.drop_column("lesson_attempts", "status")
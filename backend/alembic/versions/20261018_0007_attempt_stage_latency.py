@@ -0,0 +1,37 @@
+"""attempt stage latency
+
+Revision ID: 20261018_0007
+Revises: 20261018_0006
+Create Date: 2026-10-18 00:00:00
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20261018_0007"
+down_revision: Union[str, None] = "20261018_0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+  op.add_column(
+      "lesson_attempts",
+      sa.Column("stage_latency_ms", sa.JSON(), nullable=False, server_default=sa.text("'{}'::jsonb")),
+  )
+  # latency percentiles scan a recent created_at window
+  op.create_index(
+      op.f("ix_lesson_attempts_created_brin"),
+      "lesson_attempts",
+      ["created_at"],
+      postgresql_using="brin",
+  )
+
+
+def downgrade() -> None:
+  op.drop_index(op.f("ix_lesson_attempts_created_brin"), table_name="lesson_attempts")
+  op.drop_column("lesson_attempts", "stage_latency_ms")
@@ -0,0 +1,47 @@
+"""math attempts
+
+Revision ID: 20261018_0008
+Revises: 20261018_0007
+Create Date: 2026-10-18 00:00:00
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "20261018_0008"
+down_revision: Union[str, None] = "20261018_0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+  op.create_table(
+      "math_attempts",
+      sa.Column("id", postgresql.UUID(as_uuid=True), server_default=sa.text("gen_random_uuid()"), nullable=False),
+      sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+      sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+      sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+      sa.Column("activity_id", postgresql.UUID(as_uuid=True), nullable=False),
+      sa.Column("answers", sa.JSON(), nullable=False, server_default=sa.text("'[]'::jsonb")),
+      sa.Column("correct_count", sa.Integer(), nullable=False, server_default="0"),
+      sa.Column("total_questions", sa.Integer(), nullable=False, server_default="0"),
+      sa.Column("xp_awarded", sa.Integer(), nullable=False, server_default="0"),
+      sa.PrimaryKeyConstraint("id", name=op.f("pk_math_attempts")),
+      sa.ForeignKeyConstraint(["user_id"], ["users.id"], name=op.f("fk_math_attempts_user_id_users"), ondelete="CASCADE"),
+      sa.ForeignKeyConstraint(
+          ["activity_id"],
+          ["skill_activities.id"],
+          name=op.f("fk_math_attempts_activity_id_skill_activities"),
+          ondelete="CASCADE",
+      ),
+      sa.UniqueConstraint("user_id", "activity_id", "created_at", name=op.f("uq_math_attempt_per_timestamp")),
+  )
+
+
+def downgrade() -> None:
+  op.drop_table("math_attempts")
@@ -0,0 +1,34 @@
+"""attempt idempotency key
+
+Revision ID: 20261018_0009
+Revises: 20261018_0008
+Create Date: 2026-10-18 00:00:00
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20261018_0009"
+down_revision: Union[str, None] = "20261018_0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+  op.add_column("lesson_attempts", sa.Column("idempotency_key", sa.String(length=64), nullable=True))
+  op.create_index(
+      op.f("ix_lesson_attempts_idempotency"),
+      "lesson_attempts",
+      ["user_id", "idempotency_key"],
+      unique=True,
+      postgresql_where=sa.text("idempotency_key IS NOT NULL"),
+  )
+
+
+def downgrade() -> None:
+  op.drop_index(op.f("ix_lesson_attempts_idempotency"), table_name="lesson_attempts")
+  op.drop_column("lesson_attempts", "idempotency_key")
@@ -0,0 +1,38 @@
+"""xp thresholds
+
+Revision ID: 20261018_0010
+Revises: 20261018_0009
+Create Date: 2026-10-18 00:00:00
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "20261018_0010"
+down_revision: Union[str, None] = "20261018_0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+  # no row means the built-in thresholds; the first admin change inserts it
+  op.create_table(
+      "xp_thresholds",
+      sa.Column("id", postgresql.UUID(as_uuid=True), server_default=sa.text("gen_random_uuid()"), nullable=False),
+      sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+      sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+      sa.Column("key", sa.String(length=64), nullable=False),
+      sa.Column("version", sa.Integer(), nullable=False, server_default="0"),
+      sa.Column("thresholds", postgresql.ARRAY(sa.Integer()), nullable=False),
+      sa.PrimaryKeyConstraint("id", name=op.f("pk_xp_thresholds")),
+      sa.UniqueConstraint("key", name=op.f("uq_xp_thresholds_key")),
+  )
+
+
+def downgrade() -> None:
+  op.drop_table("xp_thresholds")
@@ -0,0 +1,27 @@
+"""attempt claims
+
+Revision ID: 20261018_0011
+Revises: 20261018_0010
+Create Date: 2026-10-18 00:00:00
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20261018_0011"
+down_revision: Union[str, None] = "20261018_0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+  # set by the worker evaluating a pending attempt; NULL or expired means anyone may claim it
+  op.add_column("lesson_attempts", sa.Column("claimed_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+  op.drop_column("lesson_attempts", "claimed_at")
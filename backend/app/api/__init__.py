@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.routes import admin, auth, health, lessons, math, progress, realtime, sessions
+from app.api.routes import admin, auth, health, leaderboards, lessons, math, progress, realtime, sessions, speech, sync
 
 api_router = APIRouter()
 api_router.include_router(health.router, prefix="/health", tags=["health"])
@@ -9,6 +9,9 @@ api_router.include_router(sessions.router, prefix="/sessions", tags=["sessions"]
 api_router.include_router(lessons.router, prefix="/lessons", tags=["lessons"])
 api_router.include_router(progress.router, prefix="/progress", tags=["progress"])
 api_router.include_router(math.router, prefix="/math", tags=["math"])
+api_router.include_router(speech.router, prefix="/speech", tags=["speech"])
+api_router.include_router(sync.router, prefix="/sync", tags=["sync"])
+api_router.include_router(leaderboards.router, prefix="/leaderboards", tags=["leaderboards"])
 api_router.include_router(realtime.router, prefix="/realtime", tags=["realtime"])
 api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
 
@@ -6,16 +6,36 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
 from app.db.session import get_session
 from app.services import (
+    AchievementEngine,
+    AttemptService,
+    AudioCache,
+    CurriculumCache,
+    EvaluationCache,
+    FrontierService,
     GamificationEngine,
+    LeaderboardService,
     LearningService,
     MathService,
     MuxlisaClient,
+    OfflineSyncService,
     OpenAIAdapter,
+    SpeechPrerenderService,
+    SpeechService,
+    achievement_engine,
+    attempt_service,
+    audio_cache,
+    curriculum_cache,
+    evaluation_cache,
+    frontier_service,
     gamification_engine,
+    leaderboard_service,
     learning_service,
     math_service,
     muxlisa_client,
+    offline_sync_service,
     openai_adapter,
+    speech_prerender_service,
+    speech_service,
 )
 
 
@@ -24,11 +44,46 @@ async def get_db_session() -> AsyncSession:
     yield session
 
 
+@lru_cache
+def get_achievement_engine() -> AchievementEngine:
+  return achievement_engine
+
+
+@lru_cache
+def get_attempt_service() -> AttemptService:
+  return attempt_service
+
+
+@lru_cache
+def get_audio_cache() -> AudioCache:
+  return audio_cache
+
+
+@lru_cache
+def get_curriculum_cache() -> CurriculumCache:
+  return curriculum_cache
+
+
+@lru_cache
+def get_evaluation_cache() -> EvaluationCache:
+  return evaluation_cache
+
+
+@lru_cache
+def get_frontier_service() -> FrontierService:
+  return frontier_service
+
+
 @lru_cache
 def get_gamification_engine() -> GamificationEngine:
   return gamification_engine
 
 
+@lru_cache
+def get_leaderboard_service() -> LeaderboardService:
+  return leaderboard_service
+
+
 @lru_cache
 def get_learning_service() -> LearningService:
   return learning_service
@@ -44,11 +99,26 @@ def get_muxlisa_client() -> MuxlisaClient:
   return muxlisa_client
 
 
+@lru_cache
+def get_offline_sync_service() -> OfflineSyncService:
+  return offline_sync_service
+
+
 @lru_cache
 def get_openai_adapter() -> OpenAIAdapter:
   return openai_adapter
 
 
+@lru_cache
+def get_speech_prerender_service() -> SpeechPrerenderService:
+  return speech_prerender_service
+
+
+@lru_cache
+def get_speech_service() -> SpeechService:
+  return speech_service
+
+
 def require_admin_token(x_admin_token: str = Header(..., alias="X-Admin-Token")) -> None:
   if not settings.admin_api_token or x_admin_token != settings.admin_api_token:
     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin token invalid.")
@@ -1,5 +1,15 @@
-from . import admin, auth, health, lessons, math, progress, realtime, sessions
-
-__all__ = ["admin", "auth", "health", "lessons", "math", "progress", "realtime", "sessions"]
-
+from . import admin, auth, health, leaderboards, lessons, math, progress, realtime, sessions, speech, sync
 
+__all__ = [
+    "admin",
+    "auth",
+    "health",
+    "leaderboards",
+    "lessons",
+    "math",
+    "progress",
+    "realtime",
+    "sessions",
+    "speech",
+    "sync",
+]
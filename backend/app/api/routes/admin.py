@@ -1,14 +1,46 @@
 from __future__ import annotations
 
+from datetime import datetime, timedelta, timezone
 from typing import Any
+from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
 from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_db_session, require_admin_token
+from app.api.deps import (
+    get_attempt_service,
+    get_audio_cache,
+    get_curriculum_cache,
+    get_db_session,
+    get_evaluation_cache,
+    get_frontier_service,
+    get_gamification_engine,
+    get_muxlisa_client,
+    get_openai_adapter,
+    get_speech_prerender_service,
+    require_admin_token,
+)
+from app.core.metrics import attempt_stage_latency
 from app.models import LearningPath, Lesson, LessonPrompt, Module
-from app.schemas import APIMessage, AdminContentPayload
+from app.schemas import (
+    APIMessage,
+    AdminContentPayload,
+    AttemptLatencyReport,
+    LevelRecomputeStatus,
+    SpeechPrerenderStatus,
+    XPThresholdsPayload,
+)
+from app.services.attempt_service import AttemptService
+from app.services.audio_cache import AudioCache
+from app.services.curriculum_service import CurriculumCache
+from app.services.evaluation_cache import EvaluationCache
+from app.services.frontier_service import FrontierService
+from app.services.gamification_service import GamificationEngine
+from app.services.muxlisa_service import MuxlisaClient
+from app.services.openai_service import OpenAIAdapter
+from app.services.prerender_service import SpeechPrerenderService
 
 router = APIRouter(dependencies=[Depends(require_admin_token)])
 
@@ -17,6 +49,10 @@ router = APIRouter(dependencies=[Depends(require_admin_token)])
 async def upsert_content(
     payload: AdminContentPayload,
     session: AsyncSession = Depends(get_db_session),
+    frontier: FrontierService = Depends(get_frontier_service),
+    curriculum: CurriculumCache = Depends(get_curriculum_cache),
+    evaluations: EvaluationCache = Depends(get_evaluation_cache),
+    prerender: SpeechPrerenderService = Depends(get_speech_prerender_service),
 ) -> APIMessage:
   learning_path = await _get_or_create_learning_path(session, payload.learning_path_key)
   module = await _get_or_create_module(session, learning_path, payload.module_key)
@@ -24,13 +60,122 @@ async def upsert_content(
   if payload.overwrite:
     await session.execute(delete(Lesson).where(Lesson.module_id == module.id))
 
+  synced: list[Lesson] = []
   for index, lesson_payload in enumerate(payload.lessons):
     lesson = await _upsert_lesson(session, module, lesson_payload, order_index=index)
     await _sync_prompts(session, lesson, lesson_payload.get("prompts", []))
+    synced.append(lesson)
 
+  # lessons may have been added, removed or reordered; frontiers are rebuilt lazily
+  await frontier.invalidate_path(session, learning_path.id)
+  await curriculum.bump_version(session)
+  await session.commit()
+  # swap in the new graph for this worker; other workers pick up the bumped version
+  await curriculum.rebuild(session)
+  # letters, example words or prompts may have changed, so earlier evaluations no longer apply
+  for lesson in synced:
+    await evaluations.invalidate_lesson(lesson.id)
+  # titles or example words may have changed; only lessons whose text hash moved are rendered, but
+  # every lesson is scanned, since edited ones may sort before an interrupted run's checkpoint
+  prerender.schedule(resume=False)
   return APIMessage(message="Content synced successfully.")
 
 
+@router.get("/curriculum/cache")
+async def curriculum_cache_metrics(
+    curriculum: CurriculumCache = Depends(get_curriculum_cache),
+) -> dict[str, Any]:
+  return curriculum.metrics()
+
+
+@router.get("/evaluation-cache")
+async def evaluation_cache_metrics(
+    evaluations: EvaluationCache = Depends(get_evaluation_cache),
+) -> dict[str, Any]:
+  return evaluations.metrics()
+
+
+@router.get("/tts-cache")
+async def tts_cache_metrics(
+    cache: AudioCache = Depends(get_audio_cache),
+) -> dict[str, Any]:
+  return cache.metrics()
+
+
+@router.get("/speech/prerender", response_model=SpeechPrerenderStatus)
+async def speech_prerender_status(
+    prerender: SpeechPrerenderService = Depends(get_speech_prerender_service),
+) -> SpeechPrerenderStatus:
+  return prerender.status
+
+
+@router.post("/speech/prerender", response_model=APIMessage, status_code=status.HTTP_202_ACCEPTED)
+async def start_speech_prerender(
+    resume: bool = Query(True, description="continue an interrupted run from its checkpoint"),
+    prerender: SpeechPrerenderService = Depends(get_speech_prerender_service),
+) -> APIMessage:
+  prerender.schedule(resume=resume)
+  return APIMessage(message="Speech pre-render scheduled.")
+
+
+@router.get("/upstream")
+async def upstream_metrics(
+    openai: OpenAIAdapter = Depends(get_openai_adapter),
+    muxlisa: MuxlisaClient = Depends(get_muxlisa_client),
+) -> dict[str, Any]:
+  return {"openai": openai.metrics(), "muxlisa": muxlisa.metrics()}
+
+
+@router.get("/attempts/latency", response_model=AttemptLatencyReport)
+async def attempt_latency(
+    window_minutes: int = Query(60, ge=1, le=7 * 24 * 60),
+    session: AsyncSession = Depends(get_db_session),
+    attempts: AttemptService = Depends(get_attempt_service),
+) -> AttemptLatencyReport:
+  since = datetime.now(timezone.utc) - timedelta(minutes=window_minutes)
+  return await attempts.latency_report(session, since=since)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> str:
+  """Attempt stage latency histograms of this process in the Prometheus text format."""
+  return attempt_stage_latency.render()
+
+
+@router.delete("/lessons/{lesson_id}/evaluation-cache", response_model=APIMessage)
+async def invalidate_lesson_evaluations(
+    lesson_id: UUID,
+    evaluations: EvaluationCache = Depends(get_evaluation_cache),
+) -> APIMessage:
+  removed = await evaluations.invalidate_lesson(lesson_id)
+  return APIMessage(message=f"Dropped {removed} cached evaluations.")
+
+
+@router.get("/xp-thresholds", response_model=LevelRecomputeStatus)
+async def xp_thresholds(
+    session: AsyncSession = Depends(get_db_session),
+    gamification: GamificationEngine = Depends(get_gamification_engine),
+) -> LevelRecomputeStatus:
+  await gamification.load_thresholds(session)
+  return gamification.recompute_status
+
+
+@router.put("/xp-thresholds", response_model=LevelRecomputeStatus, status_code=status.HTTP_202_ACCEPTED)
+async def update_xp_thresholds(
+    payload: XPThresholdsPayload,
+    session: AsyncSession = Depends(get_db_session),
+    gamification: GamificationEngine = Depends(get_gamification_engine),
+) -> LevelRecomputeStatus:
+  """Store new thresholds for every worker and recompute stored levels in the background."""
+  try:
+    await gamification.store_thresholds(session, payload.thresholds)
+  except ValueError as exc:
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+  await session.commit()
+  gamification.schedule_recompute()
+  return gamification.recompute_status
+
+
 async def _get_or_create_learning_path(session: AsyncSession, key: str) -> LearningPath:
   result = await session.execute(select(LearningPath).where(LearningPath.key == key))
   learning_path = result.scalar_one_or_none()
@@ -95,6 +240,9 @@ async def _upsert_lesson(
     session.add(lesson)
     await session.flush()
   else:
+    # rendered speech stays; the pre-render job compares its text hash
+    if "speech" in (lesson.media_assets or {}):
+      fields["media_assets"] = {"speech": lesson.media_assets["speech"], **fields["media_assets"]}
     for attr, value in fields.items():
       setattr(lesson, attr, value)
   return lesson
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_curriculum_cache, get_db_session, get_leaderboard_service
+from app.core.age import AGE_BRACKETS, age_bracket
+from app.models import User
+from app.schemas import LeaderboardEntry, LeaderboardRank, LeaderboardResponse, UserRankingsResponse
+from app.services.curriculum_service import CurriculumCache
+from app.services.leaderboard_service import GLOBAL_BOARD, LeaderboardService, age_board, path_board
+
+router = APIRouter()
+
+
+@router.get("/global", response_model=LeaderboardResponse)
+async def global_leaderboard(
+    limit: int = Query(10, ge=1, le=100),
+    session: AsyncSession = Depends(get_db_session),
+    leaderboards: LeaderboardService = Depends(get_leaderboard_service),
+) -> LeaderboardResponse:
+  return await _board_response(session, leaderboards, GLOBAL_BOARD, GLOBAL_BOARD, limit)
+
+
+@router.get("/paths/{path_key}", response_model=LeaderboardResponse)
+async def path_leaderboard(
+    path_key: str,
+    limit: int = Query(10, ge=1, le=100),
+    session: AsyncSession = Depends(get_db_session),
+    leaderboards: LeaderboardService = Depends(get_leaderboard_service),
+    curriculum: CurriculumCache = Depends(get_curriculum_cache),
+) -> LeaderboardResponse:
+  learning_path_id = (await curriculum.get(session)).path_id(path_key)
+  if learning_path_id is None:
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Learning path not found.")
+  return await _board_response(session, leaderboards, path_board(learning_path_id), f"path:{path_key}", limit)
+
+
+@router.get("/ages/{bracket}", response_model=LeaderboardResponse)
+async def age_leaderboard(
+    bracket: str,
+    limit: int = Query(10, ge=1, le=100),
+    session: AsyncSession = Depends(get_db_session),
+    leaderboards: LeaderboardService = Depends(get_leaderboard_service),
+) -> LeaderboardResponse:
+  if bracket not in AGE_BRACKETS:
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Age bracket must be one of {AGE_BRACKETS}.")
+  return await _board_response(session, leaderboards, age_board(bracket), age_board(bracket), limit)
+
+
+@router.get("/users/{user_id}", response_model=UserRankingsResponse)
+async def user_rankings(
+    user_id: UUID,
+    session: AsyncSession = Depends(get_db_session),
+    leaderboards: LeaderboardService = Depends(get_leaderboard_service),
+    curriculum: CurriculumCache = Depends(get_curriculum_cache),
+) -> UserRankingsResponse:
+  user = await session.get(User, user_id)
+  if user is None:
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
+
+  boards = [(GLOBAL_BOARD, GLOBAL_BOARD)]
+  bracket = age_bracket(user.age)
+  if bracket is not None:
+    boards.append((age_board(bracket), age_board(bracket)))
+  graph = await curriculum.get(session)
+  boards.extend((path_board(path_id), f"path:{key}") for key, path_id in graph.path_ids.items())
+
+  rankings: list[LeaderboardRank] = []
+  for board, label in boards:
+    found = await leaderboards.rank(session, board, user_id)
+    if found is not None:
+      rank, xp, total = found
+      rankings.append(LeaderboardRank(board=label, rank=rank, xp=xp, total=total))
+  return UserRankingsResponse(user_id=user_id, rankings=rankings)
+
+
+async def _board_response(
+    session: AsyncSession,
+    leaderboards: LeaderboardService,
+    board: str,
+    label: str,
+    limit: int,
+) -> LeaderboardResponse:
+  total, entries = await leaderboards.top(session, board, limit)
+  # names come from a primary-key lookup of the listed users only
+  names = {
+      row.id: row
+      for row in (
+          await session.execute(
+              select(User.id, User.first_name, User.nickname).where(User.id.in_([user_id for user_id, _ in entries])),
+          )
+      ).all()
+  }
+  return LeaderboardResponse(
+      board=label,
+      total=total,
+      entries=[
+          LeaderboardEntry(
+              rank=position,
+              user_id=user_id,
+              xp=xp,
+              first_name=names[user_id].first_name if user_id in names else None,
+              nickname=names[user_id].nickname if user_id in names else None,
+          )
+          for position, (user_id, xp) in enumerate(entries, start=1)
+      ],
+  )
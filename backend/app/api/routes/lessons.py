@@ -1,35 +1,58 @@
 from __future__ import annotations
 
+from collections.abc import AsyncIterator
+from typing import Literal
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
-from app.api.deps import get_db_session, get_gamification_engine, get_muxlisa_client, get_openai_adapter
+from app.api.deps import get_attempt_service, get_db_session, get_muxlisa_client
+from app.core.config import settings
+from app.core.metrics import StageTimer
 from app.models import Lesson, LessonAttempt, User
-from app.schemas import LessonAttemptRequest, LessonAttemptResponse, LessonAttemptFeedback
-from app.services.gamification_service import GamificationEngine
+from app.schemas import AttemptStatusResponse, LessonAttemptRequest, LessonAttemptResponse
+from app.services.attempt_service import AttemptService
+from app.services.audio_probe import AudioTooLong, DurationGuard, UnsupportedAudio
 from app.services.muxlisa_service import MuxlisaClient
-from app.services.openai_service import OpenAIAdapter
 
 router = APIRouter()
 
 
-@router.post("/{lesson_id}/attempt", response_model=LessonAttemptResponse)
+@router.post(
+    "/{lesson_id}/attempt",
+    response_model=LessonAttemptResponse | AttemptStatusResponse,
+    responses={status.HTTP_202_ACCEPTED: {"model": AttemptStatusResponse}},
+)
 async def submit_attempt(
     lesson_id: UUID,
     request: LessonAttemptRequest,
+    response: Response,
     session: AsyncSession = Depends(get_db_session),
-    gamification: GamificationEngine = Depends(get_gamification_engine),
+    attempts: AttemptService = Depends(get_attempt_service),
     muxlisa: MuxlisaClient = Depends(get_muxlisa_client),
-    openai_adapter: OpenAIAdapter = Depends(get_openai_adapter),
-) -> LessonAttemptResponse:
-  user = await session.get(User, request.user_id)
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=64),
+) -> LessonAttemptResponse | AttemptStatusResponse:
+  """Evaluate an attempt and apply its rewards.
+
+  A retry carrying the same ``Idempotency-Key`` gets the stored result back
+  without another evaluation; with ``force_reprocess`` the stored attempt is
+  evaluated again and only the XP difference is credited.
+  """
+  timer = StageTimer()
+  with timer.stage("lookup"):
+    user = await session.get(User, request.user_id)
+    lesson = await session.get(Lesson, lesson_id, options=[selectinload(Lesson.module)])
   if user is None:
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
-  lesson = await session.get(Lesson, lesson_id)
   if lesson is None:
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lesson not found.")
+  previous = await _previous_attempt(session, attempts, timer, user=user, lesson=lesson, idempotency_key=idempotency_key)
+  if previous is not None:
+    if request.force_reprocess:
+      return await attempts.reprocess(session, previous, user=user, lesson=lesson, timer=timer)
+    return _respond(response, attempts.replay(previous))
 
   transcript_info = {"transcript": request.transcript_hint}
   # Eslatma: audio_base64 va audio_url yangi API da ishlamaydi
@@ -40,51 +63,185 @@ async def submit_attempt(
   else:
     transcript = transcript_info.get("transcript") or ""
 
-  evaluation = await openai_adapter.evaluate_pronunciation(
+  return await _complete_attempt(
+      session,
+      attempts,
+      response,
+      user=user,
+      lesson=lesson,
       transcript=transcript,
-      target_letter=lesson.target_letter,
-      example_words=lesson.example_words or [],
-      user_age=user.age,
+      audio_url=request.audio_url,
+      mode=request.mode,
+      timer=timer,
+      idempotency_key=idempotency_key,
   )
-  score = evaluation.get("score")
-  is_correct = bool(score is not None and score >= 0.75)
 
-  attempt = LessonAttempt(
-      user_id=user.id,
-      lesson_id=lesson.id,
-      audio_url=request.audio_url,
-      transcript=transcript,
-      evaluation=evaluation,
-      feedback=evaluation.get("encouragement"),
-      score=score,
-      is_correct=is_correct,
+
+@router.post(
+    "/{lesson_id}/attempt/audio",
+    response_model=LessonAttemptResponse | AttemptStatusResponse,
+    responses={
+        status.HTTP_202_ACCEPTED: {"model": AttemptStatusResponse},
+        status.HTTP_413_REQUEST_ENTITY_TOO_LARGE: {"description": "Audio longer than max_audio_duration_seconds."},
+        status.HTTP_415_UNSUPPORTED_MEDIA_TYPE: {"description": "Body is not audio/wav or audio/webm."},
+    },
+)
+async def submit_audio_attempt(
+    lesson_id: UUID,
+    request: Request,
+    response: Response,
+    user_id: UUID = Query(...),
+    mode: Literal["sync", "async"] = Query("sync"),
+    force_reprocess: bool = Query(False),
+    session: AsyncSession = Depends(get_db_session),
+    attempts: AttemptService = Depends(get_attempt_service),
+    muxlisa: MuxlisaClient = Depends(get_muxlisa_client),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=64),
+) -> LessonAttemptResponse | AttemptStatusResponse:
+  """Attempt with the recording as the raw request body (``audio/wav`` or ``audio/webm``).
+
+  The body is streamed to speech-to-text as it arrives and its duration is
+  checked from the container headers on the way, so an upload is never held
+  in memory and an over-long one is cut off early. A retry with a known
+  ``Idempotency-Key`` is answered before the body is read.
+  """
+  try:
+    guard = DurationGuard.for_content_type(request.headers.get("content-type", ""), settings.max_audio_duration_seconds)
+  except UnsupportedAudio as exc:
+    raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(exc)) from exc
+  declared_size = request.headers.get("content-length")
+  if declared_size and declared_size.isdigit() and int(declared_size) > settings.max_audio_upload_bytes:
+    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Audio upload is too large.")
+
+  timer = StageTimer()
+  with timer.stage("lookup"):
+    user = await session.get(User, user_id)
+    lesson = await session.get(Lesson, lesson_id, options=[selectinload(Lesson.module)])
+  if user is None:
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
+  if lesson is None:
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lesson not found.")
+  previous = await _previous_attempt(session, attempts, timer, user=user, lesson=lesson, idempotency_key=idempotency_key)
+  if previous is not None:
+    if force_reprocess:
+      # the stored transcript is evaluated again; the upload is not needed
+      return await attempts.reprocess(session, previous, user=user, lesson=lesson, timer=timer)
+    return _respond(response, attempts.replay(previous))
+  # release the connection while the upload and speech-to-text run
+  await session.commit()
+
+  async def audio() -> AsyncIterator[bytes]:
+    received = 0
+    async for chunk in request.stream():
+      received += len(chunk)
+      if received > settings.max_audio_upload_bytes:
+        raise AudioTooLong("Audio upload is too large.")
+      guard.feed(chunk)
+      yield chunk
+    guard.finish()
+
+  try:
+    with timer.stage("stt"):
+      transcription = await muxlisa.transcribe_stream(audio(), filename=guard.filename, content_type=guard.content_type)
+  except AudioTooLong as exc:
+    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(exc)) from exc
+  except UnsupportedAudio as exc:
+    raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(exc)) from exc
+
+  return await _complete_attempt(
+      session,
+      attempts,
+      response,
+      user=user,
+      lesson=lesson,
+      transcript=transcription.get("transcript") or "",
+      audio_url=None,
+      mode=mode,
+      timer=timer,
+      idempotency_key=idempotency_key,
   )
-  session.add(attempt)
-  await session.flush()
 
-  xp_awarded, leveled_up = await gamification.apply_attempt_outcome(session, user, lesson, attempt)
-  unlocked = await gamification.unlock_next_lessons(session, lesson.module, user.id) if is_correct else []
 
-  response_feedback = LessonAttemptFeedback(
+async def _complete_attempt(
+    session: AsyncSession,
+    attempts: AttemptService,
+    response: Response,
+    *,
+    user: User,
+    lesson: Lesson,
+    transcript: str,
+    audio_url: str | None,
+    mode: str,
+    timer: StageTimer,
+    idempotency_key: str | None,
+) -> LessonAttemptResponse | AttemptStatusResponse:
+  if mode == "async":
+    if attempts.saturated:
+      raise HTTPException(
+          status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+          detail="Evaluation queue is full, try again shortly.",
+          headers={"Retry-After": "5"},
+      )
+    attempt = await attempts.submit(
+        session,
+        user=user,
+        lesson=lesson,
+        transcript=transcript,
+        audio_url=audio_url,
+        timer=timer,
+        idempotency_key=idempotency_key,
+    )
+    return _respond(response, attempts.replay(attempt))
+
+  with timer.stage("evaluation"):
+    evaluation = await attempts.evaluate(lesson=lesson, transcript=transcript, user_age=user.age)
+  result = await attempts.record(
+      session,
+      user=user,
+      lesson=lesson,
       transcript=transcript,
-      pronunciation_score=score,
-      accuracy_score=evaluation.get("accuracy"),
-      fluency_score=evaluation.get("fluency"),
-      issues=evaluation.get("issues", []),
-      suggested_repetition=not is_correct,
-      encouragement=evaluation.get("encouragement"),
+      audio_url=audio_url,
+      evaluation=evaluation,
+      timer=timer,
+      idempotency_key=idempotency_key,
   )
+  return _respond(response, result)
 
-  return LessonAttemptResponse(
-      attempt_id=attempt.id,
-      lesson_id=lesson.id,
-      user_id=user.id,
-      is_correct=is_correct,
-      score=score,
-      feedback=response_feedback,
-      xp_awarded=xp_awarded,
-      leveled_up=leveled_up,
-      unlocked_lessons=unlocked,
-  )
+
+async def _previous_attempt(
+    session: AsyncSession,
+    attempts: AttemptService,
+    timer: StageTimer,
+    *,
+    user: User,
+    lesson: Lesson,
+    idempotency_key: str | None,
+) -> LessonAttempt | None:
+  if idempotency_key is None:
+    return None
+  with timer.stage("lookup"):
+    previous = await attempts.find(session, user_id=user.id, idempotency_key=idempotency_key)
+  if previous is not None and previous.lesson_id != lesson.id:
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Idempotency key was used for another lesson.")
+  return previous
 
 
+def _respond(
+    response: Response,
+    result: LessonAttemptResponse | AttemptStatusResponse,
+) -> LessonAttemptResponse | AttemptStatusResponse:
+  if isinstance(result, AttemptStatusResponse) and result.status == "pending":
+    response.status_code = status.HTTP_202_ACCEPTED
+  return result
+
+
+@router.get("/attempts/{attempt_id}", response_model=AttemptStatusResponse)
+async def get_attempt_status(
+    attempt_id: UUID,
+    session: AsyncSession = Depends(get_db_session),
+    attempts: AttemptService = Depends(get_attempt_service),
+) -> AttemptStatusResponse:
+  try:
+    return await attempts.status(session, attempt_id)
+  except ValueError as exc:
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
@@ -6,11 +6,13 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import and_, desc, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_db_session
-from sqlalchemy.orm import selectinload
-
-from app.models import Achievement, Lesson, LessonAttempt, LearningPath, User, UserAchievement, UserProgress
+from app.api.deps import get_achievement_engine, get_curriculum_cache, get_db_session, get_frontier_service
+from app.core.config import settings
+from app.models import Achievement, LessonAttempt, LearningPath, User, UserAchievement, UserProgress
 from app.schemas import APIMessage, LessonAttemptSummary, ProgressOverview, ProgressUpdateRequest, UserBase
+from app.services.achievement_service import AchievementEngine, lessons_completed_key
+from app.services.curriculum_service import CurriculumCache
+from app.services.frontier_service import FrontierService
 
 router = APIRouter()
 
@@ -82,13 +84,11 @@ async def get_progress(
 async def update_progress_endpoint(
     payload: ProgressUpdateRequest,
     session: AsyncSession = Depends(get_db_session),
+    frontier: FrontierService = Depends(get_frontier_service),
+    curriculum: CurriculumCache = Depends(get_curriculum_cache),
+    achievements: AchievementEngine = Depends(get_achievement_engine),
 ) -> APIMessage:
-  lesson_result = await session.execute(
-      select(Lesson)
-      .options(selectinload(Lesson.module))
-      .where(Lesson.id == payload.lesson_id),
-  )
-  lesson = lesson_result.scalar_one_or_none()
+  lesson = await curriculum.lesson(session, payload.lesson_id)
   if lesson is None:
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lesson not found.")
 
@@ -98,21 +98,32 @@ async def update_progress_endpoint(
       )
   )
   progress = result.scalar_one_or_none()
-  module = lesson.module
-  if module is None:
-    raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Lesson module not configured.")
+  was_completed = progress is not None and progress.status == "completed"
 
   if progress is None:
+    if payload.status == "locked" and settings.implicit_locked_progress:
+      # nothing to persist: a missing row is already read as locked
+      return APIMessage(message="Progress updated.")
     progress = UserProgress(
         user_id=payload.user_id,
-        learning_path_id=module.learning_path_id,
+        learning_path_id=lesson.learning_path_id,
         lesson_id=payload.lesson_id,
         status=payload.status,
-        module_id=module.id,
+        module_id=lesson.module_id,
     )
   else:
     progress.status = payload.status
   session.add(progress)
+  await frontier.record_outcome(
+      session,
+      user_id=payload.user_id,
+      lesson_id=payload.lesson_id,
+      completed=payload.status == "completed",
+  )
+  if (payload.status == "completed") != was_completed:
+    key = lessons_completed_key(lesson.learning_path_id)
+    before, after = await achievements.increment(session, payload.user_id, key, -1 if was_completed else 1)
+    await achievements.evaluate(session, payload.user_id, before={key: before}, after={key: after})
   return APIMessage(message="Progress updated.")
 
 
@@ -1,16 +1,23 @@
 from __future__ import annotations
 
+import asyncio
+import base64
 import json
+from collections.abc import AsyncIterator
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_db_session
+from app.core.config import settings
 from app.core.logging import logger
 from app.models import Lesson, User
+from app.services.attempt_service import attempt_service
+from app.services.audio_probe import AudioTooLong, DurationGuard
 from app.services.muxlisa_service import MuxlisaClient
 from app.services.openai_service import OpenAIAdapter
+from app.services.streaming_stt import StreamingTranscriber, TranscriptionFailed, streaming_transcriber
 
 router = APIRouter()
 
@@ -40,6 +47,101 @@ class RealtimeConversationManager:
 realtime_manager = RealtimeConversationManager()
 
 
+class _Utterance:
+    """One spoken answer: audio frames go to the STT engine as they arrive, transcripts come back as they form.
+
+    Partial and final transcripts are pushed to the socket as ``transcript``
+    messages while the child is still speaking. Frames are checked against
+    the duration limit on the way and capped in bytes, so the queue between
+    the socket and the engine stays bounded.
+    """
+
+    def __init__(
+        self,
+        session_id: UUID,
+        transcriber: StreamingTranscriber,
+        *,
+        content_type: str,
+        language: str,
+        hint: str | None,
+    ) -> None:
+        self._session_id = session_id
+        self._guard = DurationGuard.for_content_type(content_type, settings.max_audio_duration_seconds)
+        self._frames: asyncio.Queue[bytes | None] = asyncio.Queue()
+        self._received = 0
+        self._task = asyncio.create_task(self._run(transcriber, language, hint))
+
+    async def feed(self, chunk: bytes) -> None:
+        if self._task.done():
+            # the engine already failed and reported it; the rest of the answer is dropped
+            return
+        self._received += len(chunk)
+        if self._received > settings.max_audio_upload_bytes:
+            raise AudioTooLong("Audio exceeds the upload size limit.")
+        self._frames.put_nowait(chunk)
+
+    async def finish(self) -> str | None:
+        """The final transcript, or None when transcription failed."""
+        self._frames.put_nowait(None)
+        return await self._task
+
+    def cancel(self) -> None:
+        self._task.cancel()
+
+    async def _chunks(self) -> AsyncIterator[bytes]:
+        while (chunk := await self._frames.get()) is not None:
+            self._guard.feed(chunk)
+            yield chunk
+        self._guard.finish()
+
+    async def _run(self, transcriber: StreamingTranscriber, language: str, hint: str | None) -> str | None:
+        final = None
+        try:
+            async for event in transcriber.transcribe(
+                self._chunks(),
+                filename=self._guard.filename,
+                content_type=self._guard.content_type,
+                language=language,
+                hint=hint,
+            ):
+                await realtime_manager.send_message(
+                    self._session_id,
+                    {"type": "transcript", "text": event.text, "final": event.final, "confidence": event.confidence},
+                )
+                if event.final:
+                    final = event.text
+        except (ValueError, TranscriptionFailed) as exc:
+            await realtime_manager.send_message(self._session_id, {"type": "error", "detail": str(exc)})
+            return None
+        except Exception:  # noqa: BLE001
+            # a failing engine ends this answer, not the conversation
+            logger.exception("Realtime transcription failed: session_id=%s", self._session_id)
+            await realtime_manager.send_message(
+                self._session_id, {"type": "error", "detail": "Speech recognition failed; please try again."}
+            )
+            return None
+        return final
+
+
+async def _forward_attempt_results(session_id: UUID, results: asyncio.Queue[dict]) -> None:
+    """Push background attempt evaluations of the connected user to this socket."""
+    while True:
+        message = await results.get()
+        await realtime_manager.send_message(session_id, message)
+
+
+def _reply_to(transcript: str) -> dict:
+    # OpenAI ga yuborish va javob olish
+    # AI javobini real-time qaytarish
+    return {
+        "type": "ai_message",
+        "text": f"Siz '{transcript}' dedingiz. Ajoyib!",
+        "suggested_letter": "A",
+        "example_words": ["Anor", "Olma"],
+        "example_images": [],
+    }
+
+
 @router.websocket("/conversation/{session_id}")
 async def realtime_conversation(
     websocket: WebSocket,
@@ -49,6 +151,31 @@ async def realtime_conversation(
 ) -> None:
     """Real-time AI suhbat - ChatGPT Realtime kabi"""
     await realtime_manager.connect(session_id, websocket)
+    results = attempt_service.subscribe(user_id) if user_id else None
+    forwarder = asyncio.create_task(_forward_attempt_results(session_id, results)) if results else None
+    utterance: _Utterance | None = None
+
+    def start_utterance(data: dict) -> _Utterance:
+        nonlocal utterance
+        if utterance is not None:
+            utterance.cancel()
+        utterance = _Utterance(
+            session_id,
+            streaming_transcriber,
+            content_type=data.get("content_type") or "audio/wav",
+            language=data.get("language") or "uz",
+            hint=data.get("transcript_hint"),
+        )
+        return utterance
+
+    async def end_utterance() -> None:
+        nonlocal utterance
+        if utterance is None:
+            return
+        current, utterance = utterance, None
+        transcript = await current.finish()
+        if transcript is not None:
+            await realtime_manager.send_message(session_id, _reply_to(transcript))
 
     try:
         # Bola ma'lumotlarini olish
@@ -65,45 +192,66 @@ async def realtime_conversation(
         )
 
         while True:
-            # Frontend dan audio chunk yoki text qabul qilish
-            data = await websocket.receive_json()
-
-            if data.get("type") == "audio_chunk":
-                # Muxlisa STT orqali transkripsiya
-                # Bu yerda real-time STT streaming bo'lishi kerak
-                transcript = data.get("transcript_hint") or ""
-
-                # OpenAI ga yuborish va javob olish
-                # AI javobini real-time qaytarish
-                ai_response = {
-                    "type": "ai_message",
-                    "text": f"Siz '{transcript}' dedingiz. Ajoyib!",
-                    "suggested_letter": "A",
-                    "example_words": ["Anor", "Olma"],
-                    "example_images": [],
-                }
-
-                await realtime_manager.send_message(session_id, ai_response)
-
-            elif data.get("type") == "text_message":
-                # Text orqali suhbat
-                user_text = data.get("text", "")
-
-                # OpenAI conversation
-                # Bu yerda lesson context va bola preferences ishlatiladi
-                ai_response = {
-                    "type": "ai_message",
-                    "text": f"Sizning xabaringiz: {user_text}. Men sizga yordam beraman!",
-                }
-
-                await realtime_manager.send_message(session_id, ai_response)
-
-            elif data.get("type") == "end_session":
-                break
+            # Frontend dan audio (binary frame) yoki JSON xabar qabul qilish
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", status.WS_1000_NORMAL_CLOSURE))
+
+            try:
+                if message.get("bytes") is not None:
+                    # Binary frame: audio_start da e'lon qilingan formatdagi audio bo'lagi
+                    await (utterance or start_utterance({})).feed(message["bytes"])
+                    continue
+
+                data = json.loads(message.get("text") or "{}")
+
+                if data.get("type") == "audio_start":
+                    start_utterance(data)
+
+                elif data.get("type") == "audio_chunk":
+                    if not data.get("audio_base64"):
+                        # Audio yo'q: eski mijozlar faqat transcript_hint yuboradi
+                        await realtime_manager.send_message(session_id, _reply_to(data.get("transcript_hint") or ""))
+                        continue
+                    # Muxlisa STT orqali transkripsiya, bo'laklar kelishi bilan
+                    await (utterance or start_utterance(data)).feed(base64.b64decode(data["audio_base64"]))
+                    if data.get("last"):
+                        await end_utterance()
+
+                elif data.get("type") == "audio_end":
+                    await end_utterance()
+
+                elif data.get("type") == "text_message":
+                    # Text orqali suhbat
+                    user_text = data.get("text", "")
+
+                    # OpenAI conversation
+                    # Bu yerda lesson context va bola preferences ishlatiladi
+                    ai_response = {
+                        "type": "ai_message",
+                        "text": f"Sizning xabaringiz: {user_text}. Men sizga yordam beraman!",
+                    }
+
+                    await realtime_manager.send_message(session_id, ai_response)
+
+                elif data.get("type") == "end_session":
+                    break
+            except ValueError as exc:
+                # noto'g'ri JSON, audio formati yoki juda uzun audio
+                if utterance is not None:
+                    utterance.cancel()
+                    utterance = None
+                await realtime_manager.send_message(session_id, {"type": "error", "detail": str(exc)})
 
     except WebSocketDisconnect:
         realtime_manager.disconnect(session_id)
         logger.info("WebSocket client disconnected: session_id=%s", session_id)
+    finally:
+        if utterance is not None:
+            utterance.cancel()
+        if forwarder is not None:
+            forwarder.cancel()
+            attempt_service.unsubscribe(user_id, results)
 
 
 @router.post("/conversation/{session_id}/start")
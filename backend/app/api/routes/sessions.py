@@ -25,7 +25,7 @@ async def start_session(
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
 
   return SessionStartResponse(
-      lesson=learning_service.serialize_lesson(lesson),
+      lesson=lesson,
       progress=learning_service.serialize_progress(progress),
       next_unlocks=[],
   )
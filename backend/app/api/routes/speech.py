@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Query, Response, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from app.api.deps import get_speech_service
+from app.schemas import SpeechSynthesisRequest, SpeechSynthesisResponse
+from app.services.audio_cache import CachedAudio
+from app.services.speech_service import SpeechService, SpeechUnavailable
+
+router = APIRouter()
+
+# a clip's URL is derived from its content, so it never changes
+_IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+@router.post("/synthesize", response_model=SpeechSynthesisResponse)
+async def synthesize(
+    payload: SpeechSynthesisRequest,
+    speech: SpeechService = Depends(get_speech_service),
+) -> SpeechSynthesisResponse:
+  try:
+    return await speech.synthesize(text=payload.text, voice=payload.voice, language=payload.language)
+  except SpeechUnavailable as exc:
+    raise _unavailable(exc) from exc
+
+
+@router.get("/stream")
+async def stream(
+    text: str = Query(..., min_length=1, max_length=500),
+    voice: str = Query("maftuna", max_length=32),
+    language: str = Query("uz", max_length=8),
+    range_header: str | None = Header(None, alias="Range"),
+    speech: SpeechService = Depends(get_speech_service),
+) -> Response:
+  """Audio of ``text`` as binary: from the cache when rendered before, else relayed from Muxlisa as it arrives.
+
+  Relayed clips go out with chunked transfer encoding and the first bytes
+  reach the client while Muxlisa is still synthesising; Range requests are
+  honoured once a clip is cached.
+  """
+  clip = await speech.cached(text=text, voice=voice, language=language)
+  if clip is not None:
+    return _serve(clip, range_header)
+  try:
+    media_type, chunks = await speech.stream(text=text, voice=voice, language=language)
+  except SpeechUnavailable as exc:
+    raise _unavailable(exc) from exc
+  return StreamingResponse(chunks, media_type=media_type, headers={"Cache-Control": "no-store"})
+
+
+@router.get("/audio/{key}")
+async def audio(
+    key: str = Path(pattern=r"^[0-9a-f]{64}$"),
+    if_none_match: str | None = Header(None),
+    range_header: str | None = Header(None, alias="Range"),
+    speech: SpeechService = Depends(get_speech_service),
+) -> Response:
+  etag = f'"{key}"'
+  if if_none_match == etag:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": _IMMUTABLE})
+  clip = await speech.audio(key)
+  if clip is None:
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Audio not found.")
+  return _serve(clip, range_header)
+
+
+def _serve(clip: CachedAudio, range_header: str | None) -> StreamingResponse:
+  headers = {"Accept-Ranges": "bytes", "ETag": f'"{clip.key}"', "Cache-Control": _IMMUTABLE}
+  try:
+    byte_range = _byte_range(range_header, clip.size)
+  except HTTPException:
+    clip.close()
+    raise
+  # the map is released after the response even if the body was never iterated, e.g. the client left first
+  release = BackgroundTask(clip.close)
+  if byte_range is None:
+    headers["Content-Length"] = str(clip.size)
+    return StreamingResponse(clip.iter_bytes(), media_type=clip.media_type, headers=headers, background=release)
+  start, end = byte_range
+  headers["Content-Length"] = str(end - start)
+  headers["Content-Range"] = f"bytes {start}-{end - 1}/{clip.size}"
+  return StreamingResponse(
+      clip.iter_bytes(start, end),
+      status_code=status.HTTP_206_PARTIAL_CONTENT,
+      media_type=clip.media_type,
+      headers=headers,
+      background=release,
+  )
+
+
+def _byte_range(header: str | None, size: int) -> tuple[int, int] | None:
+  """Start and exclusive end of a single ``bytes=`` range; None serves the whole clip."""
+  if not header or not header.startswith("bytes=") or "," in header:
+    return None
+  first, _, last = header[len("bytes="):].strip().partition("-")
+  try:
+    if first:
+      start, end = int(first), min(int(last) + 1, size) if last else size
+    else:
+      start, end = max(size - int(last), 0), size
+  except ValueError:
+    return None
+  if start >= end:
+    raise HTTPException(
+        status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+        detail="Requested range not satisfiable.",
+        headers={"Content-Range": f"bytes */{size}"},
+    )
+  return start, end
+
+
+def _unavailable(exc: SpeechUnavailable) -> HTTPException:
+  return HTTPException(
+      status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+      detail=str(exc),
+      headers={"Retry-After": "5"},
+  )
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_db_session, get_offline_sync_service
+from app.core.config import settings
+from app.schemas import OfflineSyncRequest, OfflineSyncResponse
+from app.services.sync_service import OfflineSyncService
+
+router = APIRouter()
+
+
+@router.post("/attempts", response_model=OfflineSyncResponse)
+async def sync_offline_attempts(
+    payload: OfflineSyncRequest,
+    session: AsyncSession = Depends(get_db_session),
+    sync: OfflineSyncService = Depends(get_offline_sync_service),
+) -> OfflineSyncResponse:
+  """Upload lesson and math attempts recorded offline; safe to retry with the same ``client_id``s."""
+  if len(payload.lesson_attempts) + len(payload.math_attempts) > settings.offline_sync_max_attempts:
+    raise HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Send at most {settings.offline_sync_max_attempts} attempts per request.",
+    )
+  return await sync.ingest(session, payload)
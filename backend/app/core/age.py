@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+# lower bounds of the age brackets: 0-4, 5-6, 7-8, 9-10, 11+
+_AGE_BRACKET_STARTS = (0, 5, 7, 9, 11)
+
+
+def age_bracket(age: int | None) -> str | None:
+  """Age group a child is ranked and cached with, e.g. ``"5-6"``; ``None`` when the age is unknown."""
+  if age is None:
+    return None
+  for start, end in zip(_AGE_BRACKET_STARTS, _AGE_BRACKET_STARTS[1:]):
+    if age < end:
+      return f"{start}-{end - 1}"
+  return f"{_AGE_BRACKET_STARTS[-1]}+"
+
+
+AGE_BRACKETS = tuple(age_bracket(start) for start in _AGE_BRACKET_STARTS)
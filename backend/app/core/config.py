@@ -15,10 +15,66 @@ class Settings(BaseSettings):
   openai_model: str = "gpt-4o-mini"
   muxlisa_api_url: AnyHttpUrl | str = "https://service.muxlisa.uz/api"
   muxlisa_api_key: str = ""
+  # Pooled Muxlisa connections per worker; HTTP/2 needs the h2 package (httpx[http2])
+  muxlisa_http2: bool = True
+  muxlisa_max_connections: int = 100
+  muxlisa_max_keepalive_connections: int = 20
+  muxlisa_keepalive_seconds: float = 30.0
+  # Synthesised speech cached by content hash: memory tier per worker, disk tier shared by workers
+  tts_cache_dir: str = "/tmp/bolajon-tts"
+  tts_cache_memory_bytes: int = 64 * 1024 * 1024
+  tts_cache_disk_bytes: int = 2 * 1024 * 1024 * 1024
+  # Curriculum speech rendered ahead of time: parallel TTS calls, lessons per committed batch
+  tts_prerender_concurrency: int = 8
+  tts_prerender_batch_size: int = 200
+  tts_prerender_checkpoint: str = "/tmp/bolajon-tts-prerender.json"
   redis_url: str | None = None
+  # Redis calls fail after this many seconds instead of stalling the request
+  redis_socket_timeout_seconds: float = 1.0
   admin_api_token: str | None = None
 
   max_audio_duration_seconds: int = 30
+  # Hard cap on streamed attempt uploads, checked alongside the header duration
+  max_audio_upload_bytes: int = 10 * 1024 * 1024
+  # Streaming STT behind the realtime WebSocket: muxlisa, fake (offline) or package.module:ClassName
+  realtime_stt_engine: str = "muxlisa"
+  # Missing user_progress rows are read as "locked" instead of being materialised per lesson
+  implicit_locked_progress: bool = True
+  # How often each worker checks the curriculum version row for content changes
+  curriculum_version_check_seconds: float = 5.0
+  lesson_body_cache_size: int = 1024
+  # Pronunciation evaluations reused for equal normalised inputs; Redis tier used when REDIS_URL is set
+  evaluation_cache_size: int = 10_000
+  evaluation_cache_memory_ttl_seconds: float = 300.0
+  evaluation_cache_redis_ttl_seconds: int = 7 * 24 * 3600
+  # Local phonetic scoring decides attempts scoring at least the accept or at most the reject score
+  phonetic_fast_path: bool = True
+  phonetic_accept_score: float = 0.9
+  phonetic_reject_score: float = 0.35
+  # OpenAI admission control: concurrent calls, callers allowed to wait, deadline per evaluation
+  openai_max_concurrency: int = 16
+  openai_max_queue: int = 200
+  openai_deadline_seconds: float = 8.0
+  openai_retries: int = 2
+  # Consecutive failures or calls slower than openai_slow_call_seconds that open the breaker
+  openai_breaker_failures: int = 5
+  openai_slow_call_seconds: float = 5.0
+  openai_breaker_probe_seconds: float = 15.0
+  # Evaluations sent together in one model request; 1 sends each on its own
+  evaluation_batch_size: int = 1
+  evaluation_batch_wait_ms: float = 20.0
+  # Background evaluation of attempts submitted with mode="async"
+  attempt_workers: int = 4
+  attempt_queue_size: int = 500
+  # A worker's claim on a pending attempt lapses after the lease; unclaimed ones are swept into the queue this often
+  attempt_claim_lease_seconds: float = 300.0
+  attempt_sweep_seconds: float = 30.0
+  # Offline attempts accepted per sync request, and rows per bulk INSERT statement
+  offline_sync_max_attempts: int = 10_000
+  offline_sync_chunk_size: int = 1000
+  # Users updated per committed batch when XP thresholds change, and how often each worker checks for new ones
+  level_recompute_batch_size: int = 5000
+  xp_thresholds_check_seconds: float = 5.0
   allowed_origins: str = "*"  # String sifatida saqlash, validator orqali list ga o'zgartiriladi
 
   model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", case_sensitive=False)
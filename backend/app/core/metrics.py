@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+# upper bounds in milliseconds, from a cache hit to a slow model answer
+DEFAULT_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class LatencyHistogram:
+  """Cumulative latency histogram per label, rendered in the Prometheus text format."""
+
+  def __init__(self, name: str, help_text: str, label: str, buckets: tuple[int, ...] = DEFAULT_BUCKETS_MS) -> None:
+    self.name = name
+    self._help = help_text
+    self._label = label
+    self._buckets = buckets
+    self._counts: dict[str, list[int]] = {}
+    self._sums: dict[str, float] = {}
+
+  def observe(self, label: str, milliseconds: float) -> None:
+    counts = self._counts.get(label)
+    if counts is None:
+      counts = self._counts[label] = [0] * (len(self._buckets) + 1)
+      self._sums[label] = 0.0
+    counts[bisect_left(self._buckets, milliseconds)] += 1
+    self._sums[label] += milliseconds
+
+  def render(self) -> str:
+    lines = [f"# HELP {self.name} {self._help}", f"# TYPE {self.name} histogram"]
+    for label, counts in sorted(self._counts.items()):
+      selector = f'{self._label}="{label}"'
+      cumulative = 0
+      for bound, count in zip(self._buckets, counts):
+        cumulative += count
+        lines.append(f'{self.name}_bucket{{{selector},le="{bound}"}} {cumulative}')
+      cumulative += counts[-1]
+      lines.append(f'{self.name}_bucket{{{selector},le="+Inf"}} {cumulative}')
+      lines.append(f"{self.name}_sum{{{selector}}} {self._sums[label]:.1f}")
+      lines.append(f"{self.name}_count{{{selector}}} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+  """Milliseconds spent per named stage of one request; repeated stages add up."""
+
+  def __init__(self, stages: dict[str, int] | None = None) -> None:
+    self.stages: dict[str, int] = dict(stages or {})
+
+  @contextmanager
+  def stage(self, name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+      yield
+    finally:
+      self.add(name, (time.perf_counter() - started) * 1000)
+
+  def add(self, name: str, milliseconds: float) -> None:
+    self.stages[name] = self.stages.get(name, 0) + round(milliseconds)
+
+  @property
+  def total_ms(self) -> int:
+    return sum(self.stages.values())
+
+
+attempt_stage_latency = LatencyHistogram(
+    "bolajon_attempt_stage_latency_ms",
+    "Lesson attempt pipeline latency per stage in milliseconds.",
+    "stage",
+)
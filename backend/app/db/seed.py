@@ -5,6 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.logging import logger
 from app.models import Achievement, LearningPath, Lesson, LessonPrompt, Module, Skill, SkillActivity
+from app.services.curriculum_service import curriculum_cache
 
 ALPHABET_LESSONS = [
     {
@@ -119,12 +120,14 @@ ACHIEVEMENTS = [
         "title": "Alifbo Ustasi",
         "description": "Alifbo bo'limidagi barcha harflarni muvaffaqiyatli o'rganing.",
         "xp_reward": 100,
+        "conditions": {"lessons_completed": {"path": "alphabet", "count": "all"}},
     },
     {
         "key": "math_explorer",
         "title": "Matematika Tadqiqotchisi",
         "description": "Birinchi matematika chaqiriqlarini bajar!",
         "xp_reward": 70,
+        "conditions": {"math_accuracy": 0.8},
     },
 ]
 
@@ -144,6 +147,7 @@ async def seed_initial_data(session: AsyncSession) -> None:
   math_module = await _get_or_create_module(session, math_path, "math-foundations", "Qo'shish va ayirish")
   await _ensure_math_skill(session, math_path, math_module)
   await _ensure_achievements(session)
+  await curriculum_cache.bump_version(session)
   logger.info("Seed complete.")
 
 
@@ -201,6 +205,9 @@ async def _get_or_create_lesson(
       "media_assets": {"illustrations": payload.get("example_image_urls", [])},
   }
   if lesson:
+    # rendered speech stays; the pre-render job compares its text hash
+    if "speech" in (lesson.media_assets or {}):
+      fields["media_assets"] = {"speech": lesson.media_assets["speech"], **fields["media_assets"]}
     for attr, value in fields.items():
       setattr(lesson, attr, value)
     return lesson
@@ -326,5 +333,7 @@ async def _ensure_achievements(session: AsyncSession) -> None:
     achievement = result.scalar_one_or_none()
     if achievement is None:
       session.add(Achievement(**achievement_payload))
+    else:
+      achievement.conditions = achievement_payload["conditions"]
 
 
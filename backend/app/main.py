@@ -4,7 +4,14 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.api import api_router
 from app.core.config import settings
 from app.db.session import dispose_engine
+from app.services.attempt_service import attempt_service
+from app.services.audio_cache import audio_cache
+from app.services.evaluation_cache import evaluation_cache
 from app.services.gamification_service import gamification_engine
+from app.services.leaderboard_service import leaderboard_service
+from app.services.muxlisa_service import muxlisa_client
+from app.services.openai_service import openai_adapter
+from app.services.prerender_service import speech_prerender_service
 
 
 def create_application() -> FastAPI:
@@ -26,10 +33,20 @@ def create_application() -> FastAPI:
   @application.on_event("startup")
   async def on_startup() -> None:
     await gamification_engine.initialize()
+    await muxlisa_client.initialize()
+    await audio_cache.initialize()
+    await leaderboard_service.initialize()
+    await attempt_service.initialize()
 
   @application.on_event("shutdown")
   async def on_shutdown() -> None:
+    await attempt_service.close()
+    await speech_prerender_service.close()
     await gamification_engine.close()
+    await muxlisa_client.close()
+    await leaderboard_service.close()
+    await evaluation_cache.close()
+    await openai_adapter.close()
     await dispose_engine()
 
   application.include_router(api_router, prefix="/api")
@@ -4,7 +4,7 @@ from datetime import datetime
 from typing import Any
 from uuid import UUID
 
-from sqlalchemy import Boolean, DateTime, Enum, Float, ForeignKey, Integer, JSON, String, Text, UniqueConstraint
+from sqlalchemy import Boolean, DateTime, Enum, Float, ForeignKey, Index, Integer, JSON, String, Text, UniqueConstraint, text
 from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -139,7 +139,20 @@ class SkillActivity(TimestampMixin, Base):
 
 class LessonAttempt(TimestampMixin, Base):
   __tablename__ = "lesson_attempts"
-  __table_args__ = (UniqueConstraint("user_id", "lesson_id", "created_at", name="uq_lesson_attempt_per_timestamp"),)
+  __table_args__ = (
+      UniqueConstraint("user_id", "lesson_id", "created_at", name="uq_lesson_attempt_per_timestamp"),
+      Index("ix_lesson_attempts_pending", "created_at", postgresql_where=text("status = 'pending'")),
+      # attempts arrive in created_at order, so a block range index serves latency windows cheaply
+      Index("ix_lesson_attempts_created_brin", "created_at", postgresql_using="brin"),
+      # retried submissions are found by key without touching attempts that have none
+      Index(
+          "ix_lesson_attempts_idempotency",
+          "user_id",
+          "idempotency_key",
+          unique=True,
+          postgresql_where=text("idempotency_key IS NOT NULL"),
+      ),
+  )
 
   user_id: Mapped[UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
   lesson_id: Mapped[UUID] = mapped_column(ForeignKey("lessons.id", ondelete="CASCADE"))
@@ -151,11 +164,32 @@ class LessonAttempt(TimestampMixin, Base):
   score: Mapped[float | None] = mapped_column(Float)
   is_correct: Mapped[bool] = mapped_column(Boolean, default=False)
   latency_ms: Mapped[int | None] = mapped_column(Integer)
+  # milliseconds per pipeline stage, e.g. {"lookup": 3, "llm": 840, "gamification": 12}
+  stage_latency_ms: Mapped[dict[str, int]] = mapped_column(JSON, default=dict)
+  # "pending" while queued for background evaluation, then "completed" or "failed"
+  status: Mapped[str] = mapped_column(String(16), default="completed")
+  # when a background worker claimed the pending attempt; the claim lapses after a lease
+  claimed_at: Mapped[datetime | None] = mapped_column(DateTime)
+  outcome: Mapped[dict[str, Any]] = mapped_column(JSON, default=dict)
+  # client-chosen key of the submission, from the Idempotency-Key header
+  idempotency_key: Mapped[str | None] = mapped_column(String(64))
 
   user: Mapped["User"] = relationship(back_populates="attempts")
   lesson: Mapped["Lesson"] = relationship(back_populates="attempts")
 
 
+class MathAttempt(TimestampMixin, Base):
+  __tablename__ = "math_attempts"
+  __table_args__ = (UniqueConstraint("user_id", "activity_id", "created_at", name="uq_math_attempt_per_timestamp"),)
+
+  user_id: Mapped[UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+  activity_id: Mapped[UUID] = mapped_column(ForeignKey("skill_activities.id", ondelete="CASCADE"))
+  answers: Mapped[list[dict[str, Any]]] = mapped_column(JSON, default=list)
+  correct_count: Mapped[int] = mapped_column(Integer, default=0)
+  total_questions: Mapped[int] = mapped_column(Integer, default=0)
+  xp_awarded: Mapped[int] = mapped_column(Integer, default=0)
+
+
 class UserProgress(TimestampMixin, Base):
   __tablename__ = "user_progress"
   __table_args__ = (UniqueConstraint("user_id", "lesson_id", name="uq_progress_lesson_user"),)
@@ -176,6 +210,51 @@ class UserProgress(TimestampMixin, Base):
   lesson: Mapped["Lesson"] = relationship(back_populates="progresses")
 
 
+class LessonFrontier(TimestampMixin, Base):
+  """Pointer to the first lesson a user has not completed within a learning path.
+
+  ``lesson_id`` is NULL once every lesson of the path is completed.
+  """
+
+  __tablename__ = "lesson_frontiers"
+  __table_args__ = (UniqueConstraint("user_id", "learning_path_id", name="uq_lesson_frontier_user_path"),)
+
+  user_id: Mapped[UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+  learning_path_id: Mapped[UUID] = mapped_column(ForeignKey("learning_paths.id", ondelete="CASCADE"))
+  module_id: Mapped[UUID | None] = mapped_column(ForeignKey("modules.id", ondelete="CASCADE"))
+  lesson_id: Mapped[UUID | None] = mapped_column(ForeignKey("lessons.id", ondelete="CASCADE"))
+
+
+class UserCounter(TimestampMixin, Base):
+  """Per-user running totals read by achievement rules, e.g. ``lessons_completed:<path id>``."""
+
+  __tablename__ = "user_counters"
+  __table_args__ = (UniqueConstraint("user_id", "key", name="uq_user_counter_key"),)
+
+  user_id: Mapped[UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+  key: Mapped[str] = mapped_column(String(64))
+  value: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class CurriculumVersion(TimestampMixin, Base):
+  """Counter bumped whenever curriculum content changes, polled by per-worker caches."""
+
+  __tablename__ = "curriculum_versions"
+
+  key: Mapped[str] = mapped_column(String(64), unique=True)
+  version: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class XPThresholds(TimestampMixin, Base):
+  """XP needed to reach each level, shared by every worker; ``version`` is bumped on each change."""
+
+  __tablename__ = "xp_thresholds"
+
+  key: Mapped[str] = mapped_column(String(64), unique=True)
+  version: Mapped[int] = mapped_column(Integer, default=0)
+  thresholds: Mapped[list[int]] = mapped_column(ARRAY(Integer), default=list)
+
+
 class Achievement(TimestampMixin, Base):
   __tablename__ = "achievements"
 
@@ -204,16 +283,21 @@ class UserAchievement(TimestampMixin, Base):
 
 __all__ = [
     "Achievement",
+    "CurriculumVersion",
     "Lesson",
     "LessonAttempt",
+    "LessonFrontier",
     "LessonPrompt",
+    "MathAttempt",
     "LearningPath",
     "Module",
     "Skill",
     "SkillActivity",
     "User",
     "UserAchievement",
+    "UserCounter",
     "UserProgress",
+    "XPThresholds",
     "LessonType",
     "PromptType",
     "ProgressStatus",
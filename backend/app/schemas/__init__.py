@@ -83,6 +83,8 @@ class LessonAttemptRequest(BaseModel):
   audio_base64: str | None = None
   transcript_hint: str | None = None
   force_reprocess: bool = False
+  # "async" stores the attempt as pending and evaluates it in the background
+  mode: Literal["sync", "async"] = "sync"
 
 
 class LessonAttemptFeedback(BaseModel):
@@ -105,6 +107,28 @@ class LessonAttemptResponse(BaseModel):
   xp_awarded: int
   leveled_up: bool
   unlocked_lessons: list[str] = Field(default_factory=list)
+  achievements_awarded: list[str] = Field(default_factory=list)
+
+
+class AttemptStatusResponse(BaseModel):
+  attempt_id: UUID
+  status: Literal["pending", "completed", "failed"]
+  result: LessonAttemptResponse | None = None
+
+
+class StageLatency(BaseModel):
+  stage: str
+  count: int
+  p50_ms: float | None = None
+  p95_ms: float | None = None
+  p99_ms: float | None = None
+
+
+class AttemptLatencyReport(BaseModel):
+  since: datetime
+  attempts: int
+  engines: dict[str, int] = Field(default_factory=dict)
+  stages: list[StageLatency] = Field(default_factory=list)
 
 
 class LessonAttemptSummary(BaseModel):
@@ -143,6 +167,77 @@ class MathAttemptResponse(BaseModel):
   xp_awarded: int
   mistakes: list[str]
   unlocked_lessons: list[str]
+  achievements_awarded: list[str] = Field(default_factory=list)
+
+
+class OfflineLessonAttempt(BaseModel):
+  client_id: UUID
+  user_id: UUID
+  lesson_id: UUID
+  transcript: str | None = None
+  recorded_at: datetime
+
+
+class OfflineMathAttempt(BaseModel):
+  client_id: UUID
+  user_id: UUID
+  skill_key: str
+  challenge_id: UUID | None = None
+  answers: list[dict[str, Any]]
+  recorded_at: datetime
+
+
+class OfflineSyncRequest(BaseModel):
+  lesson_attempts: list[OfflineLessonAttempt] = Field(default_factory=list)
+  math_attempts: list[OfflineMathAttempt] = Field(default_factory=list)
+
+
+class OfflineSyncRejection(BaseModel):
+  client_id: UUID
+  detail: str
+
+
+class OfflineSyncUserResult(BaseModel):
+  user_id: UUID
+  lesson_attempts: int
+  math_attempts: int
+  xp_awarded: int
+  xp: int
+  level: int
+  streak: int
+  unlocked_lessons: list[str] = Field(default_factory=list)
+  achievements_awarded: list[str] = Field(default_factory=list)
+
+
+class OfflineSyncResponse(BaseModel):
+  accepted: int
+  duplicates: int
+  rejected: list[OfflineSyncRejection] = Field(default_factory=list)
+  users: list[OfflineSyncUserResult] = Field(default_factory=list)
+
+
+class SpeechSynthesisRequest(BaseModel):
+  text: str = Field(min_length=1, max_length=500)
+  voice: str = Field(default="maftuna", max_length=32)
+  language: str = Field(default="uz", max_length=8)
+
+
+class SpeechSynthesisResponse(BaseModel):
+  key: str
+  audio_url: str
+  cached: bool
+
+
+class SpeechPrerenderStatus(BaseModel):
+  running: bool = False
+  phrases: int = 0
+  scanned: int = 0
+  rendered: int = 0
+  skipped: int = 0
+  failed: int = 0
+  last_lesson_id: UUID | None = None
+  started_at: datetime | None = None
+  finished_at: datetime | None = None
 
 
 class AdminContentPayload(BaseModel):
@@ -152,6 +247,45 @@ class AdminContentPayload(BaseModel):
   overwrite: bool = False
 
 
+class XPThresholdsPayload(BaseModel):
+  thresholds: list[int] = Field(min_length=1)
+
+
+class LevelRecomputeStatus(BaseModel):
+  thresholds: list[int] = Field(default_factory=list)
+  running: bool = False
+  scanned_users: int = 0
+  updated_users: int = 0
+  started_at: datetime | None = None
+  finished_at: datetime | None = None
+
+
+class LeaderboardEntry(BaseModel):
+  rank: int
+  user_id: UUID
+  xp: int
+  first_name: str | None = None
+  nickname: str | None = None
+
+
+class LeaderboardResponse(BaseModel):
+  board: str
+  total: int
+  entries: list[LeaderboardEntry]
+
+
+class LeaderboardRank(BaseModel):
+  board: str
+  rank: int
+  xp: int
+  total: int
+
+
+class UserRankingsResponse(BaseModel):
+  user_id: UUID
+  rankings: list[LeaderboardRank]
+
+
 class GamificationSnapshot(BaseModel):
   xp: int
   level: int
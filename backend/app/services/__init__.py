@@ -1,18 +1,52 @@
+from .achievement_service import AchievementEngine, achievement_engine
+from .audio_cache import AudioCache, audio_cache
+from .attempt_service import AttemptService, attempt_service
+from .curriculum_service import CurriculumCache, CurriculumGraph, curriculum_cache
+from .evaluation_cache import EvaluationCache, evaluation_cache
+from .frontier_service import FrontierService, frontier_service
 from .gamification_service import GamificationEngine, gamification_engine
+from .leaderboard_service import LeaderboardService, leaderboard_service
 from .learning_service import LearningService, learning_service
 from .math_service import MathService, math_service
 from .muxlisa_service import MuxlisaClient, muxlisa_client
 from .openai_service import OpenAIAdapter, openai_adapter
+from .speech_service import SpeechService, speech_service
+from .prerender_service import SpeechPrerenderService, speech_prerender_service
+from .streaming_stt import StreamingTranscriber, streaming_transcriber
+from .sync_service import OfflineSyncService, offline_sync_service
 
 __all__ = [
+    "AchievementEngine",
+    "AttemptService",
+    "AudioCache",
+    "CurriculumCache",
+    "CurriculumGraph",
+    "EvaluationCache",
+    "FrontierService",
     "GamificationEngine",
     "MuxlisaClient",
+    "OfflineSyncService",
     "OpenAIAdapter",
+    "SpeechPrerenderService",
+    "SpeechService",
+    "StreamingTranscriber",
+    "LeaderboardService",
     "LearningService",
     "MathService",
+    "achievement_engine",
+    "attempt_service",
+    "audio_cache",
+    "curriculum_cache",
+    "evaluation_cache",
+    "frontier_service",
     "gamification_engine",
     "muxlisa_client",
+    "offline_sync_service",
     "openai_adapter",
+    "speech_prerender_service",
+    "speech_service",
+    "streaming_transcriber",
+    "leaderboard_service",
     "learning_service",
     "math_service",
 ]
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.logging import logger
+from app.models import Achievement, User, UserAchievement, UserCounter
+from app.services.curriculum_service import CurriculumCache, CurriculumGraph, curriculum_cache
+
+MATH_ATTEMPTS = "math_attempts"
+MATH_ACCURACY = "math_accuracy"
+# metrics stored on the users row; everything else but math accuracy is a user counter
+_USER_METRICS = {"xp": User.xp, "level": User.level, "streak": User.current_streak}
+
+
+def lessons_completed_key(learning_path_id: UUID) -> str:
+  return f"lessons_completed:{learning_path_id}"
+
+
+@dataclass(frozen=True, slots=True)
+class AchievementRule:
+  """An achievement compiled into per-metric minimums; every minimum must be met."""
+
+  achievement_id: UUID
+  key: str
+  minimums: tuple[tuple[str, float], ...]
+
+  @property
+  def metrics(self) -> tuple[str, ...]:
+    return tuple(metric for metric, _ in self.minimums)
+
+  def fires(self, before: Mapping[str, float], after: Mapping[str, float]) -> bool:
+    """True when the rule holds after the event but did not hold before it.
+
+    A metric missing from ``after`` is unknown, so the rule is skipped; one
+    missing from ``before`` counts as not met.
+    """
+    if any(metric not in after for metric, _ in self.minimums):
+      return False
+    if not all(after[metric] >= minimum for metric, minimum in self.minimums):
+      return False
+    return not all(metric in before and before[metric] >= minimum for metric, minimum in self.minimums)
+
+
+class AchievementEngine:
+  """Awards achievements from ``Achievement.conditions`` as attempts come in.
+
+  Conditions are a JSON object whose entries must all hold, e.g.
+  ``{"min_streak": 5}``, ``{"min_xp": 500}``, ``{"min_level": 3}``,
+  ``{"lessons_completed": {"path": "alphabet", "count": "all"}}``,
+  ``{"math_attempts": 10}`` or ``{"math_accuracy": 0.8}``. They are compiled
+  once per curriculum version and indexed by metric, so an event only checks
+  the rules watching a metric it changed. A rule fires when the event moves it
+  from unmet to met; rules with a counter condition are checked when that
+  counter moves. Metrics a rule needs that the event did not report are read
+  from the users row and the counters, so compound rules fire whichever
+  metric moves last.
+  """
+
+  def __init__(self, curriculum: CurriculumCache) -> None:
+    self._curriculum = curriculum
+    self._version: int | None = None
+    self._rules_by_metric: dict[str, tuple[AchievementRule, ...]] = {}
+
+  async def increment(self, session: AsyncSession, user_id: UUID, key: str, amount: int = 1) -> tuple[int, int]:
+    """Add ``amount`` to a user counter in one upsert and return ``(before, after)``."""
+    statement = insert(UserCounter).values(user_id=user_id, key=key, value=amount)
+    statement = statement.on_conflict_do_update(
+        index_elements=[UserCounter.user_id, UserCounter.key],
+        set_={"value": UserCounter.value + statement.excluded.value},
+    ).returning(UserCounter.value)
+    after = (await session.execute(statement)).scalar_one()
+    return after - amount, after
+
+  async def evaluate(
+      self,
+      session: AsyncSession,
+      user_id: UUID,
+      *,
+      before: Mapping[str, float],
+      after: Mapping[str, float],
+  ) -> list[str]:
+    """Award every rule that ``before -> after`` satisfies and return the new achievement keys."""
+    changed = [metric for metric, value in after.items() if before.get(metric) != value]
+    if not changed:
+      return []
+    rules_by_metric = await self._rules(session)
+    candidates = {rule for metric in changed for rule in rules_by_metric.get(metric, ())}
+    missing = {metric for rule in candidates for metric in rule.metrics if metric not in after}
+    if missing:
+      # unchanged by this event, so the stored value is both its before and after
+      stored = await self._stored_metrics(session, user_id, missing)
+      before, after = stored | dict(before), stored | dict(after)
+    fired = [rule for rule in candidates if rule.fires(before, after)]
+    if not fired:
+      return []
+
+    # duplicates are skipped by uq_user_achievement_once
+    result = await session.execute(
+        insert(UserAchievement)
+        .values([{"user_id": user_id, "achievement_id": rule.achievement_id, "meta_data": {}} for rule in fired])
+        .on_conflict_do_nothing(index_elements=[UserAchievement.user_id, UserAchievement.achievement_id])
+        .returning(UserAchievement.achievement_id),
+    )
+    awarded = set(result.scalars().all())
+    return sorted(rule.key for rule in fired if rule.achievement_id in awarded)
+
+  async def _stored_metrics(self, session: AsyncSession, user_id: UUID, metrics: set[str]) -> dict[str, float]:
+    """Current values of ``metrics``; math accuracy belongs to a single attempt and stays unknown."""
+    values: dict[str, float] = {}
+    columns = [column.label(metric) for metric, column in _USER_METRICS.items() if metric in metrics]
+    if columns:
+      row = (await session.execute(select(*columns).where(User.id == user_id))).one_or_none()
+      if row is not None:
+        values |= row._asdict()
+    counters = [metric for metric in metrics if metric not in _USER_METRICS and metric != MATH_ACCURACY]
+    if counters:
+      result = await session.execute(
+          select(UserCounter.key, UserCounter.value).where(UserCounter.user_id == user_id, UserCounter.key.in_(counters))
+      )
+      found = dict(result.tuples().all())
+      values |= {key: found.get(key, 0) for key in counters}
+    return values
+
+  async def _rules(self, session: AsyncSession) -> dict[str, tuple[AchievementRule, ...]]:
+    graph = await self._curriculum.get(session)
+    if graph.version != self._version:
+      achievements = (await session.execute(select(Achievement.id, Achievement.key, Achievement.conditions))).all()
+      rules_by_metric: dict[str, list[AchievementRule]] = {}
+      for achievement_id, key, conditions in achievements:
+        rule = self._compile(graph, achievement_id, key, conditions or {})
+        for metric in rule.metrics if rule else ():
+          rules_by_metric.setdefault(metric, []).append(rule)
+      self._rules_by_metric = {metric: tuple(rules) for metric, rules in rules_by_metric.items()}
+      self._version = graph.version
+      logger.info("Compiled %s achievement rules for curriculum v%s.", len(achievements), graph.version)
+    return self._rules_by_metric
+
+  @staticmethod
+  def _compile(
+      graph: CurriculumGraph,
+      achievement_id: UUID,
+      key: str,
+      conditions: dict,
+  ) -> AchievementRule | None:
+    minimums: list[tuple[str, float]] = []
+    for name, argument in conditions.items():
+      if name in ("min_xp", "min_level", "min_streak"):
+        minimums.append((name.removeprefix("min_"), float(argument)))
+      elif name == MATH_ATTEMPTS:
+        minimums.append((MATH_ATTEMPTS, float(argument)))
+      elif name == MATH_ACCURACY:
+        minimums.append((MATH_ACCURACY, float(argument)))
+      elif name == "lessons_completed":
+        learning_path_id = graph.path_id(argument.get("path", ""))
+        if learning_path_id is None:
+          logger.warning("Achievement %s refers to unknown learning path %r.", key, argument.get("path"))
+          return None
+        count = argument.get("count", "all")
+        if count == "all":
+          start, end = graph.index.path_range(learning_path_id) or (0, 0)
+          count = end - start
+        minimums.append((lessons_completed_key(learning_path_id), float(count)))
+      else:
+        logger.warning("Achievement %s has unsupported condition %r.", key, name)
+        return None
+    if not minimums:
+      return None
+    return AchievementRule(achievement_id=achievement_id, key=key, minimums=tuple(minimums))
+
+
+achievement_engine = AchievementEngine(curriculum_cache)
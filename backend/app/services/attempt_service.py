@@ -0,0 +1,484 @@
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import ColumnElement, Float, cast, func, or_, select, true, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import selectinload
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.metrics import StageTimer, attempt_stage_latency
+from app.db.session import async_session_factory
+from app.models import Lesson, LessonAttempt, User
+from app.schemas import (
+    AttemptLatencyReport,
+    AttemptStatusResponse,
+    LessonAttemptFeedback,
+    LessonAttemptResponse,
+    StageLatency,
+)
+from app.services.gamification_service import GamificationEngine, gamification_engine
+from app.services.openai_service import OpenAIAdapter, openai_adapter
+
+PASS_SCORE = 0.75
+
+
+class AttemptService:
+  """Evaluates lesson attempts and applies their rewards, inline or in the background.
+
+  In the background mode the attempt is committed as "pending" and its id put
+  on a bounded queue. A fixed pool of worker tasks evaluates it without
+  holding a database connection, then applies XP, progress and unlocks in a
+  short transaction of its own. Results can be polled and are pushed to the
+  user's subscribers (the ``/realtime`` WebSocket) of this process.
+
+  A worker claims an attempt with one conditional ``UPDATE`` before
+  evaluating it, so an attempt queued by several processes is evaluated
+  once. A claim lapses after ``claim_lease`` seconds. A sweeper queues
+  pending attempts without a live claim every ``sweep_interval`` seconds,
+  which covers attempts that found the queue full and those whose worker
+  died.
+
+  Each attempt stores the milliseconds spent per stage (lookup, stt, queue,
+  evaluation, persist, gamification) and the engine that scored it; commit
+  times, which cannot be stored in the row they commit, only go to the
+  ``attempt_stage_latency`` histogram.
+  """
+
+  def __init__(
+      self,
+      openai: OpenAIAdapter,
+      gamification: GamificationEngine,
+      session_factory: async_sessionmaker[AsyncSession],
+      *,
+      workers: int,
+      queue_size: int,
+      claim_lease: float,
+      sweep_interval: float,
+  ) -> None:
+    self._openai = openai
+    self._gamification = gamification
+    self._session_factory = session_factory
+    self._worker_count = workers
+    self._claim_lease = timedelta(seconds=claim_lease)
+    self._sweep_interval = sweep_interval
+    self._queue: asyncio.Queue[UUID] = asyncio.Queue(maxsize=queue_size)
+    # ids waiting in the queue, so a sweep does not add them twice
+    self._queued: set[UUID] = set()
+    self._workers: list[asyncio.Task] = []
+    self._sweeper: asyncio.Task | None = None
+    self._subscribers: defaultdict[UUID, set[asyncio.Queue[dict[str, Any]]]] = defaultdict(set)
+
+  async def initialize(self) -> None:
+    if self._workers:
+      return
+    self._workers = [asyncio.create_task(self._work(), name=f"attempt-worker-{index}") for index in range(self._worker_count)]
+    # the first sweep picks up attempts left pending by a previous run
+    self._sweeper = asyncio.create_task(self._sweep_periodically(), name="attempt-sweeper")
+    logger.info("Attempt pipeline started with %s workers.", len(self._workers))
+
+  async def close(self) -> None:
+    tasks = [*self._workers, *([self._sweeper] if self._sweeper is not None else [])]
+    for task in tasks:
+      task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    self._workers = []
+    self._sweeper = None
+
+  async def sweep(self) -> int:
+    """Queue pending attempts that no worker holds a live claim on; returns how many were queued."""
+    room = self._queue.maxsize - self._queue.qsize()
+    if room <= 0:
+      return 0
+    async with self._session_factory() as session:
+      pending = (
+          await session.execute(
+              select(LessonAttempt.id)
+              .where(LessonAttempt.status == "pending", self._claimable())
+              .order_by(LessonAttempt.created_at)
+              .limit(room + len(self._queued)),
+          )
+      ).scalars().all()
+    queued = 0
+    for attempt_id in pending:
+      if attempt_id not in self._queued and self._enqueue(attempt_id):
+        queued += 1
+    return queued
+
+  @property
+  def saturated(self) -> bool:
+    return self._queue.full()
+
+  def metrics(self) -> dict[str, Any]:
+    return {
+        "workers": len(self._workers),
+        "queued": self._queue.qsize(),
+        "queue_size": self._queue.maxsize,
+        "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+    }
+
+  async def evaluate(
+      self,
+      *,
+      lesson: Lesson,
+      transcript: str,
+      user_age: int | None,
+      refresh: bool = False,
+  ) -> dict[str, Any]:
+    return await self._openai.evaluate_pronunciation(
+        transcript=transcript,
+        target_letter=lesson.target_letter,
+        target_sound=lesson.target_sound,
+        example_words=lesson.example_words or [],
+        user_age=user_age,
+        lesson_id=lesson.id,
+        refresh=refresh,
+    )
+
+  async def find(self, session: AsyncSession, *, user_id: UUID, idempotency_key: str) -> LessonAttempt | None:
+    """The attempt a user already submitted under ``idempotency_key``, via ``ix_lesson_attempts_idempotency``."""
+    return await session.scalar(
+        select(LessonAttempt).where(LessonAttempt.user_id == user_id, LessonAttempt.idempotency_key == idempotency_key)
+    )
+
+  def replay(self, attempt: LessonAttempt) -> LessonAttemptResponse | AttemptStatusResponse:
+    """The stored response of a completed attempt, otherwise its status."""
+    status = self._status_of(attempt)
+    return status.result if status.result is not None else status
+
+  async def record(
+      self,
+      session: AsyncSession,
+      *,
+      user: User,
+      lesson: Lesson,
+      transcript: str,
+      audio_url: str | None,
+      evaluation: dict[str, Any],
+      timer: StageTimer | None = None,
+      idempotency_key: str | None = None,
+  ) -> LessonAttemptResponse | AttemptStatusResponse:
+    """Store an already evaluated attempt, apply its outcome and commit.
+
+    If a concurrent request stored an attempt under the same
+    ``idempotency_key`` first, this one is rolled back and that attempt is
+    replayed instead.
+    """
+    timer = timer or StageTimer()
+    user_id = user.id
+    attempt = LessonAttempt(
+        user_id=user_id,
+        lesson_id=lesson.id,
+        audio_url=audio_url,
+        transcript=transcript,
+        idempotency_key=idempotency_key,
+    )
+    session.add(attempt)
+    try:
+      result = await self._apply(session, user, lesson, attempt, evaluation, timer)
+    except IntegrityError:
+      if idempotency_key is None:
+        raise
+      # the rollback expires every loaded instance, so only the saved id is used afterwards
+      await session.rollback()
+      winner = await self.find(session, user_id=user_id, idempotency_key=idempotency_key)
+      if winner is None:
+        raise
+      return self.replay(winner)
+    with timer.stage("commit"):
+      await session.commit()
+    self._observe(timer)
+    return result
+
+  async def reprocess(
+      self,
+      session: AsyncSession,
+      attempt: LessonAttempt,
+      *,
+      user: User,
+      lesson: Lesson,
+      timer: StageTimer | None = None,
+  ) -> LessonAttemptResponse:
+    """Evaluate a stored attempt again, past cached answers, and credit only the XP difference."""
+    timer = timer or StageTimer()
+    with timer.stage("evaluation"):
+      evaluation = await self.evaluate(lesson=lesson, transcript=attempt.transcript or "", user_age=user.age, refresh=True)
+    # the outcome is read under the row lock so concurrent reprocessing cannot credit the same XP twice
+    with timer.stage("lookup"):
+      await session.refresh(attempt, with_for_update=True)
+    previous_xp = attempt.outcome.get("xp_awarded") if attempt.status == "completed" and attempt.outcome else None
+    result = await self._apply(session, user, lesson, attempt, evaluation, timer, previous_xp=previous_xp)
+    with timer.stage("commit"):
+      await session.commit()
+    self._observe(timer)
+    return result
+
+  async def submit(
+      self,
+      session: AsyncSession,
+      *,
+      user: User,
+      lesson: Lesson,
+      transcript: str,
+      audio_url: str | None,
+      timer: StageTimer | None = None,
+      idempotency_key: str | None = None,
+  ) -> LessonAttempt:
+    """Commit a pending attempt and queue it for background evaluation.
+
+    Returns the attempt already stored under ``idempotency_key`` if a
+    concurrent request committed it first.
+    """
+    user_id = user.id
+    attempt = LessonAttempt(
+        user_id=user_id,
+        lesson_id=lesson.id,
+        audio_url=audio_url,
+        transcript=transcript,
+        status="pending",
+        stage_latency_ms=dict(timer.stages) if timer else {},
+        idempotency_key=idempotency_key,
+    )
+    session.add(attempt)
+    # committed before queuing so a worker always finds the row
+    try:
+      await session.commit()
+    except IntegrityError:
+      if idempotency_key is None:
+        raise
+      await session.rollback()
+      winner = await self.find(session, user_id=user_id, idempotency_key=idempotency_key)
+      if winner is None:
+        raise
+      return winner
+    if not self._enqueue(attempt.id):
+      logger.warning("Attempt queue full; attempt %s left pending for the sweeper.", attempt.id)
+    return attempt
+
+  async def status(self, session: AsyncSession, attempt_id: UUID) -> AttemptStatusResponse:
+    attempt = await session.get(LessonAttempt, attempt_id)
+    if attempt is None:
+      raise ValueError(f"Attempt {attempt_id} not found.")
+    return self._status_of(attempt)
+
+  async def latency_report(self, session: AsyncSession, *, since: datetime) -> AttemptLatencyReport:
+    """p50/p95/p99 per stage, and the scoring engines used, for attempts completed since ``since``."""
+    recent = (LessonAttempt.created_at >= since, LessonAttempt.status == "completed")
+    engines = dict(
+        (await session.execute(
+            select(func.coalesce(LessonAttempt.ai_model, "unknown"), func.count())
+            .where(*recent)
+            .group_by(LessonAttempt.ai_model)
+        )).all()
+    )
+
+    stage = func.json_each_text(LessonAttempt.stage_latency_ms).table_valued("key", "value").alias("stage")
+    rows = (await session.execute(
+        select(stage.c.key, func.count(), *_percentiles(cast(stage.c.value, Float)))
+        .select_from(LessonAttempt)
+        .join(stage, true())
+        .where(*recent)
+        .group_by(stage.c.key)
+        .order_by(stage.c.key)
+    )).all()
+    total = (await session.execute(
+        select(func.count(), *_percentiles(LessonAttempt.latency_ms))
+        .where(*recent, LessonAttempt.latency_ms.is_not(None))
+    )).one()
+
+    stages = [self._stage_latency(*row) for row in rows]
+    stages.append(self._stage_latency("total", *total))
+    return AttemptLatencyReport(since=since, attempts=sum(engines.values()), engines=engines, stages=stages)
+
+  def subscribe(self, user_id: UUID) -> asyncio.Queue[dict[str, Any]]:
+    queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=100)
+    self._subscribers[user_id].add(queue)
+    return queue
+
+  def unsubscribe(self, user_id: UUID, queue: asyncio.Queue[dict[str, Any]]) -> None:
+    queues = self._subscribers.get(user_id)
+    if queues is not None:
+      queues.discard(queue)
+      if not queues:
+        del self._subscribers[user_id]
+
+  def _enqueue(self, attempt_id: UUID) -> bool:
+    try:
+      self._queue.put_nowait(attempt_id)
+    except asyncio.QueueFull:
+      return False
+    self._queued.add(attempt_id)
+    return True
+
+  def _claimable(self) -> ColumnElement[bool]:
+    return or_(LessonAttempt.claimed_at.is_(None), LessonAttempt.claimed_at < datetime.utcnow() - self._claim_lease)
+
+  async def _sweep_periodically(self) -> None:
+    while True:
+      try:
+        queued = await self.sweep()
+        if queued:
+          logger.info("Queued %s unclaimed pending attempts.", queued)
+      except Exception:  # noqa: BLE001
+        logger.exception("Sweeping pending attempts failed.")
+      await asyncio.sleep(self._sweep_interval)
+
+  async def _work(self) -> None:
+    while True:
+      attempt_id = await self._queue.get()
+      self._queued.discard(attempt_id)
+      try:
+        await self._process(attempt_id)
+      except Exception as exc:  # noqa: BLE001
+        logger.exception("Background evaluation of attempt %s failed: %s", attempt_id, exc)
+        await self._mark_failed(attempt_id)
+      finally:
+        self._queue.task_done()
+
+  async def _process(self, attempt_id: UUID) -> None:
+    async with self._session_factory() as session:
+      claimed = await session.execute(
+          update(LessonAttempt)
+          .where(LessonAttempt.id == attempt_id, LessonAttempt.status == "pending", self._claimable())
+          .values(claimed_at=datetime.utcnow())
+          .returning(LessonAttempt.id),
+      )
+      if claimed.first() is None:
+        # already evaluated, or another worker holds the claim
+        return
+      await session.commit()
+      attempt = await session.get(LessonAttempt, attempt_id)
+      timer = StageTimer(attempt.stage_latency_ms)
+      timer.add("queue", self._waited_ms(attempt.created_at))
+      with timer.stage("lookup"):
+        lesson = await session.get(Lesson, attempt.lesson_id)
+        user_age = await session.scalar(select(User.age).where(User.id == attempt.user_id))
+      transcript = attempt.transcript or ""
+    # no connection is held while the model answers
+    with timer.stage("evaluation"):
+      evaluation = await self.evaluate(lesson=lesson, transcript=transcript, user_age=user_age)
+
+    async with self._session_factory() as session:
+      with timer.stage("lookup"):
+        attempt = await session.get(LessonAttempt, attempt_id, with_for_update=True)
+        if attempt is None or attempt.status != "pending":
+          return
+        user = await session.get(User, attempt.user_id)
+        lesson = await session.get(Lesson, attempt.lesson_id, options=[selectinload(Lesson.module)])
+      await self._apply(session, user, lesson, attempt, evaluation, timer)
+      with timer.stage("commit"):
+        await session.commit()
+      self._observe(timer)
+      self._publish(attempt.user_id, self._status_of(attempt))
+
+  async def _mark_failed(self, attempt_id: UUID) -> None:
+    async with self._session_factory() as session:
+      attempt = await session.get(LessonAttempt, attempt_id)
+      if attempt is None or attempt.status != "pending":
+        return
+      attempt.status = "failed"
+      await session.commit()
+      self._publish(attempt.user_id, self._status_of(attempt))
+
+  async def _apply(
+      self,
+      session: AsyncSession,
+      user: User,
+      lesson: Lesson,
+      attempt: LessonAttempt,
+      evaluation: dict[str, Any],
+      timer: StageTimer,
+      *,
+      previous_xp: int | None = None,
+  ) -> LessonAttemptResponse:
+    score = evaluation.get("score")
+    is_correct = bool(score is not None and score >= PASS_SCORE)
+    attempt.evaluation = evaluation
+    attempt.feedback = evaluation.get("encouragement")
+    attempt.score = score
+    attempt.is_correct = is_correct
+    attempt.ai_model = evaluation.get("source")
+    with timer.stage("persist"):
+      await session.flush()
+
+    with timer.stage("gamification"):
+      unlocked = await self._gamification.unlock_next_lessons(session, lesson.id, user.id) if is_correct else []
+      xp_awarded, leveled_up, achievements = await self._gamification.apply_attempt_outcome(
+          session, user, lesson, attempt, previous_xp=previous_xp
+      )
+
+    result = LessonAttemptResponse(
+        attempt_id=attempt.id,
+        lesson_id=lesson.id,
+        user_id=user.id,
+        is_correct=is_correct,
+        score=score,
+        feedback=LessonAttemptFeedback(
+            transcript=attempt.transcript,
+            pronunciation_score=score,
+            accuracy_score=evaluation.get("accuracy"),
+            fluency_score=evaluation.get("fluency"),
+            issues=evaluation.get("issues", []),
+            suggested_repetition=not is_correct,
+            encouragement=evaluation.get("encouragement"),
+        ),
+        xp_awarded=xp_awarded,
+        leveled_up=leveled_up,
+        unlocked_lessons=unlocked,
+        achievements_awarded=achievements,
+    )
+    attempt.status = "completed"
+    attempt.outcome = result.model_dump(mode="json")
+    attempt.stage_latency_ms = dict(timer.stages)
+    attempt.latency_ms = timer.total_ms
+    return result
+
+  @staticmethod
+  def _stage_latency(stage: str, count: int, p50: float | None, p95: float | None, p99: float | None) -> StageLatency:
+    return StageLatency(stage=stage, count=count, p50_ms=p50, p95_ms=p95, p99_ms=p99)
+
+  @staticmethod
+  def _observe(timer: StageTimer) -> None:
+    for stage, milliseconds in timer.stages.items():
+      attempt_stage_latency.observe(stage, milliseconds)
+    attempt_stage_latency.observe("total", timer.total_ms)
+
+  @staticmethod
+  def _waited_ms(created_at: datetime) -> float:
+    if created_at.tzinfo is None:
+      created_at = created_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (datetime.now(timezone.utc) - created_at).total_seconds() * 1000)
+
+  def _publish(self, user_id: UUID, message: AttemptStatusResponse) -> None:
+    payload = {"type": "attempt_result", **message.model_dump(mode="json")}
+    for queue in self._subscribers.get(user_id, ()):
+      try:
+        queue.put_nowait(payload)
+      except asyncio.QueueFull:
+        logger.warning("Dropping attempt result for a slow subscriber of user %s.", user_id)
+
+  @staticmethod
+  def _status_of(attempt: LessonAttempt) -> AttemptStatusResponse:
+    result = LessonAttemptResponse.model_validate(attempt.outcome) if attempt.outcome else None
+    return AttemptStatusResponse(attempt_id=attempt.id, status=attempt.status, result=result)
+
+
+def _percentiles(column: Any) -> list[Any]:
+  return [func.percentile_cont(q).within_group(column) for q in (0.5, 0.95, 0.99)]
+
+
+attempt_service = AttemptService(
+    openai_adapter,
+    gamification_engine,
+    async_session_factory,
+    workers=settings.attempt_workers,
+    queue_size=settings.attempt_queue_size,
+    claim_lease=settings.attempt_claim_lease_seconds,
+    sweep_interval=settings.attempt_sweep_seconds,
+)
@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import mmap
+import os
+import re
+import time
+import unicodedata
+import uuid
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from typing import Any
+
+from app.core.config import settings
+from app.core.logging import logger
+
+CHUNK_SIZE = 64 * 1024
+_KEY = re.compile(r"^[0-9a-f]{64}$")
+_SPACES = re.compile(r"\s+")
+
+
+def synthesis_key(*, text: str, voice: str, language: str) -> str:
+  """Content address of a synthesised clip: equal text, voice and language share one key."""
+  text = _SPACES.sub(" ", unicodedata.normalize("NFC", text)).strip()
+  parts = [voice.strip().lower(), language.strip().lower(), text]
+  return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode()).hexdigest()
+
+
+def is_cache_key(key: str) -> bool:
+  return bool(_KEY.match(key))
+
+
+def audio_media_type(head: bytes) -> str:
+  """Media type of an audio clip sniffed from its first bytes; the cache stores no metadata."""
+  if head.startswith(b"ID3") or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+    return "audio/mpeg"
+  if head.startswith(b"RIFF") and head[8:12] == b"WAVE":
+    return "audio/wav"
+  if head.startswith(b"OggS"):
+    return "audio/ogg"
+  if head.startswith(b"fLaC"):
+    return "audio/flac"
+  if head.startswith(b"\x1a\x45\xdf\xa3"):
+    return "audio/webm"
+  return "application/octet-stream"
+
+
+class CachedAudio:
+  """One cached clip, held either as bytes of the memory tier or as a read-only map of its file.
+
+  Mapped clips are read straight from the page cache, so serving one never
+  copies the whole file into the Python heap. ``close`` releases the map
+  and is safe to call more than once; the owner of a clip must call it,
+  since ``iter_bytes`` only does so once it has started and stops.
+  """
+
+  def __init__(self, key: str, buffer: bytes | mmap.mmap) -> None:
+    self.key = key
+    self._buffer = buffer
+    self.size = len(buffer)
+    self.media_type = audio_media_type(buffer[:16])
+    self.mapped = isinstance(buffer, mmap.mmap)
+
+  def read(self) -> bytes:
+    return self._buffer if isinstance(self._buffer, bytes) else self._buffer[:]
+
+  async def iter_bytes(self, start: int = 0, end: int | None = None) -> AsyncIterator[bytes]:
+    end = self.size if end is None else end
+    try:
+      if isinstance(self._buffer, bytes) and end - start <= CHUNK_SIZE:
+        yield self._buffer if (start, end) == (0, self.size) else self._buffer[start:end]
+        return
+      for offset in range(start, end, CHUNK_SIZE):
+        yield self._buffer[offset:min(offset + CHUNK_SIZE, end)]
+    finally:
+      self.close()
+
+  def close(self) -> None:
+    if isinstance(self._buffer, mmap.mmap) and not self._buffer.closed:
+      self._buffer.close()
+
+
+class AudioCache:
+  """Content-addressed cache of synthesised audio with a memory and a disk tier.
+
+  Clips are stored under their ``synthesis_key`` as ``<dir>/<key[:2]>/<key>``
+  and written atomically, so workers sharing the directory never see a
+  partial file. Both tiers are bounded in bytes and evict the least recently
+  used clips; a disk hit refreshes the file's mtime, which is the order the
+  disk index is rebuilt in on start. Small clips found on disk are promoted
+  to memory; larger ones are always served through ``mmap``. Other workers'
+  writes are picked up on their first lookup and only count towards this
+  worker's disk budget from then on.
+  """
+
+  def __init__(self, directory: str, *, memory_bytes: int, disk_bytes: int) -> None:
+    self._directory = directory
+    self._memory_bytes = memory_bytes
+    self._disk_bytes = disk_bytes
+    # clips larger than this are never held in memory
+    self._memory_item_bytes = memory_bytes // 16
+    self._memory: OrderedDict[str, bytes] = OrderedDict()
+    self._memory_used = 0
+    self._disk: OrderedDict[str, int] = OrderedDict()
+    self._disk_used = 0
+    self._initialized = False
+    self.memory_hits = 0
+    self.disk_hits = 0
+    self.misses = 0
+    self.evictions = 0
+
+  async def initialize(self) -> None:
+    if self._initialized:
+      return
+    entries = await asyncio.to_thread(self._scan)
+    for key, size in entries:
+      self._disk[key] = size
+      self._disk_used += size
+    self._initialized = True
+    logger.info("Audio cache: %s clips, %s bytes on disk in %s", len(self._disk), self._disk_used, self._directory)
+    await self._evict_disk()
+
+  def contains(self, key: str) -> bool:
+    return key in self._memory or key in self._disk or self._adopt(key)
+
+  async def get(self, key: str) -> CachedAudio | None:
+    data = self._memory.get(key)
+    if data is not None:
+      self._memory.move_to_end(key)
+      self.memory_hits += 1
+      return CachedAudio(key, data)
+    if key not in self._disk and not self._adopt(key):
+      self.misses += 1
+      return None
+    path = self._path(key)
+    try:
+      with open(path, "rb") as handle:
+        buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+      os.utime(path)
+    except (OSError, ValueError):
+      # evicted by another worker, or an empty file
+      self._forget(key)
+      self.misses += 1
+      return None
+    self._disk.move_to_end(key)
+    self.disk_hits += 1
+    if len(buffer) <= self._memory_item_bytes:
+      data = buffer[:]
+      buffer.close()
+      self._remember(key, data)
+      return CachedAudio(key, data)
+    return CachedAudio(key, buffer)
+
+  async def put(self, key: str, data: bytes) -> None:
+    if not data:
+      return
+    await asyncio.to_thread(self._write, key, data)
+    await self._stored(key, len(data), data)
+
+  def writer(self, key: str) -> ClipWriter:
+    """Store a clip chunk by chunk, as it is relayed from upstream."""
+    return ClipWriter(self, key)
+
+  async def _stored(self, key: str, size: int, data: bytes | None = None) -> None:
+    if key in self._disk:
+      self._disk_used -= self._disk.pop(key)
+    self._disk[key] = size
+    self._disk_used += size
+    if data is not None and size <= self._memory_item_bytes:
+      self._remember(key, data)
+    await self._evict_disk()
+
+  def metrics(self) -> dict[str, Any]:
+    lookups = self.memory_hits + self.disk_hits + self.misses
+    return {
+        "memory_clips": len(self._memory),
+        "memory_bytes": self._memory_used,
+        "disk_clips": len(self._disk),
+        "disk_bytes": self._disk_used,
+        "memory_hits": self.memory_hits,
+        "disk_hits": self.disk_hits,
+        "misses": self.misses,
+        "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        "evictions": self.evictions,
+    }
+
+  def _path(self, key: str) -> str:
+    return os.path.join(self._directory, key[:2], key)
+
+  def _adopt(self, key: str) -> bool:
+    """Index a clip another worker wrote since this one started."""
+    try:
+      size = os.stat(self._path(key)).st_size
+    except OSError:
+      return False
+    self._disk[key] = size
+    self._disk_used += size
+    return True
+
+  def _forget(self, key: str) -> None:
+    if key in self._disk:
+      self._disk_used -= self._disk.pop(key)
+    if key in self._memory:
+      self._memory_used -= len(self._memory.pop(key))
+
+  def _remember(self, key: str, data: bytes) -> None:
+    if key in self._memory:
+      self._memory.move_to_end(key)
+      return
+    self._memory[key] = data
+    self._memory_used += len(data)
+    while self._memory_used > self._memory_bytes:
+      _, evicted = self._memory.popitem(last=False)
+      self._memory_used -= len(evicted)
+
+  async def _evict_disk(self) -> None:
+    victims: list[str] = []
+    # the newest clip stays even when it alone exceeds the budget
+    while self._disk_used > self._disk_bytes and len(self._disk) > 1:
+      key, size = self._disk.popitem(last=False)
+      self._disk_used -= size
+      victims.append(key)
+    if victims:
+      self.evictions += len(victims)
+      await asyncio.to_thread(self._remove, victims)
+
+  def _write(self, key: str, data: bytes) -> None:
+    partial = self._partial(key)
+    with open(partial, "wb") as handle:
+      handle.write(data)
+    os.replace(partial, self._path(key))
+
+  def _partial(self, key: str) -> str:
+    path = self._path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return f"{path}.{uuid.uuid4().hex}.tmp"
+
+  def _remove(self, keys: list[str]) -> None:
+    for key in keys:
+      try:
+        os.unlink(self._path(key))
+      except FileNotFoundError:
+        pass
+
+  def _scan(self) -> list[tuple[str, int]]:
+    os.makedirs(self._directory, exist_ok=True)
+    stale = time.time() - 3600
+    entries: list[tuple[float, str, int]] = []
+    for shard in os.scandir(self._directory):
+      if not shard.is_dir():
+        continue
+      for entry in os.scandir(shard.path):
+        if entry.name.endswith(".tmp"):
+          if entry.stat().st_mtime < stale:
+            # left behind by a worker that died mid-write
+            os.unlink(entry.path)
+          continue
+        if is_cache_key(entry.name):
+          stat = entry.stat()
+          entries.append((stat.st_mtime, entry.name, stat.st_size))
+    entries.sort()
+    return [(key, size) for _, key, size in entries]
+
+
+class ClipWriter:
+  """Appends a clip to a temporary file and publishes it under its key on ``commit``.
+
+  Chunks are written off the event loop; ``abort`` drops the partial file,
+  so a relay that breaks off never leaves a truncated clip in the cache.
+  """
+
+  def __init__(self, cache: AudioCache, key: str) -> None:
+    self._cache = cache
+    self._key = key
+    self._partial: str | None = None
+    self._handle: Any = None
+    self.size = 0
+
+  async def write(self, chunk: bytes) -> None:
+    await asyncio.to_thread(self._append, chunk)
+    self.size += len(chunk)
+
+  async def commit(self) -> None:
+    if self._handle is None:
+      return
+    await asyncio.to_thread(self._publish)
+    await self._cache._stored(self._key, self.size)
+
+  def abort(self) -> None:
+    if self._handle is None:
+      return
+    self._handle.close()
+    self._handle = None
+    try:
+      os.unlink(self._partial)
+    except FileNotFoundError:
+      pass
+
+  def _append(self, chunk: bytes) -> None:
+    if self._handle is None:
+      self._partial = self._cache._partial(self._key)
+      self._handle = open(self._partial, "wb")
+    self._handle.write(chunk)
+
+  def _publish(self) -> None:
+    self._handle.close()
+    self._handle = None
+    os.replace(self._partial, self._cache._path(self._key))
+
+
+audio_cache = AudioCache(
+    settings.tts_cache_dir,
+    memory_bytes=settings.tts_cache_memory_bytes,
+    disk_bytes=settings.tts_cache_disk_bytes,
+)
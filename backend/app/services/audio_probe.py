@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import struct
+from abc import ABC, abstractmethod
+
+WAV_TYPES = frozenset(("audio/wav", "audio/wave", "audio/x-wav", "audio/vnd.wave"))
+WEBM_TYPES = frozenset(("audio/webm", "video/webm"))
+_WAV_HEADER_LIMIT = 64 * 1024
+
+
+class UnsupportedAudio(ValueError):
+  """The upload is not a WAV or WebM stream this module can read."""
+
+
+class AudioTooLong(ValueError):
+  """The upload is longer than the allowed duration."""
+
+
+class DurationGuard(ABC):
+  """Checks the duration of an audio upload chunk by chunk, without decoding it.
+
+  ``feed`` raises ``AudioTooLong`` as soon as the header or the stream itself
+  shows the clip exceeds ``max_seconds``, so the rest of an oversized upload
+  is never read.
+  """
+
+  content_type: str
+  filename: str
+
+  def __init__(self, max_seconds: float) -> None:
+    self.max_seconds = max_seconds
+    self.duration: float | None = None
+
+  @staticmethod
+  def for_content_type(content_type: str, max_seconds: float) -> DurationGuard:
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type in WAV_TYPES:
+      return WavDurationGuard(max_seconds)
+    if media_type in WEBM_TYPES:
+      return WebmDurationGuard(max_seconds)
+    raise UnsupportedAudio(f"Unsupported audio type {media_type or 'missing'}; send audio/wav or audio/webm.")
+
+  def feed(self, chunk: bytes) -> None:
+    try:
+      self._feed(chunk)
+    except struct.error as exc:
+      raise UnsupportedAudio("Malformed audio header.") from exc
+
+  def finish(self) -> None:
+    """Called after the last chunk; raises if the stream ended before its header was complete."""
+    try:
+      self._finish()
+    except struct.error as exc:
+      raise UnsupportedAudio("Malformed audio header.") from exc
+
+  @abstractmethod
+  def _feed(self, chunk: bytes) -> None:
+    """Parse one more chunk of the upload."""
+
+  def _finish(self) -> None:
+    pass
+
+  def _check(self, seconds: float) -> None:
+    self.duration = max(self.duration or 0.0, seconds)
+    if seconds > self.max_seconds:
+      raise AudioTooLong(f"Audio is longer than {self.max_seconds:g} seconds.")
+
+
+class WavDurationGuard(DurationGuard):
+  """RIFF/WAVE: duration is the data chunk size over the byte rate of the fmt chunk.
+
+  Recorders that stream WAV leave the data size at 0 or 0xFFFFFFFF, and a
+  header may simply be wrong, so the audio bytes actually received are
+  counted against the byte rate as well.
+  """
+
+  content_type = "audio/wav"
+  filename = "audio.wav"
+
+  def __init__(self, max_seconds: float) -> None:
+    super().__init__(max_seconds)
+    self._header = bytearray()
+    self._byte_rate: int | None = None
+    self._audio_bytes = 0
+    self._in_data = False
+
+  def _feed(self, chunk: bytes) -> None:
+    if self._in_data:
+      self._count(len(chunk))
+      return
+    self._header += chunk
+    offset = self._parse_header()
+    if offset is not None:
+      self._in_data = True
+      remaining = len(self._header) - offset
+      self._header = bytearray()
+      self._count(remaining)
+    elif len(self._header) > _WAV_HEADER_LIMIT:
+      raise UnsupportedAudio("WAV header has no data chunk.")
+
+  def _finish(self) -> None:
+    if not self._in_data:
+      raise UnsupportedAudio("Incomplete WAV header.")
+
+  def _count(self, size: int) -> None:
+    self._audio_bytes += size
+    self._check(self._audio_bytes / self._byte_rate)
+
+  def _parse_header(self) -> int | None:
+    """Return the offset of the audio samples once the fmt and data chunk headers are in."""
+    header = self._header
+    if len(header) < 12:
+      return None
+    if header[:4] not in (b"RIFF", b"RF64") or header[8:12] != b"WAVE":
+      raise UnsupportedAudio("Not a RIFF/WAVE stream.")
+    offset = 12
+    while offset + 8 <= len(header):
+      chunk_id = bytes(header[offset:offset + 4])
+      (size,) = struct.unpack_from("<I", header, offset + 4)
+      if chunk_id == b"fmt ":
+        # the byte rate is the 4 bytes after the chunk header, format, channels and sample rate
+        if offset + 20 > len(header):
+          return None
+        (byte_rate,) = struct.unpack_from("<I", header, offset + 16)
+        if byte_rate == 0:
+          raise UnsupportedAudio("WAV header has a zero byte rate.")
+        self._byte_rate = byte_rate
+      elif chunk_id == b"data":
+        if self._byte_rate is None:
+          raise UnsupportedAudio("WAV data chunk precedes its fmt chunk.")
+        if size not in (0, 0xFFFFFFFF):
+          self._check(size / self._byte_rate)
+        return offset + 8
+      offset += 8 + size + (size & 1)
+    return None
+
+
+# EBML element ids used to find the duration and the timestamps of a WebM stream
+_EBML = 0x1A45DFA3
+_SEGMENT = 0x18538067
+_INFO = 0x1549A966
+_TIMECODE_SCALE = 0x2AD7B1
+_DURATION = 0x4489
+_CLUSTER = 0x1F43B675
+_CLUSTER_TIMECODE = 0xE7
+_SIMPLE_BLOCK = 0xA3
+_BLOCK_GROUP = 0xA0
+_BLOCK = 0xA1
+_CONTAINERS = frozenset((_SEGMENT, _INFO, _CLUSTER, _BLOCK_GROUP))
+_UNKNOWN_SIZE = -1
+
+
+class WebmDurationGuard(DurationGuard):
+  """WebM/Matroska: the Info Duration when present, otherwise the block timestamps.
+
+  ``MediaRecorder`` writes live WebM without a Duration, so the stream is
+  walked as EBML: Segment, Info, Cluster and BlockGroup are entered, the
+  timecode scale, duration, cluster timecodes and block offsets are read,
+  and every other payload (the audio frames) is skipped without being kept.
+  """
+
+  content_type = "audio/webm"
+  filename = "audio.webm"
+
+  def __init__(self, max_seconds: float) -> None:
+    super().__init__(max_seconds)
+    self._pending = bytearray()
+    self._skip = 0
+    self._read: tuple[int, int] | None = None
+    self._timecode_scale = 1_000_000
+    self._cluster_timecode = 0
+    self._seen_header = False
+
+  def _feed(self, chunk: bytes) -> None:
+    view = memoryview(chunk)
+    while view:
+      if self._skip:
+        step = min(self._skip, len(view))
+        self._skip -= step
+        view = view[step:]
+        continue
+      self._pending += view
+      view = memoryview(b"")
+      self._parse()
+
+  def _finish(self) -> None:
+    if not self._seen_header:
+      raise UnsupportedAudio("Not a WebM stream.")
+
+  def _parse(self) -> None:
+    while True:
+      if self._read is not None:
+        element_id, size = self._read
+        needed = size if element_id not in (_SIMPLE_BLOCK, _BLOCK) else min(size, 10)
+        if len(self._pending) < needed:
+          return
+        payload = bytes(self._pending[:needed])
+        del self._pending[:needed]
+        self._read = None
+        self._handle(element_id, payload)
+        if needed < size:
+          self._skip_bytes(size - needed)
+        if self._skip:
+          return
+        continue
+
+      header = self._element_header()
+      if header is None:
+        return
+      element_id, size = header
+      if not self._seen_header:
+        if element_id != _EBML:
+          raise UnsupportedAudio("Not a WebM stream.")
+        self._seen_header = True
+      if element_id in _CONTAINERS:
+        continue
+      if size == _UNKNOWN_SIZE:
+        raise UnsupportedAudio("WebM element of unknown size.")
+      if element_id in (_TIMECODE_SCALE, _DURATION, _CLUSTER_TIMECODE, _SIMPLE_BLOCK, _BLOCK):
+        self._read = (element_id, size)
+        continue
+      self._skip_bytes(size)
+      if self._skip:
+        return
+
+  def _skip_bytes(self, size: int) -> None:
+    buffered = min(size, len(self._pending))
+    del self._pending[:buffered]
+    self._skip = size - buffered
+
+  def _element_header(self) -> tuple[int, int] | None:
+    data = self._pending
+    id_length = _vint_length(data, 0, 4)
+    if id_length is None:
+      return None
+    size_length = _vint_length(data, id_length, 8)
+    if size_length is None:
+      return None
+    element_id = int.from_bytes(data[:id_length], "big")
+    raw_size = int.from_bytes(data[id_length:id_length + size_length], "big")
+    size = raw_size & ((1 << (7 * size_length)) - 1)
+    if size == (1 << (7 * size_length)) - 1:
+      size = _UNKNOWN_SIZE
+    del data[:id_length + size_length]
+    return element_id, size
+
+  def _handle(self, element_id: int, payload: bytes) -> None:
+    if element_id == _TIMECODE_SCALE:
+      self._timecode_scale = int.from_bytes(payload, "big") or 1_000_000
+    elif element_id == _DURATION:
+      ticks = struct.unpack(">f" if len(payload) == 4 else ">d", payload)[0]
+      self._check(ticks * self._timecode_scale / 1e9)
+    elif element_id == _CLUSTER_TIMECODE:
+      self._cluster_timecode = int.from_bytes(payload, "big")
+      self._check(self._cluster_timecode * self._timecode_scale / 1e9)
+    else:
+      # block header: track number (vint), then a signed 16-bit offset from the cluster timecode
+      track_length = _vint_length(payload, 0, 8)
+      if track_length is None or len(payload) < track_length + 2:
+        raise UnsupportedAudio("Truncated WebM block.")
+      (relative,) = struct.unpack_from(">h", payload, track_length)
+      self._check((self._cluster_timecode + relative) * self._timecode_scale / 1e9)
+
+
+def _vint_length(data: bytes | bytearray, offset: int, max_length: int) -> int | None:
+  """Length of the EBML variable-size integer at ``offset``, or ``None`` if it is not fully buffered."""
+  if offset >= len(data):
+    return None
+  first = data[offset]
+  for length in range(1, max_length + 1):
+    if first & (0x80 >> (length - 1)):
+      return length if offset + length <= len(data) else None
+  raise UnsupportedAudio("Invalid EBML variable-size integer.")
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from app.core.logging import logger
+
+CLOSED = "closed"
+OPEN = "open"
+
+
+class CircuitBreaker:
+  """Stops calling an upstream after repeated failures and probes it until it recovers.
+
+  A failure is an error or a call slower than ``slow_call_seconds``;
+  ``failure_threshold`` consecutive ones open the breaker. While open,
+  ``allow()`` refuses every call and a background task runs ``probe`` after
+  ``probe_interval`` seconds, doubling the interval up to ``max_probe_interval``
+  after each failed probe. The first successful probe closes the breaker, so
+  user requests are never used to test a struggling upstream.
+  """
+
+  def __init__(
+      self,
+      name: str,
+      probe: Callable[[], Awaitable[Any]],
+      *,
+      failure_threshold: int,
+      slow_call_seconds: float,
+      probe_interval: float,
+      max_probe_interval: float = 120.0,
+  ) -> None:
+    self.name = name
+    self._probe = probe
+    self._failure_threshold = failure_threshold
+    self._slow_call_seconds = slow_call_seconds
+    self._probe_interval = probe_interval
+    self._max_probe_interval = max_probe_interval
+    self._state = CLOSED
+    self._consecutive_failures = 0
+    self._opened_at: float | None = None
+    self._prober: asyncio.Task | None = None
+    self.opened = 0
+    self.rejected = 0
+
+  @property
+  def state(self) -> str:
+    return self._state
+
+  def allow(self) -> bool:
+    if self._state == CLOSED:
+      return True
+    self.rejected += 1
+    return False
+
+  def record_success(self, elapsed: float) -> None:
+    if elapsed > self._slow_call_seconds:
+      self.record_failure()
+    else:
+      self._consecutive_failures = 0
+
+  def record_failure(self) -> None:
+    self._consecutive_failures += 1
+    if self._state == CLOSED and self._consecutive_failures >= self._failure_threshold:
+      self._open()
+
+  async def close(self) -> None:
+    if self._prober is not None:
+      self._prober.cancel()
+      await asyncio.gather(self._prober, return_exceptions=True)
+      self._prober = None
+
+  def metrics(self) -> dict[str, Any]:
+    return {
+        "state": self._state,
+        "consecutive_failures": self._consecutive_failures,
+        "open_for_seconds": round(time.monotonic() - self._opened_at, 1) if self._opened_at is not None else None,
+        "opened": self.opened,
+        "rejected": self.rejected,
+    }
+
+  def _open(self) -> None:
+    self._state = OPEN
+    self._opened_at = time.monotonic()
+    self.opened += 1
+    logger.warning("%s circuit opened after %s consecutive failures.", self.name, self._consecutive_failures)
+    if self._prober is None or self._prober.done():
+      self._prober = asyncio.create_task(self._probe_until_closed(), name=f"{self.name}-breaker-probe")
+
+  async def _probe_until_closed(self) -> None:
+    interval = self._probe_interval
+    while self._state == OPEN:
+      await asyncio.sleep(interval)
+      started = time.monotonic()
+      try:
+        async with asyncio.timeout(self._slow_call_seconds):
+          await self._probe()
+      except Exception as exc:  # noqa: BLE001
+        logger.info("%s probe failed: %s", self.name, exc or type(exc).__name__)
+        interval = min(interval * 2, self._max_probe_interval)
+        continue
+      logger.info("%s recovered (probe took %.2fs); circuit closed.", self.name, time.monotonic() - started)
+      self._state = CLOSED
+      self._consecutive_failures = 0
+      self._opened_at = None
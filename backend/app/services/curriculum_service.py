@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Mapping
+from uuid import UUID
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.models import CurriculumVersion, LearningPath, Lesson, Module
+from app.services.lesson_index import LessonBodyCache, LessonIndex, LessonRef
+
+CURRICULUM_VERSION_KEY = "curriculum"
+
+
+@dataclass(frozen=True)
+class CurriculumGraph:
+  """Immutable snapshot of path -> ordered modules -> ordered lessons."""
+
+  version: int
+  path_ids: Mapping[str, UUID]
+  path_modules: Mapping[UUID, tuple[UUID, ...]]
+  index: LessonIndex
+  built_at: float = field(default_factory=time.time)
+
+  @property
+  def lesson_count(self) -> int:
+    return len(self.index)
+
+  def path_id(self, key: str) -> UUID | None:
+    return self.path_ids.get(key)
+
+  def modules(self, learning_path_id: UUID) -> tuple[UUID, ...]:
+    return self.path_modules.get(learning_path_id, ())
+
+  def lessons_of_module(self, module_id: UUID) -> tuple[UUID, ...]:
+    bounds = self.index.module_range(module_id)
+    if bounds is None:
+      return ()
+    return tuple(self.index.lesson_id(position) for position in range(*bounds))
+
+  def lesson(self, lesson_id: UUID) -> LessonRef | None:
+    position = self.index.position(lesson_id)
+    return self.index.ref(position) if position is not None else None
+
+  def first_lesson(self, learning_path_id: UUID) -> LessonRef | None:
+    bounds = self.index.path_range(learning_path_id)
+    return self.index.ref(bounds[0]) if bounds else None
+
+  def last_lesson(self, learning_path_id: UUID) -> LessonRef | None:
+    bounds = self.index.path_range(learning_path_id)
+    return self.index.ref(bounds[1] - 1) if bounds else None
+
+  def next_lesson(self, lesson_id: UUID) -> LessonRef | None:
+    """Return the lesson after ``lesson_id`` in path order, crossing module boundaries."""
+    ref = self.lesson(lesson_id)
+    if ref is None:
+      return None
+    _, path_end = self.index.path_range(ref.learning_path_id)
+    position = self.index.position(lesson_id) + 1
+    return self.index.ref(position) if position < path_end else None
+
+  def previous_lesson(self, lesson_id: UUID) -> LessonRef | None:
+    ref = self.lesson(lesson_id)
+    if ref is None or ref.path_position == 0:
+      return None
+    return self.index.ref(self.index.position(lesson_id) - 1)
+
+  def is_first_in_module(self, lesson_id: UUID) -> bool:
+    position = self.index.position(lesson_id)
+    return position is not None and self.index.module_start(position) == position
+
+
+class CurriculumCache:
+  """Per-worker cache of the curriculum graph, invalidated through a version counter row.
+
+  Each worker re-reads ``curriculum_versions`` at most once per
+  ``check_interval`` seconds; when the stored version moved on, the graph is
+  rebuilt from a single ordered query and swapped in as a whole.
+  """
+
+  def __init__(self, check_interval: float, body_cache_size: int) -> None:
+    self._check_interval = check_interval
+    self.bodies = LessonBodyCache(body_cache_size)
+    self._graph: CurriculumGraph | None = None
+    self._checked_at = 0.0
+    self._lock = asyncio.Lock()
+    self._hits = 0
+    self._misses = 0
+    self._rebuilds = 0
+    self._last_rebuild_ms = 0.0
+    self._total_rebuild_ms = 0.0
+
+  async def get(self, session: AsyncSession) -> CurriculumGraph:
+    graph = self._graph
+    now = time.monotonic()
+    if graph is not None and now - self._checked_at < self._check_interval:
+      self._hits += 1
+      return graph
+    version = await self._read_version(session)
+    self._checked_at = now
+    if graph is not None and graph.version == version:
+      self._hits += 1
+      return graph
+    self._misses += 1
+    return await self._rebuild(session, version)
+
+  async def refresh(self, session: AsyncSession) -> CurriculumGraph:
+    """Re-check the version immediately, e.g. when a lesson id is unknown to the cached graph."""
+    self._checked_at = 0.0
+    return await self.get(session)
+
+  async def lesson(self, session: AsyncSession, lesson_id: UUID) -> LessonRef | None:
+    ref = (await self.get(session)).lesson(lesson_id)
+    if ref is None:
+      ref = (await self.refresh(session)).lesson(lesson_id)
+    return ref
+
+  async def bump_version(self, session: AsyncSession) -> int:
+    """Increment the shared version in the caller's transaction so it commits with the content."""
+    result = await session.execute(
+        update(CurriculumVersion)
+        .where(CurriculumVersion.key == CURRICULUM_VERSION_KEY)
+        .values(version=CurriculumVersion.version + 1)
+        .returning(CurriculumVersion.version),
+    )
+    version = result.scalar_one_or_none()
+    if version is None:
+      session.add(CurriculumVersion(key=CURRICULUM_VERSION_KEY, version=1))
+      await session.flush()
+      version = 1
+    return version
+
+  async def rebuild(self, session: AsyncSession) -> CurriculumGraph:
+    """Rebuild from committed content; call after the transaction that bumped the version."""
+    return await self._rebuild(session, await self._read_version(session))
+
+  def metrics(self) -> dict[str, Any]:
+    graph = self._graph
+    lookups = self._hits + self._misses
+    return {
+        "version": graph.version if graph else None,
+        "lessons": graph.lesson_count if graph else 0,
+        "hits": self._hits,
+        "misses": self._misses,
+        "hit_ratio": self._hits / lookups if lookups else None,
+        "rebuilds": self._rebuilds,
+        "last_rebuild_ms": round(self._last_rebuild_ms, 3),
+        "total_rebuild_ms": round(self._total_rebuild_ms, 3),
+        "cached_lesson_bodies": len(self.bodies),
+        "lesson_body_hits": self.bodies.hits,
+        "lesson_body_misses": self.bodies.misses,
+    }
+
+  async def _rebuild(self, session: AsyncSession, version: int) -> CurriculumGraph:
+    async with self._lock:
+      graph = self._graph
+      if graph is not None and graph.version == version:
+        return graph
+      started = time.perf_counter()
+      graph = await self._build(session, version)
+      elapsed_ms = (time.perf_counter() - started) * 1000
+      self._graph = graph
+      self._rebuilds += 1
+      self._last_rebuild_ms = elapsed_ms
+      self._total_rebuild_ms += elapsed_ms
+    logger.info("Curriculum graph v%s rebuilt with %s lessons in %.1f ms.", version, graph.lesson_count, elapsed_ms)
+    return graph
+
+  @staticmethod
+  async def _read_version(session: AsyncSession) -> int:
+    version = await session.scalar(
+        select(CurriculumVersion.version).where(CurriculumVersion.key == CURRICULUM_VERSION_KEY),
+    )
+    return version or 0
+
+  @staticmethod
+  async def _build(session: AsyncSession, version: int) -> CurriculumGraph:
+    path_rows = await session.execute(select(LearningPath.key, LearningPath.id))
+    path_ids = {sys.intern(key): path_id for key, path_id in path_rows.all()}
+
+    path_modules: dict[UUID, list[UUID]] = {path_id: [] for path_id in path_ids.values()}
+    module_rows = await session.execute(
+        select(Module.learning_path_id, Module.id).order_by(Module.learning_path_id, Module.order_index),
+    )
+    for learning_path_id, module_id in module_rows.all():
+      path_modules.setdefault(learning_path_id, []).append(module_id)
+
+    rows = await session.execute(
+        select(
+            Lesson.id,
+            Lesson.key,
+            Lesson.module_id,
+            Module.learning_path_id,
+            Module.order_index,
+            Lesson.order_index,
+            Lesson.xp_reward,
+        )
+        .join(Module, Module.id == Lesson.module_id)
+        .order_by(Module.learning_path_id, Module.order_index, Lesson.order_index),
+    )
+
+    return CurriculumGraph(
+        version=version,
+        path_ids=MappingProxyType(path_ids),
+        path_modules=MappingProxyType({key: tuple(value) for key, value in path_modules.items()}),
+        index=LessonIndex(rows.tuples()),
+    )
+
+
+curriculum_cache = CurriculumCache(
+    check_interval=settings.curriculum_version_check_seconds,
+    body_cache_size=settings.lesson_body_cache_size,
+)
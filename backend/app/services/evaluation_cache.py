@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any
+from uuid import UUID
+
+from redis import asyncio as redis_asyncio
+from redis.exceptions import RedisError
+
+from app.core.age import age_bracket
+from app.core.config import settings
+from app.core.logging import logger
+
+# o‘, o’, oʻ, oʼ, o`, o´ and o' are all typed for the same Uzbek letter
+_APOSTROPHES = str.maketrans({char: "'" for char in "‘’ʻʼ`´′"})
+_NOT_SPOKEN = re.compile(r"[^\w' ]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_transcript(text: str | None) -> str:
+  """Fold case, apostrophe variants, punctuation and whitespace so equal utterances share a key."""
+  if not text:
+    return ""
+  text = unicodedata.normalize("NFC", text).casefold().translate(_APOSTROPHES)
+  text = _NOT_SPOKEN.sub(" ", text)
+  return _SPACES.sub(" ", text).strip()
+
+
+def evaluation_key(
+    *,
+    lesson_id: UUID | None,
+    model: str,
+    transcript: str | None,
+    target_letter: str | None,
+    example_words: list[str],
+    user_age: int | None,
+) -> str:
+  """Key of an evaluation: inputs the model would answer alike map to the same key, scoped by lesson."""
+  parts = [
+      model,
+      normalize_transcript(target_letter),
+      [normalize_transcript(word) for word in example_words[:4]],
+      age_bracket(user_age),
+      normalize_transcript(transcript),
+  ]
+  digest = hashlib.sha1(json.dumps(parts, ensure_ascii=False).encode()).hexdigest()
+  return f"{lesson_id or '-'}:{digest}"
+
+
+class EvaluationCache:
+  """Two-tier cache of pronunciation evaluations keyed by normalised inputs.
+
+  The first tier is a bounded in-process LRU with a short TTL; the optional
+  second tier is Redis, shared by every worker. Keys are scoped by lesson so
+  all entries of a lesson can be dropped when its content or prompts change:
+  every Redis entry is also listed in a per-lesson set, which invalidation
+  deletes along with its members. Other workers' memory tiers let such
+  entries expire within their TTL.
+  """
+
+  def __init__(
+      self,
+      redis_url: str | None,
+      *,
+      max_entries: int,
+      memory_ttl_seconds: float,
+      redis_ttl_seconds: int,
+      prefix: str = "bolajon:evaluation:",
+  ) -> None:
+    self._redis_url = redis_url
+    self._redis: redis_asyncio.Redis | None = None
+    self._max_entries = max_entries
+    self._memory_ttl = memory_ttl_seconds
+    self._redis_ttl = redis_ttl_seconds
+    self._prefix = prefix
+    self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+    self._keys_by_lesson: dict[str, set[str]] = {}
+    self.memory_hits = 0
+    self.redis_hits = 0
+    self.misses = 0
+    self.invalidations = 0
+
+  @property
+  def redis(self) -> redis_asyncio.Redis | None:
+    if self._redis is None and self._redis_url:
+      self._redis = redis_asyncio.from_url(
+          self._redis_url,
+          socket_timeout=settings.redis_socket_timeout_seconds,
+          socket_connect_timeout=settings.redis_socket_timeout_seconds,
+      )
+    return self._redis
+
+  async def close(self) -> None:
+    if self._redis is not None:
+      await self._redis.aclose()
+      self._redis = None
+    self._entries.clear()
+    self._keys_by_lesson.clear()
+
+  async def get(self, key: str) -> dict[str, Any] | None:
+    entry = self._entries.get(key)
+    if entry is not None:
+      expires_at, value = entry
+      if expires_at > time.monotonic():
+        self._entries.move_to_end(key)
+        self.memory_hits += 1
+        return value
+      self._discard(key)
+
+    if self.redis is not None:
+      try:
+        raw = await self.redis.get(self._prefix + key)
+      except RedisError as exc:
+        logger.warning("Evaluation cache read failed: %s", exc)
+        raw = None
+      if raw is not None:
+        value = json.loads(raw)
+        self._remember(key, value)
+        self.redis_hits += 1
+        return value
+
+    self.misses += 1
+    return None
+
+  async def put(self, key: str, value: dict[str, Any]) -> None:
+    self._remember(key, value)
+    if self.redis is not None:
+      index = self._lesson_index(key.partition(":")[0])
+      try:
+        async with self.redis.pipeline(transaction=False) as pipe:
+          pipe.set(self._prefix + key, json.dumps(value, ensure_ascii=False), ex=self._redis_ttl)
+          # refreshed on every write, so the index never expires before one of its entries
+          pipe.sadd(index, self._prefix + key)
+          pipe.expire(index, self._redis_ttl)
+          await pipe.execute()
+      except RedisError as exc:
+        logger.warning("Evaluation cache write failed: %s", exc)
+
+  async def invalidate_lesson(self, lesson_id: UUID) -> int:
+    """Drop every cached evaluation of a lesson and return how many entries were removed."""
+    lesson = str(lesson_id)
+    keys = self._keys_by_lesson.pop(lesson, set())
+    for key in keys:
+      self._entries.pop(key, None)
+    removed = len(keys)
+    if self.redis is not None:
+      index = self._lesson_index(lesson)
+      try:
+        stale = await self.redis.smembers(index)
+        if stale:
+          removed = max(removed, await self.redis.delete(*stale))
+        await self.redis.delete(index)
+      except RedisError as exc:
+        logger.warning("Evaluation cache invalidation failed for lesson %s: %s", lesson, exc)
+    self.invalidations += 1
+    return removed
+
+  def metrics(self) -> dict[str, Any]:
+    lookups = self.memory_hits + self.redis_hits + self.misses
+    hits = self.memory_hits + self.redis_hits
+    return {
+        "entries": len(self._entries),
+        "max_entries": self._max_entries,
+        "redis": self._redis_url is not None,
+        "memory_hits": self.memory_hits,
+        "redis_hits": self.redis_hits,
+        "misses": self.misses,
+        "hit_ratio": round(hits / lookups, 4) if lookups else None,
+        "invalidations": self.invalidations,
+    }
+
+  def _lesson_index(self, lesson: str) -> str:
+    """Redis set of the entry keys written for ``lesson``."""
+    return f"{self._prefix}lesson:{lesson}"
+
+  def _remember(self, key: str, value: dict[str, Any]) -> None:
+    self._entries[key] = (time.monotonic() + self._memory_ttl, value)
+    self._entries.move_to_end(key)
+    self._keys_by_lesson.setdefault(key.partition(":")[0], set()).add(key)
+    while len(self._entries) > self._max_entries:
+      oldest = next(iter(self._entries))
+      self._discard(oldest)
+
+  def _discard(self, key: str) -> None:
+    self._entries.pop(key, None)
+    lesson = key.partition(":")[0]
+    keys = self._keys_by_lesson.get(lesson)
+    if keys is not None:
+      keys.discard(key)
+      if not keys:
+        del self._keys_by_lesson[lesson]
+
+
+evaluation_cache = EvaluationCache(
+    settings.redis_url,
+    max_entries=settings.evaluation_cache_size,
+    memory_ttl_seconds=settings.evaluation_cache_memory_ttl_seconds,
+    redis_ttl_seconds=settings.evaluation_cache_redis_ttl_seconds,
+)
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import and_, delete, or_, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Lesson, LessonFrontier, Module, UserProgress
+from app.services.curriculum_service import CurriculumCache, curriculum_cache
+
+
+class FrontierService:
+  """Keeps a per-user pointer to the first incomplete lesson of every learning path.
+
+  The pointer is maintained incrementally as attempts are recorded, and is
+  rebuilt from ``UserProgress`` whenever it is missing (new users, backfill,
+  or after an admin reorders content and the path is invalidated).
+  """
+
+  def __init__(self, curriculum: CurriculumCache) -> None:
+    self._curriculum = curriculum
+
+  async def get(self, session: AsyncSession, *, user_id: UUID, learning_path_id: UUID) -> LessonFrontier | None:
+    result = await session.execute(
+        select(LessonFrontier).where(
+            and_(LessonFrontier.user_id == user_id, LessonFrontier.learning_path_id == learning_path_id),
+        )
+    )
+    return result.scalar_one_or_none()
+
+  async def current_lesson_id(self, session: AsyncSession, *, user_id: UUID, learning_path_id: UUID) -> UUID | None:
+    """Return the lesson the user should resume, or ``None`` when the path is completed."""
+    frontier = await self.get(session, user_id=user_id, learning_path_id=learning_path_id)
+    if frontier is None:
+      frontier = await self.rebuild(session, user_id=user_id, learning_path_id=learning_path_id)
+    return frontier.lesson_id
+
+  async def find_first_incomplete(
+      self,
+      session: AsyncSession,
+      *,
+      user_id: UUID,
+      learning_path_id: UUID,
+      after: tuple[int, int] | None = None,
+  ) -> tuple[UUID, UUID] | None:
+    """Return ``(module_id, lesson_id)`` of the first lesson the user has not completed.
+
+    ``after`` is a ``(module order_index, lesson order_index)`` position to start
+    searching behind. Runs as one query over ``uq_module_order``,
+    ``uq_lesson_order`` and ``uq_progress_lesson_user``.
+    """
+    query = (
+        select(Lesson.module_id, Lesson.id)
+        .join(Module, Module.id == Lesson.module_id)
+        .outerjoin(
+            UserProgress,
+            and_(UserProgress.lesson_id == Lesson.id, UserProgress.user_id == user_id),
+        )
+        .where(Module.learning_path_id == learning_path_id)
+        .where(or_(UserProgress.id.is_(None), UserProgress.status != "completed"))
+        .order_by(Module.order_index, Lesson.order_index)
+        .limit(1)
+    )
+    if after is not None:
+      query = query.where(tuple_(Module.order_index, Lesson.order_index) > tuple_(*after))
+    row = (await session.execute(query)).first()
+    return (row[0], row[1]) if row else None
+
+  async def rebuild(self, session: AsyncSession, *, user_id: UUID, learning_path_id: UUID) -> LessonFrontier:
+    """Recompute the pointer from ``UserProgress`` and persist it.
+
+    Written as an upsert on ``uq_lesson_frontier_user_path``, so two requests
+    rebuilding the same missing pointer at once both succeed.
+    """
+    located = await self.find_first_incomplete(session, user_id=user_id, learning_path_id=learning_path_id)
+    module_id, lesson_id = located if located else (None, None)
+    statement = insert(LessonFrontier).values(
+        user_id=user_id,
+        learning_path_id=learning_path_id,
+        module_id=module_id,
+        lesson_id=lesson_id,
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[LessonFrontier.user_id, LessonFrontier.learning_path_id],
+        set_={
+            "module_id": statement.excluded.module_id,
+            "lesson_id": statement.excluded.lesson_id,
+            "updated_at": datetime.utcnow(),
+        },
+    ).returning(LessonFrontier)
+    result = await session.execute(statement, execution_options={"populate_existing": True})
+    return result.scalar_one()
+
+  async def record_outcome(self, session: AsyncSession, *, user_id: UUID, lesson_id: UUID, completed: bool) -> None:
+    """Move the pointer after a lesson changed status.
+
+    Completing the frontier lesson advances the pointer to the next incomplete
+    lesson; a lesson before the pointer that is no longer completed pulls it back.
+    """
+    lesson = await self._curriculum.lesson(session, lesson_id)
+    if lesson is None:
+      return
+    frontier = await self.get(session, user_id=user_id, learning_path_id=lesson.learning_path_id)
+    if frontier is None:
+      # rebuilt lazily on the next session start
+      return
+    if completed:
+      if frontier.lesson_id != lesson.id:
+        return
+      located = await self.find_first_incomplete(
+          session,
+          user_id=user_id,
+          learning_path_id=lesson.learning_path_id,
+          after=lesson.position,
+      )
+      frontier.module_id, frontier.lesson_id = located if located else (None, None)
+      session.add(frontier)
+      return
+
+    if frontier.lesson_id == lesson.id:
+      return
+    graph = await self._curriculum.get(session)
+    current = graph.lesson(frontier.lesson_id) if frontier.lesson_id is not None else None
+    if current is not None and current.position <= lesson.position:
+      return
+    frontier.module_id, frontier.lesson_id = lesson.module_id, lesson.id
+    session.add(frontier)
+
+  async def advance(self, session: AsyncSession, *, user_id: UUID, completed_lesson_id: UUID, lesson_id: UUID) -> None:
+    """Move the pointer from ``completed_lesson_id`` to ``lesson_id``, the next lesson of its module.
+
+    Only a pointer sitting on the lesson just completed is moved. A pointer
+    elsewhere (a replayed lesson past the frontier, say) is rebuilt from
+    ``UserProgress`` rather than trusted to the caller.
+    """
+    lesson = await self._curriculum.lesson(session, lesson_id)
+    if lesson is None:
+      return
+    moved = await session.execute(
+        update(LessonFrontier)
+        .where(
+            and_(
+                LessonFrontier.user_id == user_id,
+                LessonFrontier.learning_path_id == lesson.learning_path_id,
+                LessonFrontier.lesson_id == completed_lesson_id,
+            )
+        )
+        .values(module_id=lesson.module_id, lesson_id=lesson_id)
+        .returning(LessonFrontier.id)
+    )
+    if moved.first() is not None:
+      return
+    frontier = await self.get(session, user_id=user_id, learning_path_id=lesson.learning_path_id)
+    if frontier is None or frontier.lesson_id == lesson_id:
+      # missing pointers are rebuilt lazily; record_outcome may already have moved it
+      return
+    await self.rebuild(session, user_id=user_id, learning_path_id=lesson.learning_path_id)
+
+  async def invalidate_path(self, session: AsyncSession, learning_path_id: UUID) -> None:
+    """Drop every pointer of a learning path so they are rebuilt against the new ordering."""
+    await session.execute(delete(LessonFrontier).where(LessonFrontier.learning_path_id == learning_path_id))
+
+  async def tracked_pairs(
+      self,
+      session: AsyncSession,
+      *,
+      learning_path_id: UUID | None = None,
+      user_id: UUID | None = None,
+  ) -> list[tuple[UUID, UUID]]:
+    """Return the ``(user_id, learning_path_id)`` pairs that have progress recorded."""
+    query = select(UserProgress.user_id, UserProgress.learning_path_id).distinct()
+    if learning_path_id is not None:
+      query = query.where(UserProgress.learning_path_id == learning_path_id)
+    if user_id is not None:
+      query = query.where(UserProgress.user_id == user_id)
+    result = await session.execute(query)
+    return [(row[0], row[1]) for row in result.all()]
+
+
+frontier_service = FrontierService(curriculum_cache)
@@ -1,22 +1,61 @@
 from __future__ import annotations
 
-from datetime import datetime
-from typing import Iterable
+import asyncio
+import time
+from bisect import bisect_right
+from datetime import datetime, timezone
+from typing import Callable, Iterable
 from uuid import UUID
 
-from sqlalchemy import and_, select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import ColumnElement, and_, case, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm.attributes import set_committed_value
 
+from app.core.config import settings
 from app.core.logging import logger
-from app.models import Lesson, LessonAttempt, Module, User, UserProgress
-from app.schemas import GamificationSnapshot
+from app.db.session import async_session_factory
+from app.models import Lesson, LessonAttempt, User, UserProgress, XPThresholds
+from app.schemas import GamificationSnapshot, LevelRecomputeStatus
+from app.services.achievement_service import AchievementEngine, achievement_engine, lessons_completed_key
+from app.services.curriculum_service import CurriculumCache, curriculum_cache
+from app.services.frontier_service import FrontierService, frontier_service
+from app.services.leaderboard_service import LeaderboardService, leaderboard_service
+
+XP_THRESHOLDS_KEY = "levels"
+DEFAULT_XP_THRESHOLDS = (0, 40, 120, 240, 400, 600, 840, 1120, 1440, 1800)
 
 
 class GamificationEngine:
-  """Centralised XP, level, and reward calculations."""
+  """Centralised XP, level, and reward calculations.
+
+  XP thresholds live in the ``xp_thresholds`` row and are cached per worker;
+  like the curriculum graph, each worker re-reads the row's version at most
+  once per ``check_interval`` seconds and reloads them when it moved on.
+  """
 
-  def __init__(self) -> None:
-    self._xp_thresholds: list[int] = [0, 40, 120, 240, 400, 600, 840, 1120, 1440, 1800]
+  def __init__(
+      self,
+      frontier: FrontierService,
+      curriculum: CurriculumCache,
+      achievements: AchievementEngine,
+      leaderboards: LeaderboardService,
+      session_factory: async_sessionmaker[AsyncSession],
+      *,
+      check_interval: float,
+  ) -> None:
+    self._frontier = frontier
+    self._curriculum = curriculum
+    self._achievements = achievements
+    self._leaderboards = leaderboards
+    self._session_factory = session_factory
+    self._check_interval = check_interval
+    self._xp_thresholds: tuple[int, ...] = DEFAULT_XP_THRESHOLDS
+    self._thresholds_version = 0
+    self._thresholds_checked_at = 0.0
+    self._recompute_task: asyncio.Task | None = None
+    self._recompute_again = False
+    self._recompute_status = LevelRecomputeStatus()
     self._initialized = False
 
   async def initialize(self) -> None:
@@ -26,25 +65,150 @@ class GamificationEngine:
     self._initialized = True
 
   async def close(self) -> None:
+    if self._recompute_task is not None:
+      self._recompute_task.cancel()
+      await asyncio.gather(self._recompute_task, return_exceptions=True)
+      self._recompute_task = None
     if not self._initialized:
       return
     logger.info("Gamification engine shut down.")
     self._initialized = False
 
-  def add_thresholds(self, thresholds: Iterable[int]) -> None:
-    self._xp_thresholds = sorted(set(thresholds))
+  @property
+  def thresholds(self) -> tuple[int, ...]:
+    return self._xp_thresholds
+
+  @property
+  def recompute_status(self) -> LevelRecomputeStatus:
+    return self._recompute_status.model_copy(update={"thresholds": list(self._xp_thresholds)})
+
+  async def load_thresholds(self, session: AsyncSession, *, force: bool = False) -> tuple[int, ...]:
+    """Pick up thresholds stored by any worker; checks at most once per ``check_interval`` unless ``force``."""
+    now = time.monotonic()
+    if not force and now - self._thresholds_checked_at < self._check_interval:
+      return self._xp_thresholds
+    row = (
+        await session.execute(
+            select(XPThresholds.version, XPThresholds.thresholds).where(XPThresholds.key == XP_THRESHOLDS_KEY),
+        )
+    ).one_or_none()
+    self._thresholds_checked_at = now
+    if row is not None and row.version != self._thresholds_version:
+      self._xp_thresholds, self._thresholds_version = tuple(row.thresholds), row.version
+      logger.info("Loaded XP thresholds v%s with %d tiers.", row.version, len(self._xp_thresholds))
+    return self._xp_thresholds
+
+  async def store_thresholds(self, session: AsyncSession, thresholds: Iterable[int]) -> tuple[int, ...]:
+    """Save new XP thresholds in the caller's transaction; other workers load them within ``check_interval``.
+
+    Stored levels follow via ``recompute_levels`` or ``schedule_recompute``.
+    """
+    ordered = tuple(sorted(set(thresholds)))
+    if not ordered:
+      raise ValueError("At least one XP threshold is required.")
+    statement = insert(XPThresholds).values(key=XP_THRESHOLDS_KEY, version=1, thresholds=list(ordered))
+    statement = statement.on_conflict_do_update(
+        index_elements=[XPThresholds.key],
+        set_={
+            "version": XPThresholds.version + 1,
+            "thresholds": statement.excluded.thresholds,
+            "updated_at": datetime.utcnow(),
+        },
+    ).returning(XPThresholds.version)
+    version = (await session.execute(statement)).scalar_one()
+    self._xp_thresholds, self._thresholds_version = ordered, version
+    self._thresholds_checked_at = time.monotonic()
+    return ordered
+
+  def schedule_recompute(self) -> None:
+    """Recompute stored levels in the background; while a run is going, run once more after it."""
+    if self._recompute_task is not None and not self._recompute_task.done():
+      self._recompute_again = True
+      return
+    self._recompute_status = LevelRecomputeStatus(running=True, started_at=datetime.now(timezone.utc))
+    self._recompute_task = asyncio.create_task(self._recompute_in_background(), name="level-recompute")
 
   def calculate_level(self, xp: int) -> int:
-    for idx, threshold in enumerate(self._xp_thresholds, start=1):
-      if xp < threshold:
-        return max(1, idx - 1)
-    return len(self._xp_thresholds)
+    return max(1, bisect_right(self._xp_thresholds, xp))
+
+  def projected(self, user: User, *, xp: int, streak: int | None = None) -> dict[str, float]:
+    """``xp``, ``level`` and ``streak`` metrics of ``user`` after gaining ``xp``, from the loaded row.
+
+    Achievements are evaluated against this before the users row is written;
+    the totals the ``UPDATE`` returns are checked again afterwards.
+    """
+    total = user.xp + xp
+    return {
+        "xp": total,
+        "level": max(user.level, self.calculate_level(total)),
+        "streak": user.current_streak if streak is None else streak,
+    }
 
   def next_level_xp(self, xp: int) -> int:
-    for threshold in self._xp_thresholds:
-      if xp < threshold:
-        return threshold
-    return self._xp_thresholds[-1]
+    index = bisect_right(self._xp_thresholds, xp)
+    return self._xp_thresholds[min(index, len(self._xp_thresholds) - 1)]
+
+  async def recompute_levels(
+      self,
+      session: AsyncSession,
+      *,
+      batch_size: int = settings.level_recompute_batch_size,
+      progress: Callable[[int, int], None] | None = None,
+  ) -> tuple[int, int]:
+    """Rewrite every stored ``User.level`` from the current thresholds.
+
+    Users are walked in primary-key order in batches of ``batch_size``; each
+    batch is one set-based UPDATE committed on its own, so row locks are short
+    and the table is never locked as a whole. ``progress`` is called with
+    ``(scanned, updated)`` after each batch. Returns the final counts.
+    """
+    await self.load_thresholds(session, force=True)
+    scanned = updated = 0
+    last_id: UUID | None = None
+    while True:
+      query = select(User.id).order_by(User.id).limit(batch_size)
+      if last_id is not None:
+        query = query.where(User.id > last_id)
+      ids = (await session.execute(query)).scalars().all()
+      if not ids:
+        break
+      level = self._level_case(User.xp)
+      result = await session.execute(
+          update(User)
+          .where(and_(User.id >= ids[0], User.id <= ids[-1], User.level != level))
+          .values(level=level)
+          .execution_options(synchronize_session=False),
+      )
+      await session.commit()
+      scanned += len(ids)
+      updated += result.rowcount
+      last_id = ids[-1]
+      logger.info("Recomputed levels for %s users (%s changed).", scanned, updated)
+      if progress is not None:
+        progress(scanned, updated)
+    return scanned, updated
+
+  async def _recompute_in_background(self) -> None:
+    while True:
+      self._recompute_again = False
+      status = self._recompute_status
+
+      def progress(scanned: int, updated: int) -> None:
+        status.scanned_users, status.updated_users = scanned, updated
+
+      try:
+        # every worker has picked up the new thresholds before users are rewritten
+        await asyncio.sleep(self._check_interval)
+        async with self._session_factory() as session:
+          await self.recompute_levels(session, progress=progress)
+        status.finished_at = datetime.now(timezone.utc)
+      except Exception:  # noqa: BLE001
+        logger.exception("Level recompute failed after %s users.", status.scanned_users)
+      finally:
+        status.running = False
+      if not self._recompute_again:
+        return
+      self._recompute_status = LevelRecomputeStatus(running=True, started_at=datetime.now(timezone.utc))
 
   async def apply_attempt_outcome(
       self,
@@ -52,21 +216,136 @@ class GamificationEngine:
       user: User,
       lesson: Lesson,
       attempt: LessonAttempt,
-  ) -> tuple[int, bool]:
+      *,
+      previous_xp: int | None = None,
+  ) -> tuple[int, bool, list[str]]:
+    """Record the attempt's progress and rewards; returns ``(xp, leveled_up, achievement keys)``.
+
+    ``previous_xp`` is set when an already rewarded attempt was evaluated
+    again: only the difference to what it earned before is credited, and the
+    streak is left alone since no new attempt was made.
+    """
     xp_awarded = lesson.xp_reward if attempt.is_correct else max(lesson.xp_reward // 2, 1)
-    user.xp += xp_awarded
-    new_level = self.calculate_level(user.xp)
-    leveled_up = new_level > user.level
-    if leveled_up:
-      user.level = new_level
-    if attempt.is_correct:
-      user.current_streak += 1
-      user.longest_streak = max(user.longest_streak, user.current_streak)
-    else:
-      user.current_streak = 0
-    session.add(user)
-    await self._record_progress(session, user, lesson, attempt, xp_awarded)
-    return xp_awarded, leveled_up
+    xp_change = xp_awarded - (previous_xp or 0)
+    correct = attempt.is_correct if previous_xp is None else None
+    progress, completed_counter = await self._record_progress(session, user, lesson, attempt, xp_change)
+    before = {"xp": user.xp, "level": user.level, "streak": user.current_streak}
+    streak = None if correct is None else user.current_streak + 1 if correct else 0
+    after = self.projected(user, xp=xp_change, streak=streak)
+    if completed_counter is not None:
+      key = lessons_completed_key(lesson.module.learning_path_id)
+      before[key], after[key] = completed_counter
+    # achievements go first and the users row is written last, so its lock is held only briefly before commit
+    achievements = await self._achievements.evaluate(session, user.id, before=before, after=after)
+    xp, level, streak, level_before = await self.apply_rewards(session, user, xp=xp_change, correct=correct)
+    progress.streak_count = streak
+    # the row may have moved since it was loaded; rules crossed by the difference fire here
+    achievements += await self._achievements.evaluate(
+        session, user.id, before=after, after=after | {"xp": xp, "level": level, "streak": streak}
+    )
+    self._leaderboards.record_xp(session, user, xp_change, learning_path_id=lesson.module.learning_path_id)
+    return xp_awarded, level > level_before, achievements
+
+  async def apply_rewards(
+      self,
+      session: AsyncSession,
+      user: User,
+      *,
+      xp: int,
+      correct: bool | None = None,
+  ) -> tuple[int, int, int, int]:
+    """Add ``xp`` and move the streak in one ``UPDATE users ... RETURNING``.
+
+    The level is recomputed in SQL from the XP thresholds and never lowered.
+    ``correct`` extends (``True``) or resets (``False``) the streak; ``None``
+    leaves it alone. Returns the new ``(xp, level, current_streak)`` and the
+    level stored before the update.
+    """
+    await self.load_thresholds(session)
+    new_xp = User.xp + xp
+    new_level = self._level_case(new_xp)
+    values: dict = {
+        User.xp: new_xp,
+        User.level: case((new_level > User.level, new_level), else_=User.level),
+    }
+    if correct:
+      values[User.current_streak] = User.current_streak + 1
+      values[User.longest_streak] = case(
+          (User.current_streak + 1 > User.longest_streak, User.current_streak + 1),
+          else_=User.longest_streak,
+      )
+    elif correct is not None:
+      values[User.current_streak] = 0
+    return await self._update_user(session, user, values)
+
+  async def apply_bulk_rewards(
+      self,
+      session: AsyncSession,
+      user: User,
+      *,
+      xp: int,
+      outcomes: list[bool],
+  ) -> tuple[int, int, int, int]:
+    """``apply_rewards`` for many attempts at once, in a single ``UPDATE``.
+
+    ``outcomes`` are the attempts' correctness in the order they were made;
+    the streak ends up as it would after applying them one by one. Returns
+    ``(xp, level, current_streak, peak_streak)`` where the peak is the
+    highest streak reached along the way.
+    """
+    await self.load_thresholds(session)
+    reset = False in outcomes
+    leading = outcomes.index(False) if reset else len(outcomes)
+    runs, run = [], 0
+    for correct in outcomes[leading:]:
+      run = run + 1 if correct else 0
+      runs.append(run)
+    best_later_run = max(runs, default=0)
+
+    _, peak = self.bulk_streak(user.current_streak, outcomes)
+    new_xp = User.xp + xp
+    new_level = self._level_case(new_xp)
+    values: dict = {
+        User.xp: new_xp,
+        User.level: case((new_level > User.level, new_level), else_=User.level),
+        User.current_streak: run if reset else User.current_streak + leading,
+        User.longest_streak: _greater(_greater(User.current_streak + leading, best_later_run), User.longest_streak),
+    }
+    xp_total, level, streak, _ = await self._update_user(session, user, values)
+    return xp_total, level, streak, peak
+
+  @staticmethod
+  def bulk_streak(current_streak: int, outcomes: list[bool]) -> tuple[int, int]:
+    """``(current_streak, peak_streak)`` after the attempts in ``outcomes``, made in that order."""
+    streak = peak = current_streak
+    for correct in outcomes:
+      streak = streak + 1 if correct else 0
+      peak = max(peak, streak)
+    return streak, peak
+
+  async def _update_user(self, session: AsyncSession, user: User, values: dict) -> tuple[int, int, int, int]:
+    """Apply ``values`` and return the new ``(xp, level, current_streak)`` plus the level stored before."""
+    # RETURNING only sees new values; the locked row read in a CTE supplies the old level
+    previous = select(User.id, User.level).where(User.id == user.id).with_for_update().cte("previous")
+    result = await session.execute(
+        update(User)
+        .where(User.id == previous.c.id)
+        .values(values)
+        .returning(User.xp, User.level, User.current_streak, User.longest_streak, previous.c.level.label("previous_level"))
+        .execution_options(synchronize_session=False),
+    )
+    row = result.one_or_none()
+    if row is None:
+      raise ValueError(f"User {user.id} not found.")
+    # keep the loaded instance in step without marking it dirty
+    for key in ("xp", "level", "current_streak", "longest_streak"):
+      set_committed_value(user, key, getattr(row, key))
+    return row.xp, row.level, row.current_streak, row.previous_level
+
+  def _level_case(self, xp: ColumnElement[int]) -> ColumnElement[int]:
+    """SQL equivalent of ``calculate_level`` for the current thresholds."""
+    levels = list(enumerate(self._xp_thresholds, start=1))
+    return case(*[(xp >= threshold, level) for level, threshold in reversed(levels)], else_=1)
 
   async def _record_progress(
       self,
@@ -75,7 +354,8 @@ class GamificationEngine:
       lesson: Lesson,
       attempt: LessonAttempt,
       xp_awarded: int,
-  ) -> None:
+  ) -> tuple[UserProgress, tuple[int, int] | None]:
+    """Upsert the progress row; also returns the moved completed-lessons counter, if any."""
     query = select(UserProgress).where(
         and_(UserProgress.user_id == user.id, UserProgress.lesson_id == lesson.id),
     )
@@ -88,59 +368,68 @@ class GamificationEngine:
           module_id=lesson.module_id,
           lesson_id=lesson.id,
           status="in_progress",
+          xp_earned=0,
+          meta_data={},
       )
+    was_completed = progress.status == "completed"
     progress.status = "completed" if attempt.is_correct else "in_progress"
     progress.xp_earned += xp_awarded
-    progress.streak_count = user.current_streak
     progress.last_attempt_at = datetime.utcnow()
     progress.meta_data |= {
         "last_score": attempt.score,
         "is_correct": attempt.is_correct,
     }
     session.add(progress)
-
-  async def unlock_next_lessons(self, session: AsyncSession, module: Module, user_id: UUID) -> list[str]:
-    """Mark the next lesson as available once the current one is complete."""
-    lessons = await session.execute(
-        select(Lesson).where(Lesson.module_id == module.id).order_by(Lesson.order_index),
+    await self._frontier.record_outcome(
+        session,
+        user_id=user.id,
+        lesson_id=lesson.id,
+        completed=progress.status == "completed",
     )
-    unlocked: list[str] = []
-    lessons_ordered = lessons.scalars().all()
-    completed_ids = set(
-        row.lesson_id
-        for row in (
-            await session.execute(
-                select(UserProgress.lesson_id).where(
-                    and_(UserProgress.user_id == user_id, UserProgress.status == "completed"),
-                )
-            )
-        ).scalars()
+    completed_counter = None
+    if attempt.is_correct != was_completed:
+      completed_counter = await self._achievements.increment(
+          session,
+          user.id,
+          lessons_completed_key(lesson.module.learning_path_id),
+          1 if attempt.is_correct else -1,
+      )
+    return progress, completed_counter
+
+  async def unlock_next_lessons(self, session: AsyncSession, lesson_id: UUID, user_id: UUID) -> list[str]:
+    """Mark the lesson following ``lesson_id`` in its module as available.
+
+    Only the neighbour by (module_id, order_index) is looked up, from the
+    curriculum graph, and its progress row is upserted in one statement that
+    never downgrades an in-progress or completed lesson.
+    """
+    current = await self._curriculum.lesson(session, lesson_id)
+    if current is None:
+      return []
+    following = (await self._curriculum.get(session)).next_lesson(lesson_id)
+    if following is None or following.module_id != current.module_id:
+      return []
+
+    statement = insert(UserProgress).values(
+        user_id=user_id,
+        learning_path_id=following.learning_path_id,
+        module_id=following.module_id,
+        lesson_id=following.id,
+        status="available",
     )
-    for idx, lesson in enumerate(lessons_ordered):
-      if lesson.id in completed_ids:
-        continue
-      # unlock the very next available lesson
-      if idx == 0 or lessons_ordered[idx - 1].id in completed_ids:
-        progress_result = await session.execute(
-            select(UserProgress).where(
-                and_(UserProgress.user_id == user_id, UserProgress.lesson_id == lesson.id),
-            )
-        )
-        progress = progress_result.scalar_one_or_none()
-        if progress is None:
-          progress = UserProgress(
-              user_id=user_id,
-              learning_path_id=module.learning_path_id,
-              module_id=module.id,
-              lesson_id=lesson.id,
-              status="available",
-          )
-        else:
-          progress.status = "available"
-        session.add(progress)
-        unlocked.append(lesson.key)
-      break
-    return unlocked
+    statement = statement.on_conflict_do_update(
+        index_elements=[UserProgress.user_id, UserProgress.lesson_id],
+        set_={
+            "status": case((UserProgress.status == "locked", statement.excluded.status), else_=UserProgress.status),
+            "updated_at": datetime.utcnow(),
+        },
+        where=UserProgress.status != "completed",
+    ).returning(UserProgress.id)
+    if (await session.execute(statement)).first() is None:
+      # the neighbour is already completed
+      return []
+    await self._frontier.advance(session, user_id=user_id, completed_lesson_id=lesson_id, lesson_id=following.id)
+    return [following.key]
 
   async def snapshot(self, user: User) -> GamificationSnapshot:
     next_level_xp = self.next_level_xp(user.xp)
@@ -153,6 +442,17 @@ class GamificationEngine:
     )
 
 
-gamification_engine = GamificationEngine()
+def _greater(left: ColumnElement[int], right: ColumnElement[int] | int) -> ColumnElement[int]:
+  return case((left > right, left), else_=right)
+
+
+gamification_engine = GamificationEngine(
+    frontier_service,
+    curriculum_cache,
+    achievement_engine,
+    leaderboard_service,
+    async_session_factory,
+    check_interval=settings.xp_thresholds_check_seconds,
+)
 
 
@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass
+from uuid import UUID
+
+from redis import asyncio as redis_asyncio
+from redis.exceptions import RedisError
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.age import age_bracket
+from app.core.config import settings
+from app.core.logging import logger
+from app.models import User, UserProgress
+from app.services.sorted_scores import SortedScores
+
+GLOBAL_BOARD = "global"
+# session.info key of the XP updates waiting for their transaction to commit
+_PENDING_XP = "leaderboard_pending_xp"
+
+
+def age_board(bracket: str) -> str:
+  return f"age:{bracket}"
+
+
+def path_board(learning_path_id: UUID) -> str:
+  return f"path:{learning_path_id}"
+
+
+@dataclass(frozen=True, slots=True)
+class XpUpdate:
+  member: str
+  xp: int
+  bracket: str | None
+  learning_path_id: UUID | None
+  xp_awarded: int
+
+
+class MemoryLeaderboardStore:
+  """Boards held in this process; each worker only sees the updates it served."""
+
+  persistent = False
+
+  def __init__(self) -> None:
+    self._boards: defaultdict[str, SortedScores] = defaultdict(SortedScores)
+
+  async def set_score(self, board: str, member: str, score: int) -> None:
+    self._boards[board].set(member, score)
+
+  async def increment(self, board: str, member: str, amount: int) -> None:
+    self._boards[board].increment(member, amount)
+
+  async def top(self, board: str, limit: int) -> list[tuple[str, int]]:
+    scores = self._boards.get(board)
+    return scores.top(limit) if scores is not None else []
+
+  async def rank(self, board: str, member: str) -> tuple[int, int] | None:
+    scores = self._boards.get(board)
+    position = scores.rank(member) if scores is not None else None
+    return (position, scores.score(member)) if position is not None else None
+
+  async def size(self, board: str) -> int:
+    scores = self._boards.get(board)
+    return len(scores) if scores is not None else 0
+
+  async def replace(self, board: str, entries: Iterable[tuple[str, int]]) -> None:
+    self._boards[board] = SortedScores(entries)
+
+  async def close(self) -> None:
+    self._boards.clear()
+
+
+class RedisLeaderboardStore:
+  """Boards kept in Redis sorted sets shared by every worker."""
+
+  persistent = True
+
+  def __init__(self, client: redis_asyncio.Redis, prefix: str = "bolajon:leaderboard:") -> None:
+    self._client = client
+    self._prefix = prefix
+
+  async def set_score(self, board: str, member: str, score: int) -> None:
+    await self._client.zadd(self._prefix + board, {member: score})
+
+  async def increment(self, board: str, member: str, amount: int) -> None:
+    await self._client.zincrby(self._prefix + board, amount, member)
+
+  async def top(self, board: str, limit: int) -> list[tuple[str, int]]:
+    rows = await self._client.zrevrange(self._prefix + board, 0, limit - 1, withscores=True)
+    return [(member.decode(), int(score)) for member, score in rows]
+
+  async def rank(self, board: str, member: str) -> tuple[int, int] | None:
+    async with self._client.pipeline(transaction=False) as pipeline:
+      pipeline.zrevrank(self._prefix + board, member)
+      pipeline.zscore(self._prefix + board, member)
+      position, score = await pipeline.execute()
+    return (position, int(score)) if position is not None else None
+
+  async def size(self, board: str) -> int:
+    return await self._client.zcard(self._prefix + board)
+
+  async def replace(self, board: str, entries: Iterable[tuple[str, int]], chunk_size: int = 10_000) -> None:
+    """Fill a temporary key and rename it over the board so readers never see a partial set."""
+    key = self._prefix + board
+    staging = f"{key}:rebuild"
+    await self._client.delete(staging)
+    chunk: dict[str, int] = {}
+    for member, score in entries:
+      chunk[member] = score
+      if len(chunk) >= chunk_size:
+        await self._client.zadd(staging, chunk)
+        chunk = {}
+    if chunk:
+      await self._client.zadd(staging, chunk)
+    if await self._client.exists(staging):
+      await self._client.rename(staging, key)
+    else:
+      await self._client.delete(key)
+
+  async def close(self) -> None:
+    await self._client.aclose()
+
+
+LeaderboardStore = MemoryLeaderboardStore | RedisLeaderboardStore
+
+
+class LeaderboardService:
+  """XP leaderboards: global, per learning path and per age bracket.
+
+  Global and age boards hold each user's total XP; path boards hold the XP
+  earned from lessons of that path. Updates come from attempts; the boards
+  can be rebuilt from ``users`` and ``user_progress`` at any time. Without
+  ``REDIS_URL`` the boards live in process memory and are rebuilt from the
+  database on first read.
+
+  XP updates are queued on the session and published only after it
+  commits, so a rolled-back attempt never reaches the boards (path boards
+  are incremented, which cannot be undone) and no Redis call runs while the
+  transaction holds row locks.
+  """
+
+  def __init__(self, redis_url: str | None) -> None:
+    self._redis_url = redis_url
+    self._store: LeaderboardStore | None = None
+    self._loaded = False
+    self._lock = asyncio.Lock()
+    self._publishing: set[asyncio.Task] = set()
+    event.listen(Session, "after_commit", self._after_commit)
+    event.listen(Session, "after_rollback", self._after_rollback)
+
+  @property
+  def store(self) -> LeaderboardStore:
+    if self._store is None:
+      if self._redis_url:
+        client = redis_asyncio.from_url(
+            self._redis_url,
+            socket_timeout=settings.redis_socket_timeout_seconds,
+            socket_connect_timeout=settings.redis_socket_timeout_seconds,
+        )
+        self._store = RedisLeaderboardStore(client)
+      else:
+        self._store = MemoryLeaderboardStore()
+    return self._store
+
+  async def initialize(self) -> None:
+    logger.info("Leaderboards stored in %s.", type(self.store).__name__)
+
+  async def close(self) -> None:
+    if self._publishing:
+      await asyncio.gather(*self._publishing, return_exceptions=True)
+    if self._store is not None:
+      await self._store.close()
+      self._store = None
+      self._loaded = False
+
+  def record_xp(
+      self,
+      session: AsyncSession,
+      user: User,
+      xp_awarded: int,
+      *,
+      learning_path_id: UUID | None = None,
+  ) -> None:
+    """Publish ``user``'s new total once ``session`` commits; ``learning_path_id`` also credits that path's board."""
+    update = XpUpdate(str(user.id), user.xp, age_bracket(user.age), learning_path_id, xp_awarded)
+    session.info.setdefault(_PENDING_XP, []).append(update)
+
+  async def publish(self, updates: list[XpUpdate]) -> None:
+    for update in updates:
+      try:
+        await self.store.set_score(GLOBAL_BOARD, update.member, update.xp)
+        if update.bracket is not None:
+          await self.store.set_score(age_board(update.bracket), update.member, update.xp)
+        if update.learning_path_id is not None and update.xp_awarded:
+          await self.store.increment(path_board(update.learning_path_id), update.member, update.xp_awarded)
+      except RedisError as exc:
+        # the next rebuild repairs the boards; attempts must not fail on them
+        logger.warning("Leaderboard update failed for %s: %s", update.member, exc)
+
+  async def top(self, session: AsyncSession, board: str, limit: int) -> tuple[int, list[tuple[UUID, int]]]:
+    """Return the board size and its ``limit`` best ``(user_id, xp)`` entries."""
+    await self._ensure_loaded(session)
+    entries = await self.store.top(board, limit)
+    return await self.store.size(board), [(UUID(member), score) for member, score in entries]
+
+  async def rank(self, session: AsyncSession, board: str, user_id: UUID) -> tuple[int, int, int] | None:
+    """Return ``(1-based rank, xp, board size)`` of a user, or ``None`` if they are not on it."""
+    await self._ensure_loaded(session)
+    found = await self.store.rank(board, str(user_id))
+    if found is None:
+      return None
+    position, score = found
+    return position + 1, score, await self.store.size(board)
+
+  async def rebuild(self, session: AsyncSession, *, batch_size: int = 10_000) -> dict[str, int]:
+    """Recompute every board from the database and swap it in; returns entries per board."""
+    boards: defaultdict[str, list[tuple[str, int]]] = defaultdict(list)
+    users = await session.stream(select(User.id, User.xp, User.age).execution_options(yield_per=batch_size))
+    async for user_id, xp, age in users:
+      member = str(user_id)
+      boards[GLOBAL_BOARD].append((member, xp))
+      bracket = age_bracket(age)
+      if bracket is not None:
+        boards[age_board(bracket)].append((member, xp))
+
+    path_totals = await session.stream(
+        select(UserProgress.user_id, UserProgress.learning_path_id, func.sum(UserProgress.xp_earned))
+        .group_by(UserProgress.user_id, UserProgress.learning_path_id)
+        .execution_options(yield_per=batch_size),
+    )
+    async for user_id, learning_path_id, xp in path_totals:
+      if xp:
+        boards[path_board(learning_path_id)].append((str(user_id), int(xp)))
+
+    for board, entries in boards.items():
+      await self.store.replace(board, entries)
+    self._loaded = True
+    logger.info("Rebuilt %s leaderboards.", len(boards))
+    return {board: len(entries) for board, entries in boards.items()}
+
+  def _after_commit(self, session: Session) -> None:
+    updates = session.info.pop(_PENDING_XP, None)
+    if not updates:
+      return
+    task = asyncio.get_running_loop().create_task(self.publish(updates), name="leaderboard-publish")
+    self._publishing.add(task)
+    task.add_done_callback(self._publishing.discard)
+
+  def _after_rollback(self, session: Session) -> None:
+    session.info.pop(_PENDING_XP, None)
+
+  async def _ensure_loaded(self, session: AsyncSession) -> None:
+    if self._loaded or self.store.persistent:
+      return
+    async with self._lock:
+      if not self._loaded:
+        await self.rebuild(session)
+
+
+leaderboard_service = LeaderboardService(settings.redis_url)
@@ -6,15 +6,25 @@ from sqlalchemy import and_, select
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.core.logging import logger
-from app.models import LearningPath, Lesson, Module, User, UserProgress
+from app.models import LearningPath, Lesson, User, UserProgress
 from app.schemas import LessonPromptSchema, LessonSchema, UserProgressEntry
+from app.services.curriculum_service import CurriculumCache, curriculum_cache
+from app.services.frontier_service import FrontierService, frontier_service
 from app.services.gamification_service import GamificationEngine, gamification_engine
 
 
 class LearningService:
-  def __init__(self, gamification: GamificationEngine) -> None:
+  def __init__(
+      self,
+      gamification: GamificationEngine,
+      frontier: FrontierService,
+      curriculum: CurriculumCache,
+  ) -> None:
     self._gamification = gamification
+    self._frontier = frontier
+    self._curriculum = curriculum
 
   async def ensure_user(self, session: AsyncSession, user_id: UUID) -> User:
     user = await session.get(User, user_id)
@@ -36,58 +46,55 @@ class LearningService:
       user_id: UUID,
       learning_path_key: str,
       resume: bool,
-  ) -> tuple[Lesson, UserProgress]:
+  ) -> tuple[LessonSchema, UserProgress]:
     user = await self.ensure_user(session, user_id)
-    learning_path = await self.get_learning_path(session, learning_path_key)
-    modules_result = await session.execute(
-        select(Module).where(Module.learning_path_id == learning_path.id).order_by(Module.order_index),
-    )
-    modules = modules_result.scalars().all()
-    if not modules:
-      raise ValueError(f"No modules configured for learning path '{learning_path_key}'.")
-
-    for module in modules:
-      lessons_result = await session.execute(
-          select(Lesson)
-          .options(selectinload(Lesson.prompts))
-          .where(Lesson.module_id == module.id)
-          .order_by(Lesson.order_index),
+    graph = await self._curriculum.get(session)
+    learning_path_id = graph.path_id(learning_path_key)
+    if learning_path_id is None:
+      raise ValueError(f"Learning path '{learning_path_key}' not found.")
+
+    lesson_ref = None
+    if resume:
+      lesson_id = await self._frontier.current_lesson_id(
+          session,
+          user_id=user.id,
+          learning_path_id=learning_path_id,
       )
-      lessons = lessons_result.scalars().all()
-      if not lessons:
-        continue
-
-      for index, lesson in enumerate(lessons):
-        progress = await self._get_or_create_progress(
-            session=session,
-            user=user,
-            learning_path_id=learning_path.id,
-            module=module,
-            lesson=lesson,
-            auto_unlock=index == 0,
-        )
-        if resume and progress.status == "completed":
-          continue
-        logger.debug("Selected lesson %s for user %s", lesson.key, user.id)
-        return lesson, progress
-
-    # fallback to last lesson
-    last_lesson_result = await session.execute(
-        select(Lesson)
-        .where(Lesson.module_id == modules[-1].id)
-        .order_by(Lesson.order_index.desc())
-        .limit(1),
-    )
-    last_lesson = last_lesson_result.scalar_one()
+      lesson_ref = graph.lesson(lesson_id) if lesson_id is not None else None
+    else:
+      lesson_ref = graph.first_lesson(learning_path_id)
+
+    auto_unlock = True
+    if lesson_ref is None:
+      # every lesson is completed: fall back to the last lesson of the path
+      lesson_ref = graph.last_lesson(learning_path_id)
+      if lesson_ref is None:
+        raise ValueError(f"No lessons configured for learning path '{learning_path_key}'.")
+    else:
+      auto_unlock = graph.is_first_in_module(lesson_ref.id)
+
+    lesson = await self.get_lesson_body(session, lesson_ref.id, version=graph.version)
     progress = await self._get_or_create_progress(
         session=session,
         user=user,
-        learning_path_id=learning_path.id,
-        module=modules[-1],
-        lesson=last_lesson,
-        auto_unlock=True,
+        learning_path_id=learning_path_id,
+        module_id=lesson_ref.module_id,
+        lesson_id=lesson_ref.id,
+        auto_unlock=auto_unlock,
     )
-    return last_lesson, progress
+    logger.debug("Selected lesson %s for user %s", lesson_ref.key, user.id)
+    return lesson, progress
+
+  async def get_lesson_body(self, session: AsyncSession, lesson_id: UUID, *, version: int) -> LessonSchema:
+    """Return the serialised lesson with prompts, loading it only on an LRU miss."""
+    body = self._curriculum.bodies.get(lesson_id, version=version)
+    if body is None:
+      lesson_result = await session.execute(
+          select(Lesson).options(selectinload(Lesson.prompts)).where(Lesson.id == lesson_id),
+      )
+      body = self.serialize_lesson(lesson_result.scalar_one())
+      self._curriculum.bodies.put(lesson_id, body, version=version)
+    return body
 
   async def _get_or_create_progress(
       self,
@@ -95,13 +102,13 @@ class LearningService:
       session: AsyncSession,
       user: User,
       learning_path_id: UUID,
-      module: Module,
-      lesson: Lesson,
+      module_id: UUID,
+      lesson_id: UUID,
       auto_unlock: bool,
   ) -> UserProgress:
     result = await session.execute(
         select(UserProgress).where(
-            and_(UserProgress.user_id == user.id, UserProgress.lesson_id == lesson.id),
+            and_(UserProgress.user_id == user.id, UserProgress.lesson_id == lesson_id),
         )
     )
     progress = result.scalar_one_or_none()
@@ -109,10 +116,17 @@ class LearningService:
       progress = UserProgress(
           user_id=user.id,
           learning_path_id=learning_path_id,
-          module_id=module.id,
-          lesson_id=lesson.id,
+          module_id=module_id,
+          lesson_id=lesson_id,
           status="available" if auto_unlock else "locked",
+          xp_earned=0,
+          streak_count=0,
+          last_attempt_at=None,
+          meta_data={},
       )
+      if progress.status == "locked" and settings.implicit_locked_progress:
+        # a missing row already means "locked"; hand back a transient entry
+        return progress
       session.add(progress)
       await session.flush()
     return progress
@@ -153,6 +167,6 @@ class LearningService:
     )
 
 
-learning_service = LearningService(gamification_engine)
+learning_service = LearningService(gamification_engine, frontier_service, curriculum_cache)
 
 
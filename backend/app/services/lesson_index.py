@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from uuid import UUID
+
+from app.schemas import LessonSchema
+
+_UUID_SIZE = 16
+
+LessonRow = tuple[UUID, str, UUID, UUID, int, int, int]
+"""``(lesson_id, key, module_id, learning_path_id, module_order, order_index, xp_reward)``"""
+
+
+@dataclass(frozen=True, slots=True)
+class LessonRef:
+  """Ordering data of a single lesson, materialised on demand from a ``LessonIndex``."""
+
+  id: UUID
+  key: str
+  module_id: UUID
+  learning_path_id: UUID
+  module_order: int
+  order_index: int
+  xp_reward: int
+  path_position: int
+
+  @property
+  def position(self) -> tuple[int, int]:
+    return self.module_order, self.order_index
+
+
+class _PackedIds(Sequence[bytes]):
+  """Read-only view of concatenated 16-byte UUIDs, so ``bisect`` can search it."""
+
+  __slots__ = ("_buffer",)
+
+  def __init__(self, buffer: bytes) -> None:
+    self._buffer = buffer
+
+  def __len__(self) -> int:
+    return len(self._buffer) // _UUID_SIZE
+
+  def __getitem__(self, index: int) -> bytes:  # type: ignore[override]
+    start = index * _UUID_SIZE
+    return self._buffer[start:start + _UUID_SIZE]
+
+
+class LessonIndex:
+  """Compact, array-backed ordering data for every lesson of the curriculum.
+
+  Lessons are stored by position in (path, module order, lesson order) order as
+  parallel arrays: packed UUID bytes, ``order_index``, ``xp_reward`` and a
+  module slot. Lesson keys live in one UTF-8 blob with offsets. Lookup by id
+  is a binary search over a sorted copy of the packed ids. A 100k-lesson
+  module costs a few MB instead of one ORM object per lesson.
+  """
+
+  __slots__ = (
+      "_ids",
+      "_sorted_ids",
+      "_sorted_positions",
+      "_order_index",
+      "_xp_reward",
+      "_module_slot",
+      "_key_blob",
+      "_key_offsets",
+      "_modules",
+      "_module_slots",
+      "_path_ranges",
+  )
+
+  def __init__(self, rows: Iterable[LessonRow]) -> None:
+    """Build from rows sorted by (learning path, module order, lesson order)."""
+    ids = bytearray()
+    key_blob = bytearray()
+    key_offsets = array("I", [0])
+    order_index = array("i")
+    xp_reward = array("i")
+    module_slot = array("I")
+    # (module_id, learning_path_id, module_order, start, end)
+    modules: list[list] = []
+    module_slots: dict[UUID, int] = {}
+    path_ranges: dict[UUID, list[int]] = {}
+
+    for position, (lesson_id, key, module_id, learning_path_id, module_order, lesson_order, xp) in enumerate(rows):
+      ids += lesson_id.bytes
+      key_blob += key.encode("utf-8")
+      key_offsets.append(len(key_blob))
+      order_index.append(lesson_order)
+      xp_reward.append(xp)
+      slot = module_slots.get(module_id)
+      if slot is None:
+        slot = module_slots[module_id] = len(modules)
+        modules.append([module_id, learning_path_id, module_order, position, position])
+      modules[slot][4] = position + 1
+      module_slot.append(slot)
+      path_range = path_ranges.setdefault(learning_path_id, [position, position])
+      path_range[1] = position + 1
+
+    packed = _PackedIds(bytes(ids))
+    permutation = sorted(range(len(packed)), key=packed.__getitem__)
+    self._ids = packed
+    self._sorted_ids = _PackedIds(b"".join(packed[position] for position in permutation))
+    self._sorted_positions = array("I", permutation)
+    self._order_index = order_index
+    self._xp_reward = xp_reward
+    self._module_slot = module_slot
+    self._key_blob = bytes(key_blob)
+    self._key_offsets = key_offsets
+    self._modules = tuple(tuple(module) for module in modules)
+    self._module_slots = module_slots
+    self._path_ranges = {path_id: (start, end) for path_id, (start, end) in path_ranges.items()}
+
+  def __len__(self) -> int:
+    return len(self._ids)
+
+  def position(self, lesson_id: UUID) -> int | None:
+    needle = lesson_id.bytes
+    slot = bisect_left(self._sorted_ids, needle)
+    if slot < len(self._sorted_ids) and self._sorted_ids[slot] == needle:
+      return self._sorted_positions[slot]
+    return None
+
+  def lesson_id(self, position: int) -> UUID:
+    return UUID(bytes=self._ids[position])
+
+  def key(self, position: int) -> str:
+    return self._key_blob[self._key_offsets[position]:self._key_offsets[position + 1]].decode("utf-8")
+
+  def ref(self, position: int) -> LessonRef:
+    module_id, learning_path_id, module_order, _, _ = self._modules[self._module_slot[position]]
+    path_start, _ = self._path_ranges[learning_path_id]
+    return LessonRef(
+        id=self.lesson_id(position),
+        key=self.key(position),
+        module_id=module_id,
+        learning_path_id=learning_path_id,
+        module_order=module_order,
+        order_index=self._order_index[position],
+        xp_reward=self._xp_reward[position],
+        path_position=position - path_start,
+    )
+
+  def path_range(self, learning_path_id: UUID) -> tuple[int, int] | None:
+    return self._path_ranges.get(learning_path_id)
+
+  def module_range(self, module_id: UUID) -> tuple[int, int] | None:
+    slot = self._module_slots.get(module_id)
+    if slot is None:
+      return None
+    _, _, _, start, end = self._modules[slot]
+    return start, end
+
+  def module_start(self, position: int) -> int:
+    return self._modules[self._module_slot[position]][3]
+
+
+class LessonBodyCache:
+  """Bounded LRU of serialised lesson bodies, loaded lazily and dropped on curriculum changes."""
+
+  def __init__(self, max_entries: int) -> None:
+    self._max_entries = max_entries
+    self._entries: OrderedDict[UUID, LessonSchema] = OrderedDict()
+    self._version: int | None = None
+    self.hits = 0
+    self.misses = 0
+
+  def get(self, lesson_id: UUID, *, version: int) -> LessonSchema | None:
+    if version != self._version:
+      self._entries.clear()
+      self._version = version
+    body = self._entries.get(lesson_id)
+    if body is None:
+      self.misses += 1
+      return None
+    self._entries.move_to_end(lesson_id)
+    self.hits += 1
+    return body
+
+  def put(self, lesson_id: UUID, body: LessonSchema, *, version: int) -> None:
+    if version != self._version:
+      self._entries.clear()
+      self._version = version
+    self._entries[lesson_id] = body
+    self._entries.move_to_end(lesson_id)
+    while len(self._entries) > self._max_entries:
+      self._entries.popitem(last=False)
+
+  def __len__(self) -> int:
+    return len(self._entries)
+
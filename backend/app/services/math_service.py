@@ -1,18 +1,28 @@
 from __future__ import annotations
 
+from typing import Any
 from uuid import UUID
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import Skill, SkillActivity, User
+from app.models import MathAttempt, Skill, SkillActivity, User
 from app.schemas import MathAttemptRequest, MathAttemptResponse
+from app.services.achievement_service import MATH_ACCURACY, MATH_ATTEMPTS, AchievementEngine, achievement_engine
 from app.services.gamification_service import GamificationEngine, gamification_engine
+from app.services.leaderboard_service import LeaderboardService, leaderboard_service
 
 
 class MathService:
-  def __init__(self, gamification: GamificationEngine) -> None:
+  def __init__(
+      self,
+      gamification: GamificationEngine,
+      achievements: AchievementEngine,
+      leaderboards: LeaderboardService,
+  ) -> None:
     self._gamification = gamification
+    self._achievements = achievements
+    self._leaderboards = leaderboards
 
   async def evaluate_attempt(
       self,
@@ -28,12 +38,52 @@ class MathService:
 
     skill = await self._get_skill(session, skill_key)
     activity = await self._get_activity(session, skill, request.challenge_id)
+    correct_count, total, mistakes = self.grade(activity, request.answers)
+    accuracy = correct_count / total if total else 0
+    xp_awarded = self.xp_for(activity, correct_count, total)
+    unlocked_lessons: list[str] = []
+    if accuracy >= 0.8:
+      unlocked_lessons.append(f"next-{skill.key}")
+    session.add(
+        MathAttempt(
+            user_id=user.id,
+            activity_id=activity.id,
+            answers=request.answers,
+            correct_count=correct_count,
+            total_questions=total,
+            xp_awarded=xp_awarded,
+        )
+    )
+
+    attempts_before, attempts_after = await self._achievements.increment(session, user.id, MATH_ATTEMPTS)
+    before = {"xp": user.xp, "level": user.level, "streak": user.current_streak, MATH_ATTEMPTS: attempts_before}
+    after = self._gamification.projected(user, xp=xp_awarded) | {MATH_ATTEMPTS: attempts_after, MATH_ACCURACY: accuracy}
+    # achievements go first and the users row is written last, so its lock is held only briefly before commit
+    achievements = await self._achievements.evaluate(session, user.id, before=before, after=after)
+    xp, level, streak, _ = await self._gamification.apply_rewards(session, user, xp=xp_awarded)
+    achievements += await self._achievements.evaluate(
+        session, user.id, before=after, after=after | {"xp": xp, "level": level, "streak": streak}
+    )
+    self._leaderboards.record_xp(session, user, xp_awarded)
+
+    return MathAttemptResponse(
+        correct_count=correct_count,
+        total_questions=total,
+        xp_awarded=xp_awarded,
+        mistakes=mistakes,
+        unlocked_lessons=unlocked_lessons,
+        achievements_awarded=achievements,
+    )
+
+  @staticmethod
+  def grade(activity: SkillActivity, answers: list[dict[str, Any]]) -> tuple[int, int, list[str]]:
+    """Check ``answers`` against the activity's problems; returns ``(correct, total, mistakes)``."""
     problems = (activity.content or {}).get("problems", [])
     answers_index = {problem["id"]: problem for problem in problems if "id" in problem}
 
     mistakes: list[str] = []
     correct_count = 0
-    for answer in request.answers:
+    for answer in answers:
       problem_id = answer.get("problem_id")
       expected = answers_index.get(problem_id, {}).get("answer")
       if expected is None:
@@ -43,29 +93,11 @@ class MathService:
         correct_count += 1
       else:
         mistakes.append(f"'{problem_id}' uchun to'g'ri javob {expected}, sen {answer.get('answer')} deding.")
+    return correct_count, len(problems), mistakes
 
-    total = len(problems)
-    accuracy = correct_count / total if total else 0
-    xp_awarded = int(activity.xp_reward * accuracy)
-    user.xp += xp_awarded
-    leveled_up = False
-    new_level = self._gamification.calculate_level(user.xp)
-    if new_level > user.level:
-      user.level = new_level
-      leveled_up = True
-    session.add(user)
-
-    unlocked_lessons: list[str] = []
-    if accuracy >= 0.8:
-      unlocked_lessons.append(f"next-{skill.key}")
-
-    return MathAttemptResponse(
-        correct_count=correct_count,
-        total_questions=total,
-        xp_awarded=xp_awarded,
-        mistakes=mistakes,
-        unlocked_lessons=unlocked_lessons,
-    )
+  @staticmethod
+  def xp_for(activity: SkillActivity, correct_count: int, total: int) -> int:
+    return int(activity.xp_reward * (correct_count / total if total else 0))
 
   async def _get_skill(self, session: AsyncSession, skill_key: str) -> Skill:
     result = await session.execute(select(Skill).where(Skill.key == skill_key))
@@ -93,6 +125,6 @@ class MathService:
     return activities[0]
 
 
-math_service = MathService(gamification_engine)
+math_service = MathService(gamification_engine, achievement_engine, leaderboard_service)
 
 
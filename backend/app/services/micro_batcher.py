@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Sequence
+from typing import Any, Generic, TypeVar
+
+ItemT = TypeVar("ItemT")
+ResultT = TypeVar("ResultT")
+
+
+class MicroBatcher(Generic[ItemT, ResultT]):
+  """Gathers concurrent submissions and hands them to ``handler`` as one batch.
+
+  A batch is sent when it holds ``max_items`` submissions or ``max_wait``
+  seconds after its first one, whichever comes first. ``handler`` returns
+  one result per item in order; ``None`` marks an item it could not answer,
+  which is then passed to ``fallback`` for that caller alone. If the handler
+  raises, every caller of the batch gets the error.
+  """
+
+  def __init__(
+      self,
+      handler: Callable[[list[ItemT]], Awaitable[Sequence[ResultT | None]]],
+      fallback: Callable[[ItemT], ResultT],
+      *,
+      max_items: int,
+      max_wait: float,
+  ) -> None:
+    self._handler = handler
+    self._fallback = fallback
+    self._max_items = max_items
+    self._max_wait = max_wait
+    self._pending: list[tuple[ItemT, asyncio.Future[ResultT]]] = []
+    self._timer: asyncio.TimerHandle | None = None
+    self._flushes: set[asyncio.Task] = set()
+    self.batches = 0
+    self.items = 0
+
+  async def submit(self, item: ItemT) -> ResultT:
+    future: asyncio.Future[ResultT] = asyncio.get_running_loop().create_future()
+    self._pending.append((item, future))
+    if len(self._pending) >= self._max_items:
+      self._flush()
+    elif self._timer is None:
+      self._timer = asyncio.get_running_loop().call_later(self._max_wait, self._flush)
+    return await future
+
+  def metrics(self) -> dict[str, Any]:
+    return {
+        "batches": self.batches,
+        "items": self.items,
+        "mean_batch_size": round(self.items / self.batches, 2) if self.batches else None,
+        "waiting": len(self._pending),
+    }
+
+  def _flush(self) -> None:
+    if self._timer is not None:
+      self._timer.cancel()
+      self._timer = None
+    batch, self._pending = self._pending, []
+    # callers that were cancelled while waiting are not sent upstream
+    batch = [(item, future) for item, future in batch if not future.done()]
+    if not batch:
+      return
+    self.batches += 1
+    self.items += len(batch)
+    task = asyncio.create_task(self._run(batch))
+    self._flushes.add(task)
+    task.add_done_callback(self._flushes.discard)
+
+  async def _run(self, batch: list[tuple[ItemT, asyncio.Future[ResultT]]]) -> None:
+    try:
+      results = await self._handler([item for item, _ in batch])
+    except Exception as exc:  # noqa: BLE001
+      for _, future in batch:
+        if not future.done():
+          future.set_exception(exc)
+      return
+    for index, (item, future) in enumerate(batch):
+      if future.done():
+        continue
+      result = results[index] if index < len(results) else None
+      future.set_result(result if result is not None else self._fallback(item))
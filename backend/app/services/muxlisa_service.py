@@ -1,20 +1,113 @@
 from __future__ import annotations
 
+import base64
+import importlib.util
+import uuid
+from collections.abc import AsyncIterator
 from typing import Any
 
 import httpx
 
 from app.core.config import settings
 from app.core.logging import logger
+from app.services.audio_cache import audio_media_type
+from app.services.singleflight import SingleFlight
+
+
+class SynthesisStream:
+  """Audio of one TTS answer, read chunk by chunk while Muxlisa is still sending it.
+
+  ``start`` reads the first chunk so upstream errors surface before anything
+  is sent to the client, and the media type can be sniffed from it when the
+  answer does not carry one.
+  """
+
+  def __init__(self, response: httpx.Response | None, chunks: AsyncIterator[bytes] | list[bytes]) -> None:
+    self._response = response
+    self._chunks = chunks
+    self._first = b""
+    self.media_type = "application/octet-stream"
+
+  @classmethod
+  async def start(cls, response: httpx.Response | None, chunks: AsyncIterator[bytes] | list[bytes]) -> SynthesisStream:
+    stream = cls(response, chunks)
+    if isinstance(chunks, list):
+      stream._first, stream._chunks = chunks[0], chunks[1:]
+    else:
+      stream._first = await anext(chunks, b"")
+    content_type = response.headers.get("content-type", "") if response is not None else ""
+    stream.media_type = content_type.split(";")[0] if content_type.startswith("audio/") else audio_media_type(stream._first[:16])
+    return stream
+
+  @property
+  def empty(self) -> bool:
+    return not self._first
+
+  async def __aiter__(self) -> AsyncIterator[bytes]:
+    if self._first:
+      yield self._first
+    if isinstance(self._chunks, list):
+      for chunk in self._chunks:
+        yield chunk
+    else:
+      async for chunk in self._chunks:
+        yield chunk
+
+  async def aclose(self) -> None:
+    if self._response is not None:
+      await self._response.aclose()
 
 
 class MuxlisaClient:
-  """Adapter for Muxlisa AI Speech services (STT / TTS)."""
+  """Adapter for Muxlisa AI Speech services (STT / TTS).
+
+  All requests of a worker go through one pooled ``httpx.AsyncClient``, so
+  connections (and their TLS sessions) are kept alive and reused; HTTP/2
+  multiplexes concurrent requests over one connection when the ``h2``
+  package is installed. The client is opened in ``initialize`` and closed
+  in ``close``; code running outside the application lifecycle gets one
+  lazily on first use.
+  """
 
-  def __init__(self, base_url: str, api_key: str) -> None:
+  def __init__(
+      self,
+      base_url: str,
+      api_key: str,
+      *,
+      http2: bool = True,
+      max_connections: int = 100,
+      max_keepalive_connections: int = 20,
+      keepalive_expiry: float = 30.0,
+  ) -> None:
     self._base_url = base_url.rstrip("/")
     self._api_key = api_key
     self._timeout = httpx.Timeout(30.0)
+    self._limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+    )
+    self._http2 = http2
+    self._client: httpx.AsyncClient | None = None
+    self._http2_active = False
+    self._synthesis: SingleFlight[bytes | None] = SingleFlight()
+
+  async def initialize(self) -> None:
+    self._http()
+
+  async def close(self) -> None:
+    if self._client is not None:
+      await self._client.aclose()
+      self._client = None
+
+  def _http(self) -> httpx.AsyncClient:
+    if self._client is None:
+      http2 = self._http2 and importlib.util.find_spec("h2") is not None
+      if self._http2 and not http2:
+        logger.warning("h2 package missing; Muxlisa requests use HTTP/1.1 keep-alive.")
+      self._client = httpx.AsyncClient(timeout=self._timeout, limits=self._limits, http2=http2)
+      self._http2_active = http2
+    return self._client
 
   def _headers(self, content_type: str = "application/json") -> dict[str, str]:
     headers = {
@@ -34,44 +127,30 @@ class MuxlisaClient:
     endpoint = f"{self._base_url}/v2/stt"
     
     try:
-      async with httpx.AsyncClient(timeout=self._timeout) as client:
-        if audio_file:
-          # FormData orqali audio fayl yuborish (to'g'ri format)
-          # Audio formatini aniqlash (webm, wav, mp3)
-          files = {"audio": ("audio.wav", audio_file, "audio/wav")}
-          # FormData uchun Content-Type ni o'chirish (httpx o'zi qo'shadi)
-          headers = {"x-api-key": self._api_key}
-          logger.info("Muxlisa STT Request: audio_size=%s bytes", len(audio_file))
-          response = await client.post(
-              endpoint,
-              files=files,
-              headers=headers,
-          )
-          logger.info("Muxlisa STT Response: status=%s", response.status_code)
-        elif audio_url:
-          # Audio URL orqali (agar API qo'llab-quvvatlasa)
-          # Eslatma: Yangi API faqat FormData qabul qiladi, shuning uchun audio_url ishlamaydi
-          logger.warning("audio_url parameter is not supported by v2 API, use audio_file instead")
-          return {"transcript": None, "confidence": None, "duration": None, "error": "audio_url not supported"}
-        else:
-          raise ValueError("Either audio_file must be provided for transcription.")
-        
-        response.raise_for_status()
-        data = response.json()
-        logger.info("Muxlisa STT Response Data: %s", data)
-        
-        # Turli formatlarni qo'llab-quvvatlash
-        transcript = data.get("transcript") or data.get("text") or data.get("result") or data.get("data", {}).get("transcript") or data.get("data", {}).get("text") or ""
-        confidence = data.get("confidence") or data.get("score") or data.get("data", {}).get("confidence")
-        duration = data.get("duration") or data.get("data", {}).get("duration")
+      client = self._http()
+      if audio_file:
+        # FormData orqali audio fayl yuborish (to'g'ri format)
+        # Audio formatini aniqlash (webm, wav, mp3)
+        files = {"audio": ("audio.wav", audio_file, "audio/wav")}
+        # FormData uchun Content-Type ni o'chirish (httpx o'zi qo'shadi)
+        headers = {"x-api-key": self._api_key}
+        logger.info("Muxlisa STT Request: audio_size=%s bytes", len(audio_file))
+        response = await client.post(
+            endpoint,
+            files=files,
+            headers=headers,
+        )
+        logger.info("Muxlisa STT Response: status=%s", response.status_code)
+      elif audio_url:
+        # Audio URL orqali (agar API qo'llab-quvvatlasa)
+        # Eslatma: Yangi API faqat FormData qabul qiladi, shuning uchun audio_url ishlamaydi
+        logger.warning("audio_url parameter is not supported by v2 API, use audio_file instead")
+        return {"transcript": None, "confidence": None, "duration": None, "error": "audio_url not supported"}
+      else:
+        raise ValueError("Either audio_file must be provided for transcription.")
         
-        logger.info("Muxlisa STT Result: transcript=%s, confidence=%s, duration=%s", transcript, confidence, duration)
-        
-        return {
-            "transcript": transcript,
-            "confidence": confidence,
-            "duration": duration,
-        }
+      response.raise_for_status()
+      return self._transcription_result(response.json())
     except httpx.HTTPError as exc:
       logger.error("Muxlisa transcription failed: %s", exc)
       # Provide a graceful fallback so development can continue offline.
@@ -80,51 +159,161 @@ class MuxlisaClient:
       logger.error("Muxlisa transcription unexpected error: %s", exc)
       return {"transcript": None, "confidence": None, "duration": None, "error": str(exc)}
 
+  async def transcribe_stream(
+      self,
+      chunks: AsyncIterator[bytes],
+      *,
+      filename: str,
+      content_type: str,
+      language: str = "uz",
+  ) -> dict[str, Any]:
+    """Send audio to STT as it arrives; the multipart body is produced chunk by chunk.
+
+    Errors raised by ``chunks`` (such as a failed duration check) propagate to
+    the caller and abort the upload; upstream failures return the same
+    fallback as ``transcribe``.
+    """
+    endpoint = f"{self._base_url}/v2/stt"
+    boundary = uuid.uuid4().hex
+    headers = {"x-api-key": self._api_key, "Content-Type": f"multipart/form-data; boundary={boundary}"}
+
+    async def body() -> AsyncIterator[bytes]:
+      yield (
+          f"--{boundary}\r\n"
+          f'Content-Disposition: form-data; name="audio"; filename="{filename}"\r\n'
+          f"Content-Type: {content_type}\r\n\r\n"
+      ).encode()
+      async for chunk in chunks:
+        yield chunk
+      yield f"\r\n--{boundary}--\r\n".encode()
+
+    try:
+      client = self._http()
+      response = await client.post(endpoint, content=body(), headers=headers)
+      logger.info("Muxlisa STT Response: status=%s", response.status_code)
+      response.raise_for_status()
+      return self._transcription_result(response.json())
+    except httpx.HTTPError as exc:
+      logger.error("Muxlisa streaming transcription failed: %s", exc)
+      return {"transcript": None, "confidence": None, "duration": None, "error": str(exc)}
+
+  @staticmethod
+  def _transcription_result(data: dict[str, Any]) -> dict[str, Any]:
+    logger.info("Muxlisa STT Response Data: %s", data)
+
+    # Turli formatlarni qo'llab-quvvatlash
+    transcript = data.get("transcript") or data.get("text") or data.get("result") or data.get("data", {}).get("transcript") or data.get("data", {}).get("text") or ""
+    confidence = data.get("confidence") or data.get("score") or data.get("data", {}).get("confidence")
+    duration = data.get("duration") or data.get("data", {}).get("duration")
+
+    logger.info("Muxlisa STT Result: transcript=%s, confidence=%s, duration=%s", transcript, confidence, duration)
+
+    return {
+        "transcript": transcript,
+        "confidence": confidence,
+        "duration": duration,
+    }
+
   # Maftuna - qiz bola ovozida gapirish
   # Muxlisa AI dan "Maftuna" nomli qiz bola ovozini olish
-  async def synthesize(self, *, text: str, voice: str = "maftuna", language: str = "uz") -> dict[str, Any]:
+  async def synthesize(self, *, text: str, voice: str = "maftuna", language: str = "uz") -> bytes | None:
+    """Audio bytes of ``text`` spoken by ``voice``, or None when Muxlisa gives none."""
+    # the same prompt requested by many children at once is synthesised once
+    return await self._synthesis.do(
+        (text, voice, language),
+        lambda: self._request_synthesis(text=text, voice=voice, language=language),
+    )
+
+  def metrics(self) -> dict[str, Any]:
+    return {"synthesis": self._synthesis.metrics(), "http2": self._http2_active}
+
+  async def _request_synthesis(self, *, text: str, voice: str, language: str) -> bytes | None:
     endpoint = f"{self._base_url}/v2/tts"
     payload = {"text": text, "voice": voice, "language": language}
     try:
       logger.info("Muxlisa TTS Request: text=%s, voice=%s, language=%s", text, voice, language)
-      async with httpx.AsyncClient(timeout=self._timeout) as client:
-        response = await client.post(endpoint, json=payload, headers=self._headers())
-        logger.info("Muxlisa TTS Response: status=%s", response.status_code)
-        
-        # Agar response audio fayl bo'lsa (content-type: audio/*)
-        content_type = response.headers.get("content-type", "")
-        if "audio" in content_type:
-          logger.info("Muxlisa TTS: Audio file response detected")
-          import base64
-          audio_bytes = response.content
-          audio_base64 = base64.b64encode(audio_bytes).decode("utf-8")
-          return {
-              "audio_base64": audio_base64,
-              "text": text,
-          }
-        
-        # Agar response JSON bo'lsa
-        response.raise_for_status()
-        data = response.json()
-        logger.info("Muxlisa TTS Response Data: %s", data)
-        
-        # Turli formatlarni qo'llab-quvvatlash
-        audio_url = data.get("audio_url") or data.get("url") or data.get("result", {}).get("audio_url") or data.get("data", {}).get("audio_url")
-        audio_base64 = data.get("audio_base64") or data.get("audio") or data.get("result", {}).get("audio_base64") or data.get("data", {}).get("audio_base64")
-        
-        return {
-            "audio_url": audio_url,
-            "audio_base64": audio_base64,
-            "text": data.get("text") or text,
-        }
-    except httpx.HTTPError as exc:
+      client = self._http()
+      response = await client.post(endpoint, json=payload, headers=self._headers())
+      logger.info("Muxlisa TTS Response: status=%s", response.status_code)
+      response.raise_for_status()
+
+      # Agar response audio fayl bo'lsa (content-type: audio/*)
+      content_type = response.headers.get("content-type", "")
+      if "audio" in content_type:
+        return response.content
+
+      # Agar response JSON bo'lsa
+      audio_base64, audio_url = self._synthesis_result(response.json())
+      if audio_base64:
+        return base64.b64decode(audio_base64)
+      if audio_url:
+        download = await client.get(audio_url)
+        download.raise_for_status()
+        return download.content
+      return None
+    except (httpx.HTTPError, ValueError) as exc:
       logger.error("Muxlisa synthesis failed: %s", exc)
-      return {"audio_url": None, "audio_base64": None, "error": str(exc)}
-    except Exception as exc:
-      logger.error("Muxlisa synthesis unexpected error: %s", exc)
-      return {"audio_url": None, "audio_base64": None, "error": str(exc)}
+      return None
+
+  async def stream_synthesis(
+      self, *, text: str, voice: str = "maftuna", language: str = "uz"
+  ) -> SynthesisStream | None:
+    """Open a TTS request whose audio is read chunk by chunk as Muxlisa sends it.
+
+    Audio answers are relayed as they arrive; an ``audio_url`` answer is
+    downloaded the same way. None means Muxlisa gave no audio. The caller
+    must ``aclose`` the returned stream.
+    """
+    endpoint = f"{self._base_url}/v2/tts"
+    payload = {"text": text, "voice": voice, "language": language}
+    client = self._http()
+    response: httpx.Response | None = None
+    try:
+      logger.info("Muxlisa TTS stream request: text=%s, voice=%s, language=%s", text, voice, language)
+      request = client.build_request("POST", endpoint, json=payload, headers=self._headers())
+      response = await client.send(request, stream=True)
+      logger.info("Muxlisa TTS stream: status=%s", response.status_code)
+      response.raise_for_status()
+      if "audio" not in response.headers.get("content-type", ""):
+        await response.aread()
+        audio_base64, audio_url = self._synthesis_result(response.json())
+        await response.aclose()
+        if audio_base64:
+          return await SynthesisStream.start(None, [base64.b64decode(audio_base64)])
+        if not audio_url:
+          return None
+        response = await client.send(client.build_request("GET", audio_url), stream=True)
+        response.raise_for_status()
+      stream = await SynthesisStream.start(response, response.aiter_bytes())
+      if stream.empty:
+        await stream.aclose()
+        return None
+      return stream
+    except (httpx.HTTPError, ValueError) as exc:
+      logger.error("Muxlisa synthesis stream failed: %s", exc)
+      if response is not None:
+        await response.aclose()
+      return None
 
+  @staticmethod
+  def _synthesis_result(data: dict[str, Any]) -> tuple[str | None, str | None]:
+    logger.info("Muxlisa TTS Response Data: %s", data)
+    result = data.get("result") or {}
+    nested = data.get("data") or {}
+    # Turli formatlarni qo'llab-quvvatlash
+    audio_base64 = data.get("audio_base64") or data.get("audio") or result.get("audio_base64") or nested.get("audio_base64")
+    audio_url = data.get("audio_url") or data.get("url") or result.get("audio_url") or nested.get("audio_url")
+    if not audio_base64 and not audio_url:
+      logger.warning("Muxlisa TTS response carried no audio: %s", data)
+    return audio_base64, audio_url
 
-muxlisa_client = MuxlisaClient(base_url=str(settings.muxlisa_api_url), api_key=settings.muxlisa_api_key)
+muxlisa_client = MuxlisaClient(
+    base_url=str(settings.muxlisa_api_url),
+    api_key=settings.muxlisa_api_key,
+    http2=settings.muxlisa_http2,
+    max_connections=settings.muxlisa_max_connections,
+    max_keepalive_connections=settings.muxlisa_max_keepalive_connections,
+    keepalive_expiry=settings.muxlisa_keepalive_seconds,
+)
 
 
@@ -1,20 +1,102 @@
 from __future__ import annotations
 
+import asyncio
+import json
+import time
+from dataclasses import dataclass
 from typing import Any
+from uuid import UUID
 
-from openai import AsyncOpenAI, OpenAIError
+from openai import APIConnectionError, AsyncOpenAI, InternalServerError, OpenAIError, RateLimitError
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_random_exponential
 
 from app.core.config import settings
 from app.core.logging import logger
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.evaluation_cache import EvaluationCache, evaluation_cache, evaluation_key
+from app.services.micro_batcher import MicroBatcher
+from app.services.phonetic_scorer import PASSED_ENCOURAGEMENT, RETRY_ENCOURAGEMENT, PhoneticScorer
+from app.services.singleflight import SingleFlight
+
+# transient upstream errors worth another try within the deadline
+_RETRYABLE = (APIConnectionError, RateLimitError, InternalServerError)
+
+SILENCE_ENCOURAGEMENT = "Chunkini qayta aytib ko'r!"
+# every encouragement _fallback_feedback can answer with
+FALLBACK_ENCOURAGEMENTS = (SILENCE_ENCOURAGEMENT, PASSED_ENCOURAGEMENT, RETRY_ENCOURAGEMENT)
+
+
+@dataclass(frozen=True, slots=True)
+class EvaluationRequest:
+  key: str
+  transcript: str | None
+  target_letter: str | None
+  target_sound: str | None
+  example_words: list[str]
+  user_age: int | None
 
 
 class OpenAIAdapter:
-  """Wrapper over OpenAI responses API to evaluate pronunciation and generate feedback."""
+  """Wrapper over OpenAI responses API to evaluate pronunciation and generate feedback.
 
-  def __init__(self, api_key: str, model: str) -> None:
+  With ``batch_size`` above one, evaluations arriving within ``batch_wait``
+  seconds of each other are scored by a single request.
+
+  At most ``max_concurrency`` requests run at once and at most ``max_queue``
+  wait for a slot; beyond that, and whenever the circuit breaker is open, the
+  heuristic fallback is returned at once. Each evaluation, including its
+  wait and up to ``retries`` jittered retries of transient errors, must
+  finish within ``deadline`` seconds.
+
+  With ``phonetic_fast_path`` the local phonetic scorer decides clear cases
+  before the cache or the model are consulted; it also scores the fallback.
+  """
+
+  def __init__(
+      self,
+      api_key: str,
+      model: str,
+      cache: EvaluationCache | None = None,
+      *,
+      batch_size: int = 1,
+      batch_wait: float = 0.02,
+      max_concurrency: int = 16,
+      max_queue: int = 200,
+      deadline: float = 8.0,
+      retries: int = 2,
+      breaker_failures: int = 5,
+      slow_call_seconds: float = 5.0,
+      breaker_probe_seconds: float = 15.0,
+      phonetic: PhoneticScorer | None = None,
+      phonetic_fast_path: bool = False,
+  ) -> None:
     self._model = model
+    self._phonetic = phonetic or PhoneticScorer()
+    self._phonetic_fast_path = phonetic_fast_path
+    self._max_concurrency = max_concurrency
+    self._slots = asyncio.Semaphore(max_concurrency)
+    self._max_queue = max_queue
+    self._waiting = 0
+    self._running = 0
+    self._deadline = deadline
+    self._retries = retries
+    self._breaker = CircuitBreaker(
+        "OpenAI",
+        self._probe,
+        failure_threshold=breaker_failures,
+        slow_call_seconds=slow_call_seconds,
+        probe_interval=breaker_probe_seconds,
+    )
+    self.shed = 0
+    self.timeouts = 0
+    self._cache = cache
+    self._inflight: SingleFlight[dict[str, Any]] = SingleFlight()
+    self._batcher: MicroBatcher[EvaluationRequest, dict[str, Any]] | None = None
+    if batch_size > 1:
+      self._batcher = MicroBatcher(self._evaluate_batch, self._fallback_for, max_items=batch_size, max_wait=batch_wait)
     if api_key:
-      self._client = AsyncOpenAI(api_key=api_key)
+      # retries and deadlines are handled here, per evaluation
+      self._client = AsyncOpenAI(api_key=api_key, timeout=deadline, max_retries=0)
     else:
       self._client = None
 
@@ -25,32 +107,238 @@ class OpenAIAdapter:
       target_letter: str | None,
       example_words: list[str],
       user_age: int | None,
+      lesson_id: UUID | None = None,
+      target_sound: str | None = None,
+      refresh: bool = False,
   ) -> dict[str, Any]:
+    """Score a transcript; ``refresh`` skips the local fast path and cached answers and asks the model again."""
+    if self._phonetic_fast_path and not refresh:
+      # clear passes and clear misses are decided locally in microseconds
+      local = self._phonetic.resolve(
+          transcript=transcript,
+          target_letter=target_letter,
+          target_sound=target_sound,
+          example_words=example_words,
+      )
+      if local is not None:
+        return local.feedback()
+
     if self._client is None:
       logger.warning("OpenAI API key missing; returning heuristic pronunciation feedback.")
-      return self._fallback_feedback(transcript=transcript, target_letter=target_letter, example_words=example_words)
+      return self._fallback_feedback(
+          transcript=transcript,
+          target_letter=target_letter,
+          example_words=example_words,
+          target_sound=target_sound,
+      )
 
-    instructions = self._build_prompt(
+    key = evaluation_key(
+        lesson_id=lesson_id,
+        model=self._model,
         transcript=transcript,
         target_letter=target_letter,
         example_words=example_words,
         user_age=user_age,
     )
+    if self._cache is not None and not refresh:
+      cached = await self._cache.get(key)
+      if cached is not None:
+        return cached
+
+    # children in one class often send the same word at once; they share one request
+    return await self._inflight.do(
+        key,
+        lambda: self._request_evaluation(
+            key,
+            transcript=transcript,
+            target_letter=target_letter,
+            target_sound=target_sound,
+            example_words=example_words,
+            user_age=user_age,
+        ),
+    )
 
+  def metrics(self) -> dict[str, Any]:
+    metrics = {
+        "model": self._model,
+        "enabled": self._client is not None,
+        **self._inflight.metrics(),
+        "running": self._running,
+        "max_concurrency": self._max_concurrency,
+        "queued": self._waiting,
+        "shed": self.shed,
+        "timeouts": self.timeouts,
+        "breaker": self._breaker.metrics(),
+    }
+    if self._phonetic_fast_path:
+      metrics["phonetic"] = self._phonetic.metrics()
+    if self._batcher is not None:
+      metrics["batching"] = self._batcher.metrics()
+    return metrics
+
+  async def close(self) -> None:
+    await self._breaker.close()
+
+  async def _create_response(self, instructions: str) -> str | None:
+    """Ask the model under the admission, deadline, retry and breaker rules; ``None`` means use the fallback."""
+    if not self._breaker.allow():
+      return None
+    if self._waiting >= self._max_queue:
+      self.shed += 1
+      logger.warning("OpenAI queue full (%s waiting); fallback feedback used.", self._waiting)
+      return None
+
+    acquired = False
+    started = time.monotonic()
     try:
-      response = await self._client.responses.create(
-          model=self._model,
-          input=instructions,
-          temperature=0.4,
-      )
-      content = self._extract_text(response)
-      if not content:
-        return self._fallback_feedback(transcript=transcript, target_letter=target_letter, example_words=example_words)
-      feedback = self._parse_feedback(content)
-      return feedback
+      async with asyncio.timeout(self._deadline):
+        self._waiting += 1
+        try:
+          await self._slots.acquire()
+          acquired = True
+          self._running += 1
+        finally:
+          self._waiting -= 1
+        started = time.monotonic()
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(self._retries + 1),
+            wait=wait_random_exponential(multiplier=0.25, max=2.0),
+            retry=retry_if_exception_type(_RETRYABLE),
+            reraise=True,
+        ):
+          with attempt:
+            response = await self._client.responses.create(
+                model=self._model,
+                input=instructions,
+                temperature=0.4,
+            )
+    except TimeoutError:
+      self.timeouts += 1
+      # a call that never got a slot says nothing about the upstream
+      if acquired:
+        self._breaker.record_failure()
+      logger.error("OpenAI pronunciation evaluation exceeded its %.1fs deadline.", self._deadline)
+      return None
     except OpenAIError as exc:
+      self._breaker.record_failure()
       logger.error("OpenAI pronunciation evaluation failed: %s", exc)
-      return self._fallback_feedback(transcript=transcript, target_letter=target_letter, example_words=example_words)
+      return None
+    finally:
+      if acquired:
+        self._running -= 1
+        self._slots.release()
+    self._breaker.record_success(time.monotonic() - started)
+    return self._extract_text(response)
+
+  async def _probe(self) -> None:
+    await self._client.models.retrieve(self._model)
+
+  async def _request_evaluation(
+      self,
+      key: str,
+      *,
+      transcript: str | None,
+      target_letter: str | None,
+      target_sound: str | None,
+      example_words: list[str],
+      user_age: int | None,
+  ) -> dict[str, Any]:
+    request = EvaluationRequest(
+        key=key,
+        transcript=transcript,
+        target_letter=target_letter,
+        target_sound=target_sound,
+        example_words=example_words,
+        user_age=user_age,
+    )
+    if self._batcher is not None:
+      return await self._batcher.submit(request)
+    return await self._evaluate_one(request)
+
+  async def _evaluate_one(self, request: EvaluationRequest) -> dict[str, Any]:
+    instructions = self._build_prompt(
+        transcript=request.transcript,
+        target_letter=request.target_letter,
+        example_words=request.example_words,
+        user_age=request.user_age,
+    )
+
+    content = await self._create_response(instructions)
+    if not content:
+      return self._fallback_for(request)
+    feedback = self._parse_feedback(content)
+    feedback["source"] = self._model
+    await self._remember(request, feedback)
+    return feedback
+
+  async def _evaluate_batch(self, requests: list[EvaluationRequest]) -> list[dict[str, Any] | None]:
+    """Score several attempts with one request; entries the model leaves out get ``None``."""
+    if len(requests) == 1:
+      return [await self._evaluate_one(requests[0])]
+    content = await self._create_response(self._build_batch_prompt(requests))
+    if content is None:
+      return [None] * len(requests)
+
+    by_id = self._parse_batch_feedback(content)
+    results: list[dict[str, Any] | None] = []
+    for index, request in enumerate(requests):
+      feedback = by_id.get(index)
+      if feedback is not None:
+        feedback["source"] = self._model
+        await self._remember(request, feedback)
+      results.append(feedback)
+    missing = results.count(None)
+    if missing:
+      logger.warning("OpenAI batch answer missed %s of %s attempts; fallback used for them.", missing, len(requests))
+    return results
+
+  async def _remember(self, request: EvaluationRequest, feedback: dict[str, Any]) -> None:
+    # only answers the model actually scored are worth replaying
+    if self._cache is not None and feedback.get("score") is not None:
+      await self._cache.put(request.key, feedback)
+
+  def _fallback_for(self, request: EvaluationRequest) -> dict[str, Any]:
+    return self._fallback_feedback(
+        transcript=request.transcript,
+        target_letter=request.target_letter,
+        example_words=request.example_words,
+        target_sound=request.target_sound,
+    )
+
+  @staticmethod
+  def _build_batch_prompt(requests: list[EvaluationRequest]) -> str:
+    attempts = [
+        {
+            "id": index,
+            "target_letter": request.target_letter,
+            "example_words": request.example_words[:4],
+            "age": request.user_age,
+            "transcript": request.transcript or "audio tushunarsiz",
+        }
+        for index, request in enumerate(requests)
+    ]
+    return (
+        "Siz bolalar uchun talaffuz murabbiyi sifatida ishlaysiz.\n"
+        "Quyidagi har bir urinishni alohida baholang va 0-1 oralig'ida to'liq son bo'lmagan baho bering.\n"
+        "Natija faqat JSON massiv bo'lsin, har bir urinish uchun bitta element: "
+        "[{\"id\": int, \"score\": float, \"issues\": [str], \"encouragement\": str}].\n"
+        f"Urinishlar: {json.dumps(attempts, ensure_ascii=False)}\n"
+    )
+
+  @staticmethod
+  def _parse_batch_feedback(content: str) -> dict[int, dict[str, Any]]:
+    try:
+      parsed = json.loads(content)
+    except ValueError:
+      logger.warning("OpenAI batch javobi JSON formatida emas: %s", content)
+      return {}
+    if isinstance(parsed, dict):
+      parsed = parsed.get("results", [])
+    by_id: dict[int, dict[str, Any]] = {}
+    for entry in parsed if isinstance(parsed, list) else []:
+      if isinstance(entry, dict) and isinstance(entry.get("id"), int) and entry.get("score") is not None:
+        by_id[entry.pop("id")] = entry
+    return by_id
 
   @staticmethod
   def _build_prompt(*, transcript: str | None, target_letter: str | None, example_words: list[str], user_age: int | None) -> str:
@@ -80,37 +368,55 @@ class OpenAIAdapter:
   @staticmethod
   def _parse_feedback(content: str) -> dict[str, Any]:
     try:
-      import json
-
       return json.loads(content)
     except Exception:  # noqa: BLE001
       logger.warning("OpenAI javobi JSON formatida emas, fallback ishlatiladi: %s", content)
       return {"score": None, "issues": ["Javobni tahlil qilib bo'lmadi"], "encouragement": content}
 
-  @staticmethod
-  def _fallback_feedback(*, transcript: str | None, target_letter: str | None, example_words: list[str]) -> dict[str, Any]:
+  def _fallback_feedback(
+      self,
+      *,
+      transcript: str | None,
+      target_letter: str | None,
+      example_words: list[str],
+      target_sound: str | None = None,
+  ) -> dict[str, Any]:
     if not transcript:
       return {
           "score": 0.0,
           "issues": ["Ovoz aniqlanmadi. Keling, yana birga aytamiz!"],
-          "encouragement": "Chunkini qayta aytib ko'r!",
+          "encouragement": SILENCE_ENCOURAGEMENT,
+          "source": "fallback",
       }
-    lowered = transcript.lower()
-    target = (target_letter or "").lower()
-    issues: list[str] = []
-    score = 0.6
-    if target and target not in lowered:
-      issues.append(f"'{target}' tovushi aniq eshitilmadi.")
-      score = 0.3
-    elif any(word.lower() in lowered for word in example_words):
-      score = 0.9
-    return {
-        "score": score,
-        "issues": issues,
-        "encouragement": "Zo'r ishlading! Keling, rasmga qarab yana takrorlaymiz.",
-    }
+    feedback = self._phonetic.score(
+        transcript=transcript,
+        target_letter=target_letter,
+        target_sound=target_sound,
+        example_words=example_words,
+    ).feedback()
+    # the same scorer as the fast path, but used because the model was unavailable
+    feedback["source"] = "fallback"
+    return feedback
 
 
-openai_adapter = OpenAIAdapter(api_key=settings.openai_api_key, model=settings.openai_model)
+openai_adapter = OpenAIAdapter(
+    api_key=settings.openai_api_key,
+    model=settings.openai_model,
+    cache=evaluation_cache,
+    batch_size=settings.evaluation_batch_size,
+    batch_wait=settings.evaluation_batch_wait_ms / 1000,
+    max_concurrency=settings.openai_max_concurrency,
+    max_queue=settings.openai_max_queue,
+    deadline=settings.openai_deadline_seconds,
+    retries=settings.openai_retries,
+    breaker_failures=settings.openai_breaker_failures,
+    slow_call_seconds=settings.openai_slow_call_seconds,
+    breaker_probe_seconds=settings.openai_breaker_probe_seconds,
+    phonetic=PhoneticScorer(
+        accept_score=settings.phonetic_accept_score,
+        reject_score=settings.phonetic_reject_score,
+    ),
+    phonetic_fast_path=settings.phonetic_fast_path,
+)
 
 
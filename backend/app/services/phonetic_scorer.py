@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any
+
+from app.services.evaluation_cache import normalize_transcript
+
+_VOWELS = frozenset("aeiouö")
+# Uzbek Latin digraphs; "ng" is handled separately because it is only one sound before a consonant or at the end
+_DIGRAPHS = {"o'": "ö", "g'": "ğ", "sh": "ʃ", "ch": "č"}
+GLOTTAL_STOP = "ʔ"
+
+# sounds children commonly swap for one another cost less than an unrelated substitution
+_NEAR = {
+    frozenset(("o", "ö")): 0.3,
+    frozenset(("u", "ö")): 0.5,
+    frozenset(("g", "ğ")): 0.3,
+    frozenset(("s", "ʃ")): 0.4,
+    frozenset(("č", "ʃ")): 0.4,
+    frozenset(("j", "č")): 0.5,
+    frozenset(("n", "ŋ")): 0.3,
+    frozenset(("k", "q")): 0.3,
+    frozenset(("h", "x")): 0.3,
+    frozenset(("i", "y")): 0.5,
+    frozenset(("e", "i")): 0.6,
+    frozenset(("a", "o")): 0.6,
+    frozenset(("b", "p")): 0.5,
+    frozenset(("d", "t")): 0.5,
+    frozenset(("v", "f")): 0.5,
+    frozenset(("z", "s")): 0.5,
+}
+# the tutuq belgisi is often dropped in speech-to-text output
+_INDEL = {GLOTTAL_STOP: 0.3}
+
+PASSED_ENCOURAGEMENT = "Zo'r ishlading! Keling, rasmga qarab yana takrorlaymiz."
+RETRY_ENCOURAGEMENT = "Keling, yana birga aytamiz!"
+
+
+@lru_cache(maxsize=4096)
+def to_phonemes(word: str) -> tuple[str, ...]:
+  """Grapheme-to-phoneme conversion of one normalised Uzbek Latin word."""
+  phonemes: list[str] = []
+  index = 0
+  while index < len(word):
+    pair = word[index:index + 2]
+    if pair in _DIGRAPHS:
+      phonemes.append(_DIGRAPHS[pair])
+      index += 2
+    elif pair == "ng" and (index + 2 == len(word) or word[index + 2] not in _VOWELS):
+      phonemes.append("ŋ")
+      index += 2
+    elif word[index] == "'":
+      phonemes.append(GLOTTAL_STOP)
+      index += 1
+    else:
+      phonemes.append(word[index])
+      index += 1
+  return tuple(phonemes)
+
+
+def phoneme_distance(spoken: tuple[str, ...], expected: tuple[str, ...]) -> float:
+  """Weighted Levenshtein distance with cheaper substitutions between near sounds."""
+  previous = [0.0]
+  for phoneme in expected:
+    previous.append(previous[-1] + _INDEL.get(phoneme, 1.0))
+  for heard in spoken:
+    current = [previous[0] + _INDEL.get(heard, 1.0)]
+    for column, phoneme in enumerate(expected, start=1):
+      substitution = 0.0 if heard == phoneme else _NEAR.get(frozenset((heard, phoneme)), 1.0)
+      current.append(min(
+          previous[column - 1] + substitution,
+          previous[column] + _INDEL.get(heard, 1.0),
+          current[column - 1] + _INDEL.get(phoneme, 1.0),
+      ))
+    previous = current
+  return previous[-1]
+
+
+@dataclass(slots=True)
+class PhoneticScore:
+  score: float
+  decided: bool
+  matched_word: str | None = None
+  issues: list[str] = field(default_factory=list)
+
+  def feedback(self) -> dict[str, Any]:
+    passed = not self.issues and self.score >= 0.75
+    return {
+        "score": round(self.score, 3),
+        "issues": self.issues,
+        "encouragement": PASSED_ENCOURAGEMENT if passed else RETRY_ENCOURAGEMENT,
+        "source": "phonetic",
+    }
+
+
+class PhoneticScorer:
+  """Scores a transcript against a lesson's target letter and example words without the LLM.
+
+  Words are converted to phonemes (o‘, g‘, sh, ch, ng and the tutuq belgisi
+  are single sounds) and every spoken word is compared with every example
+  word by weighted edit distance. The best similarity is the score; a target
+  sound that was never heard halves it. A spoken word that is the target
+  letter or target sound itself is a full match. Scores at or above
+  ``accept_score`` or at or below ``reject_score`` are clear and
+  ``decided``; the rest are left to the LLM.
+  """
+
+  def __init__(self, *, accept_score: float = 0.9, reject_score: float = 0.35) -> None:
+    self._accept_score = accept_score
+    self._reject_score = reject_score
+    self.accepted = 0
+    self.rejected = 0
+    self.ambiguous = 0
+
+  def score(
+      self,
+      *,
+      transcript: str | None,
+      target_letter: str | None,
+      target_sound: str | None = None,
+      example_words: list[str],
+  ) -> PhoneticScore:
+    spoken = [to_phonemes(word) for word in normalize_transcript(transcript).split()]
+    if not spoken:
+      return PhoneticScore(0.0, True, issues=["Ovoz aniqlanmadi. Keling, yana birga aytamiz!"])
+
+    # saying the letter or its sound on its own is a correct answer, with or without example words
+    for text in (target_letter, target_sound):
+      bare = normalize_transcript(text)
+      if bare and to_phonemes(bare.replace(" ", "")) in spoken:
+        return PhoneticScore(1.0, True, matched_word=bare)
+
+    target_text = normalize_transcript(target_sound or target_letter)
+    target = to_phonemes(target_text.replace(" ", "")) if target_text else ()
+    heard = {phoneme for word in spoken for phoneme in word}
+    target_heard = not target or all(phoneme in heard for phoneme in target)
+
+    expected = [(word, to_phonemes(normalize_transcript(word).replace(" ", ""))) for word in example_words]
+    expected = [(word, phonemes) for word, phonemes in expected if phonemes]
+    if not expected:
+      return PhoneticScore(0.6 if target_heard else 0.3, False)
+
+    best, matched = 0.0, None
+    for word in spoken:
+      for example, phonemes in expected:
+        similarity = 1.0 - phoneme_distance(word, phonemes) / max(len(word), len(phonemes))
+        if similarity > best:
+          best, matched = similarity, example
+
+    issues: list[str] = []
+    if not target_heard:
+      best /= 2
+      issues.append(f"'{target_text}' tovushi aniq eshitilmadi.")
+    decided = best >= self._accept_score or best <= self._reject_score
+    return PhoneticScore(max(best, 0.0), decided, matched_word=matched, issues=issues)
+
+  def resolve(
+      self,
+      *,
+      transcript: str | None,
+      target_letter: str | None,
+      target_sound: str | None = None,
+      example_words: list[str],
+  ) -> PhoneticScore | None:
+    """Score an attempt for the fast path; returns the result only when it is clear enough to skip the LLM."""
+    result = self.score(
+        transcript=transcript,
+        target_letter=target_letter,
+        target_sound=target_sound,
+        example_words=example_words,
+    )
+    if not result.decided:
+      self.ambiguous += 1
+      return None
+    if result.score >= self._accept_score:
+      self.accepted += 1
+    else:
+      self.rejected += 1
+    return result
+
+  def metrics(self) -> dict[str, Any]:
+    total = self.accepted + self.rejected + self.ambiguous
+    return {
+        "accept_score": self._accept_score,
+        "reject_score": self._reject_score,
+        "accepted": self.accepted,
+        "rejected": self.rejected,
+        "ambiguous": self.ambiguous,
+        "resolved_ratio": round((self.accepted + self.rejected) / total, 4) if total else None,
+    }
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+from collections.abc import Callable, Iterable
+from datetime import datetime, timezone
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import load_only
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.session import async_session_factory
+from app.models import Lesson
+from app.schemas import SpeechPrerenderStatus
+from app.services.openai_service import FALLBACK_ENCOURAGEMENTS
+from app.services.speech_service import SpeechService, SpeechUnavailable, speech_service
+
+
+def speech_digest(*, title: str, example_words: list[str], voice: str, language: str) -> str:
+  """Hash of everything a lesson's rendered speech depends on."""
+  parts = [voice, language, title, example_words]
+  return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode()).hexdigest()
+
+
+class SpeechPrerenderService:
+  """Renders the speech of curriculum text ahead of time, so lessons never wait for TTS.
+
+  Lessons are walked in primary-key order in batches; the title and example
+  words of each are synthesised into the audio cache, at most
+  ``concurrency`` at a time, and the clip keys are stored in
+  ``Lesson.media_assets["speech"]`` with a hash of the text they were made
+  from. Lessons whose hash still matches and whose clips are all still in
+  the cache are skipped, so a run after a content change only renders what
+  changed or was evicted. The fallback encouragements are rendered at the
+  start of every run.
+
+  Each batch is committed on its own and the run's status is written to a
+  checkpoint file, so an interrupted run resumes after the last committed
+  lesson. Lessons that failed to render keep their old entry and are
+  retried by the next run.
+  """
+
+  def __init__(
+      self,
+      speech: SpeechService,
+      session_factory: async_sessionmaker[AsyncSession],
+      *,
+      concurrency: int,
+      batch_size: int,
+      checkpoint_path: str,
+      voice: str = "maftuna",
+      language: str = "uz",
+  ) -> None:
+    self._speech = speech
+    self._session_factory = session_factory
+    self._concurrency = concurrency
+    self._batch_size = batch_size
+    self._checkpoint_path = checkpoint_path
+    self._voice = voice
+    self._language = language
+    self._task: asyncio.Task | None = None
+    # resume flag of the run queued behind the current one, None when nothing is queued
+    self._again: bool | None = None
+    self.status = SpeechPrerenderStatus()
+
+  def schedule(self, *, resume: bool = True) -> None:
+    """Start a run in the background; while one is going, run once more after it.
+
+    ``resume=False`` ignores the checkpoint and rescans from the first lesson,
+    as needed after content changes; if queued runs disagree, the rescan wins.
+    """
+    if self._task is not None and not self._task.done():
+      self._again = resume if self._again is None else self._again and resume
+      return
+    self._task = asyncio.create_task(self._run_in_background(resume), name="speech-prerender")
+
+  async def close(self) -> None:
+    if self._task is not None:
+      self._task.cancel()
+      await asyncio.gather(self._task, return_exceptions=True)
+      self._task = None
+
+  async def run(
+      self,
+      session: AsyncSession,
+      *,
+      resume: bool = True,
+      progress: Callable[[SpeechPrerenderStatus], None] | None = None,
+  ) -> SpeechPrerenderStatus:
+    status = (self._load_checkpoint() if resume else None) or SpeechPrerenderStatus(
+        started_at=datetime.now(timezone.utc),
+    )
+    if status.last_lesson_id is not None:
+      logger.info("Resuming speech pre-render after lesson %s (%s scanned).", status.last_lesson_id, status.scanned)
+    status.running = True
+    self.status = status
+    try:
+      status.phrases = len(await self._render(FALLBACK_ENCOURAGEMENTS))
+      while True:
+        query = (
+            select(Lesson)
+            .options(load_only(Lesson.id, Lesson.title, Lesson.example_words, Lesson.media_assets))
+            .order_by(Lesson.id)
+            .limit(self._batch_size)
+        )
+        if status.last_lesson_id is not None:
+          query = query.where(Lesson.id > status.last_lesson_id)
+        lessons = (await session.execute(query)).scalars().all()
+        if not lessons:
+          break
+        await self._render_batch(lessons, status)
+        status.last_lesson_id = lessons[-1].id
+        await session.commit()
+        self._save_checkpoint(status)
+        logger.info(
+            "Speech pre-render: %s lessons scanned, %s rendered, %s unchanged, %s failed.",
+            status.scanned, status.rendered, status.skipped, status.failed,
+        )
+        if progress is not None:
+          progress(status)
+      status.finished_at = datetime.now(timezone.utc)
+      self._clear_checkpoint()
+    finally:
+      status.running = False
+    return status
+
+  async def _run_in_background(self, resume: bool) -> None:
+    while True:
+      try:
+        async with self._session_factory() as session:
+          await self.run(session, resume=resume)
+      except Exception:  # noqa: BLE001
+        logger.exception("Speech pre-render failed; the next run resumes from its checkpoint.")
+      # a run requested while this one went on, even if it failed
+      resume, self._again = self._again, None
+      if resume is None:
+        return
+
+  async def _render_batch(self, lessons: list[Lesson], status: SpeechPrerenderStatus) -> None:
+    changed: list[tuple[Lesson, str, list[str]]] = []
+    for lesson in lessons:
+      status.scanned += 1
+      words = [word for word in lesson.example_words or [] if word.strip()]
+      digest = speech_digest(title=lesson.title, example_words=words, voice=self._voice, language=self._language)
+      if self._still_rendered((lesson.media_assets or {}).get("speech", {}), digest):
+        status.skipped += 1
+        continue
+      changed.append((lesson, digest, words))
+    keys = await self._render({text for lesson, _, words in changed for text in (lesson.title, *words)})
+    for lesson, digest, words in changed:
+      if lesson.title not in keys or any(word not in keys for word in words):
+        status.failed += 1
+        continue
+      speech = {
+          "hash": digest,
+          "voice": self._voice,
+          "language": self._language,
+          "title": keys[lesson.title],
+          "example_words": [keys[word] for word in words],
+      }
+      # a new dict, since changes inside a JSON column are not tracked
+      lesson.media_assets = {**(lesson.media_assets or {}), "speech": speech}
+      status.rendered += 1
+
+  def _still_rendered(self, speech: dict, digest: str) -> bool:
+    """Whether the stored speech was made from the current text and its clips are still cached."""
+    if speech.get("hash") != digest:
+      return False
+    # the audio cache evicts by LRU, so a matching hash alone does not mean the clips are there
+    keys = (speech.get("title"), *speech.get("example_words", []))
+    return all(key and self._speech.has_audio(key) for key in keys)
+
+  async def _render(self, texts: Iterable[str]) -> dict[str, str]:
+    """Cache keys of the texts that could be synthesised."""
+    slots = asyncio.Semaphore(self._concurrency)
+    keys: dict[str, str] = {}
+
+    async def one(text: str) -> None:
+      async with slots:
+        try:
+          result = await self._speech.synthesize(text=text, voice=self._voice, language=self._language)
+        except SpeechUnavailable:
+          return
+        keys[text] = result.key
+
+    await asyncio.gather(*(one(text) for text in texts if text.strip()))
+    return keys
+
+  def _load_checkpoint(self) -> SpeechPrerenderStatus | None:
+    try:
+      with open(self._checkpoint_path, encoding="utf-8") as handle:
+        return SpeechPrerenderStatus.model_validate_json(handle.read())
+    except FileNotFoundError:
+      return None
+    except (OSError, ValidationError) as exc:
+      logger.warning("Ignoring unreadable speech pre-render checkpoint %s: %s", self._checkpoint_path, exc)
+      return None
+
+  def _save_checkpoint(self, status: SpeechPrerenderStatus) -> None:
+    partial = f"{self._checkpoint_path}.tmp"
+    with open(partial, "w", encoding="utf-8") as handle:
+      handle.write(status.model_dump_json())
+    os.replace(partial, self._checkpoint_path)
+
+  def _clear_checkpoint(self) -> None:
+    try:
+      os.unlink(self._checkpoint_path)
+    except FileNotFoundError:
+      pass
+
+
+speech_prerender_service = SpeechPrerenderService(
+    speech_service,
+    async_session_factory,
+    concurrency=settings.tts_prerender_concurrency,
+    batch_size=settings.tts_prerender_batch_size,
+    checkpoint_path=settings.tts_prerender_checkpoint,
+)
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass
+from typing import Any, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass(slots=True)
+class _Call(Generic[T]):
+  task: asyncio.Task[T]
+  waiters: int = 0
+
+
+class SingleFlight(Generic[T]):
+  """Coalesces concurrent calls with the same key into one upstream call.
+
+  The first caller starts ``factory()`` as a task and later callers with the
+  same key await that task instead of starting their own. Its result or
+  exception reaches every waiter. A waiter that is cancelled only stops
+  waiting; the shared call is cancelled once nobody waits for it any more.
+  The key is released when the call finishes, so results are never reused
+  across calls; caching is left to the caller.
+  """
+
+  def __init__(self) -> None:
+    self._calls: dict[Hashable, _Call[T]] = {}
+    self.calls = 0
+    self.deduplicated = 0
+
+  async def do(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+    call = self._calls.get(key)
+    if call is None:
+      call = _Call(asyncio.ensure_future(factory()))
+      self._calls[key] = call
+      call.task.add_done_callback(lambda task: self._finish(key, task))
+      self.calls += 1
+    else:
+      self.deduplicated += 1
+
+    call.waiters += 1
+    try:
+      return await asyncio.shield(call.task)
+    finally:
+      call.waiters -= 1
+      if call.waiters == 0 and not call.task.done():
+        # release the key now: a caller arriving before _finish runs must start afresh, not await a cancelled task
+        if self._calls.get(key) is call:
+          del self._calls[key]
+        call.task.cancel()
+
+  def metrics(self) -> dict[str, Any]:
+    return {"in_flight": len(self._calls), "calls": self.calls, "deduplicated": self.deduplicated}
+
+  def _finish(self, key: Hashable, task: asyncio.Task[T]) -> None:
+    call = self._calls.get(key)
+    if call is not None and call.task is task:
+      del self._calls[key]
+    if not task.cancelled():
+      # every waiter may have left already; mark the exception as retrieved
+      task.exception()
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+from collections.abc import Iterable
+
+_LOAD = 1000
+
+# (-score, member): ascending order is the leaderboard order, ties broken by member
+_Key = tuple[int, str]
+
+
+class SortedScores:
+  """In-process sorted set of ``member -> score``, ordered by descending score.
+
+  Keys are kept in a list of sorted buckets of roughly ``_LOAD`` entries with
+  a Fenwick tree over the bucket sizes, so insert, delete and rank are
+  O(log n) plus a short list shift, and the top-N is a slice of the first
+  buckets. This is the layout ``sortedcontainers.SortedList`` uses.
+  """
+
+  __slots__ = ("_scores", "_lists", "_maxes", "_tree")
+
+  def __init__(self, items: Iterable[tuple[str, int]] = ()) -> None:
+    self._scores: dict[str, int] = {}
+    self._lists: list[list[_Key]] = []
+    self._maxes: list[_Key] = []
+    self._tree: list[int] | None = None
+    self.replace(items)
+
+  def __len__(self) -> int:
+    return len(self._scores)
+
+  def replace(self, items: Iterable[tuple[str, int]]) -> None:
+    self._scores = dict(items)
+    keys = sorted((-score, member) for member, score in self._scores.items())
+    self._lists = [keys[start:start + _LOAD] for start in range(0, len(keys), _LOAD)]
+    self._maxes = [bucket[-1] for bucket in self._lists]
+    self._tree = None
+
+  def score(self, member: str) -> int | None:
+    return self._scores.get(member)
+
+  def set(self, member: str, score: int) -> None:
+    previous = self._scores.get(member)
+    if previous == score:
+      return
+    if previous is not None:
+      self._remove((-previous, member))
+    self._scores[member] = score
+    self._add((-score, member))
+
+  def increment(self, member: str, amount: int) -> int:
+    score = self._scores.get(member, 0) + amount
+    self.set(member, score)
+    return score
+
+  def rank(self, member: str) -> int | None:
+    """Zero-based position of ``member``, highest score first."""
+    score = self._scores.get(member)
+    if score is None:
+      return None
+    key = (-score, member)
+    slot = bisect_left(self._maxes, key)
+    return self._prefix(slot) + bisect_left(self._lists[slot], key)
+
+  def top(self, limit: int) -> list[tuple[str, int]]:
+    entries: list[tuple[str, int]] = []
+    for bucket in self._lists:
+      for negated, member in bucket[:limit - len(entries)]:
+        entries.append((member, -negated))
+      if len(entries) >= limit:
+        break
+    return entries
+
+  def _add(self, key: _Key) -> None:
+    if not self._lists:
+      self._lists.append([key])
+      self._maxes.append(key)
+      self._tree = None
+      return
+    slot = bisect_left(self._maxes, key)
+    if slot == len(self._maxes):
+      slot -= 1
+      self._lists[slot].append(key)
+      self._maxes[slot] = key
+    else:
+      insort(self._lists[slot], key)
+    self._update(slot, 1)
+    bucket = self._lists[slot]
+    if len(bucket) > 2 * _LOAD:
+      self._lists.insert(slot + 1, bucket[_LOAD:])
+      del bucket[_LOAD:]
+      self._maxes[slot] = bucket[-1]
+      self._maxes.insert(slot + 1, self._lists[slot + 1][-1])
+      self._tree = None
+
+  def _remove(self, key: _Key) -> None:
+    slot = bisect_left(self._maxes, key)
+    bucket = self._lists[slot]
+    del bucket[bisect_left(bucket, key)]
+    if bucket:
+      self._maxes[slot] = bucket[-1]
+      self._update(slot, -1)
+    else:
+      del self._lists[slot]
+      del self._maxes[slot]
+      self._tree = None
+
+  def _build_tree(self) -> list[int]:
+    tree = [len(bucket) for bucket in self._lists]
+    for index in range(len(tree)):
+      parent = index | (index + 1)
+      if parent < len(tree):
+        tree[parent] += tree[index]
+    self._tree = tree
+    return tree
+
+  def _update(self, slot: int, delta: int) -> None:
+    tree = self._tree
+    if tree is None:
+      return
+    while slot < len(tree):
+      tree[slot] += delta
+      slot |= slot + 1
+
+  def _prefix(self, slot: int) -> int:
+    """Number of entries in the buckets before ``slot``."""
+    tree = self._tree if self._tree is not None else self._build_tree()
+    total = 0
+    while slot > 0:
+      total += tree[slot - 1]
+      slot &= slot - 1
+    return total
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+
+from app.schemas import SpeechSynthesisResponse
+from app.services.audio_cache import AudioCache, CachedAudio, audio_cache, synthesis_key
+from app.services.muxlisa_service import MuxlisaClient, muxlisa_client
+from app.services.singleflight import SingleFlight
+
+AUDIO_URL_PREFIX = "/api/speech/audio"
+
+
+class SpeechUnavailable(RuntimeError):
+  """Muxlisa returned no audio for a synthesis request."""
+
+
+class SpeechService:
+  """Text-to-speech behind the content-addressed audio cache.
+
+  A clip is synthesised once per distinct text, voice and language and
+  referred to by a stable URL under ``AUDIO_URL_PREFIX`` from then on;
+  clients fetch the bytes from there instead of receiving them as base64.
+  """
+
+  def __init__(self, muxlisa: MuxlisaClient, cache: AudioCache) -> None:
+    self._muxlisa = muxlisa
+    self._cache = cache
+    self._stores: SingleFlight[None] = SingleFlight()
+
+  async def synthesize(self, *, text: str, voice: str = "maftuna", language: str = "uz") -> SpeechSynthesisResponse:
+    key = synthesis_key(text=text, voice=voice, language=language)
+    cached = self._cache.contains(key)
+    if not cached:
+      await self._stores.do(key, lambda: self._render(key, text=text, voice=voice, language=language))
+    return SpeechSynthesisResponse(key=key, audio_url=f"{AUDIO_URL_PREFIX}/{key}", cached=cached)
+
+  def has_audio(self, key: str) -> bool:
+    return self._cache.contains(key)
+
+  async def audio(self, key: str) -> CachedAudio | None:
+    return await self._cache.get(key)
+
+  async def cached(self, *, text: str, voice: str = "maftuna", language: str = "uz") -> CachedAudio | None:
+    return await self._cache.get(synthesis_key(text=text, voice=voice, language=language))
+
+  async def stream(
+      self, *, text: str, voice: str = "maftuna", language: str = "uz"
+  ) -> tuple[str, AsyncIterator[bytes]]:
+    """Relay a clip from Muxlisa chunk by chunk, storing it in the cache on the way.
+
+    Returns the media type and the chunks. The clip only enters the cache
+    once it arrived completely; a client that disconnects early aborts it.
+    """
+    key = synthesis_key(text=text, voice=voice, language=language)
+    stream = await self._muxlisa.stream_synthesis(text=text, voice=voice, language=language)
+    if stream is None:
+      raise SpeechUnavailable("Speech synthesis is unavailable, try again shortly.")
+    writer = self._cache.writer(key)
+
+    async def relay() -> AsyncIterator[bytes]:
+      try:
+        async for chunk in stream:
+          await writer.write(chunk)
+          yield chunk
+        await writer.commit()
+      finally:
+        writer.abort()
+        await stream.aclose()
+
+    return stream.media_type, relay()
+
+  async def _render(self, key: str, *, text: str, voice: str, language: str) -> None:
+    audio = await self._muxlisa.synthesize(text=text, voice=voice, language=language)
+    if not audio:
+      raise SpeechUnavailable("Speech synthesis is unavailable, try again shortly.")
+    await self._cache.put(key, audio)
+
+
+speech_service = SpeechService(muxlisa_client, audio_cache)
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import importlib
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+
+from app.core.config import settings
+from app.services.muxlisa_service import MuxlisaClient, muxlisa_client
+
+
+@dataclass(frozen=True, slots=True)
+class TranscriptEvent:
+  text: str
+  final: bool
+  confidence: float | None = None
+
+
+class TranscriptionFailed(RuntimeError):
+  """The STT engine could not transcribe the audio."""
+
+
+class StreamingTranscriber(ABC):
+  """Speech-to-text fed chunk by chunk while the child is still speaking.
+
+  ``transcribe`` consumes ``chunks`` as they arrive and yields partial
+  transcripts whenever the engine has a better guess, then exactly one
+  final transcript once ``chunks`` is exhausted. Errors raised by ``chunks``
+  propagate to the caller; an engine that cannot produce a transcript raises
+  ``TranscriptionFailed``. Engines other than the built-in ones are plugged
+  in with ``REALTIME_STT_ENGINE=package.module:ClassName``; the class is
+  instantiated without arguments.
+  """
+
+  name = "base"
+
+  @abstractmethod
+  def transcribe(
+      self,
+      chunks: AsyncIterator[bytes],
+      *,
+      filename: str,
+      content_type: str,
+      language: str = "uz",
+      hint: str | None = None,
+  ) -> AsyncIterator[TranscriptEvent]:
+    """Transcript events for the audio in ``chunks``, ending with exactly one final event."""
+
+
+class MuxlisaStreamingTranscriber(StreamingTranscriber):
+  """Muxlisa STT with the upload running while audio is still being recorded.
+
+  Muxlisa answers once per file and has no partial results, so this engine
+  yields only the final transcript; since the request body is produced from
+  the incoming frames, that answer arrives right after the last frame
+  instead of after a full upload.
+  """
+
+  name = "muxlisa"
+
+  def __init__(self, muxlisa: MuxlisaClient) -> None:
+    self._muxlisa = muxlisa
+
+  async def transcribe(
+      self,
+      chunks: AsyncIterator[bytes],
+      *,
+      filename: str,
+      content_type: str,
+      language: str = "uz",
+      hint: str | None = None,
+  ) -> AsyncIterator[TranscriptEvent]:
+    result = await self._muxlisa.transcribe_stream(chunks, filename=filename, content_type=content_type, language=language)
+    if result.get("error"):
+      raise TranscriptionFailed("Speech recognition is unavailable right now; please try again.")
+    yield TranscriptEvent(text=result.get("transcript") or "", final=True, confidence=result.get("confidence"))
+
+
+class FakeStreamingTranscriber(StreamingTranscriber):
+  """Offline engine for development and tests: the transcript is the client's hint.
+
+  Every ``bytes_per_word`` of audio received reveals one more word of
+  ``hint`` as a partial transcript (16 kHz 16-bit mono PCM is 32000 bytes a
+  second, so the default is about two words a second); the whole hint is
+  the final transcript. The audio itself is never inspected.
+  """
+
+  name = "fake"
+
+  def __init__(self, *, bytes_per_word: int = 16_000) -> None:
+    self._bytes_per_word = bytes_per_word
+
+  async def transcribe(
+      self,
+      chunks: AsyncIterator[bytes],
+      *,
+      filename: str,
+      content_type: str,
+      language: str = "uz",
+      hint: str | None = None,
+  ) -> AsyncIterator[TranscriptEvent]:
+    words = (hint or "").split()
+    received = shown = 0
+    async for chunk in chunks:
+      received += len(chunk)
+      revealed = min(len(words), received // self._bytes_per_word)
+      if revealed > shown:
+        shown = revealed
+        yield TranscriptEvent(text=" ".join(words[:shown]), final=False)
+    yield TranscriptEvent(text=" ".join(words), final=True, confidence=1.0 if words else None)
+
+
+def build_transcriber(engine: str) -> StreamingTranscriber:
+  if engine == MuxlisaStreamingTranscriber.name:
+    return MuxlisaStreamingTranscriber(muxlisa_client)
+  if engine == FakeStreamingTranscriber.name:
+    return FakeStreamingTranscriber()
+  module_name, _, class_name = engine.partition(":")
+  if not class_name:
+    raise ValueError(f"Unknown realtime STT engine {engine!r}; use muxlisa, fake or package.module:ClassName.")
+  return getattr(importlib.import_module(module_name), class_name)()
+
+
+streaming_transcriber = build_transcriber(settings.realtime_stt_engine)
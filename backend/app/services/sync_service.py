@@ -0,0 +1,343 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, TypeVar
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.core.config import settings
+from app.models import Lesson, LessonAttempt, MathAttempt, Skill, SkillActivity, User, UserProgress
+from app.schemas import (
+    OfflineLessonAttempt,
+    OfflineMathAttempt,
+    OfflineSyncRejection,
+    OfflineSyncRequest,
+    OfflineSyncResponse,
+    OfflineSyncUserResult,
+)
+from app.services.achievement_service import (
+    MATH_ACCURACY,
+    MATH_ATTEMPTS,
+    AchievementEngine,
+    achievement_engine,
+    lessons_completed_key,
+)
+from app.services.attempt_service import PASS_SCORE
+from app.services.frontier_service import FrontierService, frontier_service
+from app.services.gamification_service import GamificationEngine, gamification_engine
+from app.services.leaderboard_service import LeaderboardService, leaderboard_service
+from app.services.math_service import MathService
+from app.services.phonetic_scorer import PhoneticScorer
+
+OfflineAttempt = TypeVar("OfflineAttempt", OfflineLessonAttempt, OfflineMathAttempt)
+
+
+@dataclass(slots=True)
+class _UserBatch:
+  """Newly stored attempts of one user, with the XP each one earned."""
+
+  lesson_rows: list[dict[str, Any]] = field(default_factory=list)
+  math_rows: list[dict[str, Any]] = field(default_factory=list)
+  xp_by_attempt: dict[UUID, int] = field(default_factory=dict)
+
+
+class OfflineSyncService:
+  """Ingests attempts a device queued while it was offline, hundreds at a time.
+
+  Lesson attempts are scored with the local phonetic scorer, since sending
+  thousands of queued attempts to the model would hold the request for
+  minutes. Attempts of all users are written with multi-row
+  ``INSERT ... ON CONFLICT DO NOTHING``; the client's ``client_id`` becomes
+  the attempt id, so a batch retried after a dropped connection only stores
+  what is new, and ``uq_lesson_attempt_per_timestamp`` catches the same
+  recording sent under another id. Progress, XP, streak, counters,
+  achievements and leaderboards are then updated once per user for all of
+  that user's new attempts, instead of once per attempt.
+  """
+
+  def __init__(
+      self,
+      gamification: GamificationEngine,
+      achievements: AchievementEngine,
+      leaderboards: LeaderboardService,
+      frontier: FrontierService,
+      scorer: PhoneticScorer,
+      *,
+      chunk_size: int = 1000,
+  ) -> None:
+    self._gamification = gamification
+    self._achievements = achievements
+    self._leaderboards = leaderboards
+    self._frontier = frontier
+    self._scorer = scorer
+    self._chunk_size = chunk_size
+
+  async def ingest(self, session: AsyncSession, request: OfflineSyncRequest) -> OfflineSyncResponse:
+    """Store the queued attempts and apply their rewards in the caller's transaction."""
+    lesson_items = _unique(request.lesson_attempts)
+    math_items = _unique(request.math_attempts)
+    user_ids = {item.user_id for item in lesson_items} | {item.user_id for item in math_items}
+    users = {user.id: user for user in (await session.execute(select(User).where(User.id.in_(user_ids)))).scalars()}
+    lesson_ids = {item.lesson_id for item in lesson_items}
+    lessons = {
+        lesson.id: lesson
+        for lesson in (
+            await session.execute(select(Lesson).options(selectinload(Lesson.module)).where(Lesson.id.in_(lesson_ids)))
+        ).scalars()
+    }
+    activities = await self._activities(session, math_items)
+
+    rejected: list[OfflineSyncRejection] = []
+    batches: dict[UUID, _UserBatch] = defaultdict(_UserBatch)
+    lesson_rows: list[dict[str, Any]] = []
+    for item in lesson_items:
+      lesson = lessons.get(item.lesson_id)
+      if item.user_id not in users or lesson is None:
+        detail = "User not found." if item.user_id not in users else "Lesson not found."
+        rejected.append(OfflineSyncRejection(client_id=item.client_id, detail=detail))
+        continue
+      row = self._lesson_row(item, lesson)
+      lesson_rows.append(row)
+      batches[item.user_id].xp_by_attempt[item.client_id] = (
+          lesson.xp_reward if row["is_correct"] else max(lesson.xp_reward // 2, 1)
+      )
+
+    math_rows: list[dict[str, Any]] = []
+    for item in math_items:
+      activity = activities.get((item.skill_key, item.challenge_id))
+      if item.user_id not in users or activity is None:
+        detail = "User not found." if item.user_id not in users else "Skill activity not found."
+        rejected.append(OfflineSyncRejection(client_id=item.client_id, detail=detail))
+        continue
+      correct_count, total, _ = MathService.grade(activity, item.answers)
+      xp_awarded = MathService.xp_for(activity, correct_count, total)
+      math_rows.append(
+          {
+              "id": item.client_id,
+              "user_id": item.user_id,
+              "activity_id": activity.id,
+              "answers": item.answers,
+              "correct_count": correct_count,
+              "total_questions": total,
+              "xp_awarded": xp_awarded,
+              "created_at": _recorded_at(item.recorded_at),
+          }
+      )
+      batches[item.user_id].xp_by_attempt[item.client_id] = xp_awarded
+
+    inserted = await self._insert(session, LessonAttempt, lesson_rows)
+    inserted |= await self._insert(session, MathAttempt, math_rows)
+    for row in lesson_rows:
+      if row["id"] in inserted:
+        batches[row["user_id"]].lesson_rows.append(row)
+    for row in math_rows:
+      if row["id"] in inserted:
+        batches[row["user_id"]].math_rows.append(row)
+
+    results: list[OfflineSyncUserResult] = []
+    # a fixed order keeps concurrent syncs from locking the same users in opposite orders
+    for user_id in sorted(batches):
+      batch = batches[user_id]
+      if batch.lesson_rows or batch.math_rows:
+        results.append(await self._apply(session, users[user_id], lessons, batch))
+    return OfflineSyncResponse(
+        accepted=len(inserted),
+        duplicates=len(lesson_rows) + len(math_rows) - len(inserted),
+        rejected=rejected,
+        users=results,
+    )
+
+  def _lesson_row(self, item: OfflineLessonAttempt, lesson: Lesson) -> dict[str, Any]:
+    evaluation = self._scorer.score(
+        transcript=item.transcript,
+        target_letter=lesson.target_letter,
+        target_sound=lesson.target_sound,
+        example_words=lesson.example_words or [],
+    ).feedback()
+    score = evaluation["score"]
+    return {
+        "id": item.client_id,
+        "user_id": item.user_id,
+        "lesson_id": lesson.id,
+        "transcript": item.transcript,
+        "evaluation": evaluation,
+        "feedback": evaluation.get("encouragement"),
+        "ai_model": evaluation["source"],
+        "score": score,
+        "is_correct": score >= PASS_SCORE,
+        "status": "completed",
+        "created_at": _recorded_at(item.recorded_at),
+    }
+
+  async def _activities(
+      self,
+      session: AsyncSession,
+      items: list[OfflineMathAttempt],
+  ) -> dict[tuple[str, UUID | None], SkillActivity]:
+    """Resolve ``(skill_key, challenge_id)`` the way ``MathService`` does: the challenge, else the first activity."""
+    skill_keys = {item.skill_key for item in items}
+    if not skill_keys:
+      return {}
+    rows = (
+        await session.execute(
+            select(Skill.key, SkillActivity)
+            .join(SkillActivity, SkillActivity.skill_id == Skill.id)
+            .where(Skill.key.in_(skill_keys))
+            .order_by(SkillActivity.created_at)
+        )
+    ).all()
+    resolved: dict[tuple[str, UUID | None], SkillActivity] = {}
+    for skill_key, activity in rows:
+      resolved.setdefault((skill_key, None), activity)
+      resolved[(skill_key, activity.id)] = activity
+    return resolved
+
+  async def _insert(
+      self,
+      session: AsyncSession,
+      model: type[LessonAttempt | MathAttempt],
+      rows: list[dict[str, Any]],
+  ) -> set[UUID]:
+    """Multi-row insert in chunks that stay under the driver's bind parameter limit; returns the stored ids."""
+    inserted: set[UUID] = set()
+    for start in range(0, len(rows), self._chunk_size):
+      statement = insert(model).values(rows[start:start + self._chunk_size]).on_conflict_do_nothing().returning(model.id)
+      inserted.update((await session.execute(statement)).scalars())
+    return inserted
+
+  async def _apply(
+      self,
+      session: AsyncSession,
+      user: User,
+      lessons: dict[UUID, Lesson],
+      batch: _UserBatch,
+  ) -> OfflineSyncUserResult:
+    batch.lesson_rows.sort(key=lambda row: row["created_at"])
+    by_lesson: dict[UUID, list[dict[str, Any]]] = defaultdict(list)
+    for row in batch.lesson_rows:
+      by_lesson[row["lesson_id"]].append(row)
+
+    existing = {
+        progress.lesson_id: progress
+        for progress in (
+            await session.execute(
+                select(UserProgress).where(UserProgress.user_id == user.id, UserProgress.lesson_id.in_(by_lesson))
+            )
+        ).scalars()
+    }
+    completed_delta: dict[UUID, int] = defaultdict(int)
+    xp_by_path: dict[UUID, int] = defaultdict(int)
+    passed_lessons: list[UUID] = []
+    for lesson_id, rows in by_lesson.items():
+      lesson = lessons[lesson_id]
+      learning_path_id = lesson.module.learning_path_id
+      xp_earned = sum(batch.xp_by_attempt[row["id"]] for row in rows)
+      xp_by_path[learning_path_id] += xp_earned
+      progress = existing.get(lesson_id) or UserProgress(
+          user_id=user.id,
+          learning_path_id=learning_path_id,
+          module_id=lesson.module_id,
+          lesson_id=lesson_id,
+          status="in_progress",
+          xp_earned=0,
+          meta_data={},
+      )
+      # the latest attempt decides the status, as it would have online
+      was_completed = progress.status == "completed"
+      last = rows[-1]
+      progress.status = "completed" if last["is_correct"] else "in_progress"
+      progress.xp_earned += xp_earned
+      progress.last_attempt_at = max(progress.last_attempt_at or last["created_at"], last["created_at"])
+      progress.meta_data = {**(progress.meta_data or {}), "last_score": last["score"], "is_correct": last["is_correct"]}
+      session.add(progress)
+      if was_completed != (progress.status == "completed"):
+        completed_delta[learning_path_id] += -1 if was_completed else 1
+      if any(row["is_correct"] for row in rows):
+        passed_lessons.append(lesson_id)
+    await session.flush()
+
+    unlocked: list[str] = []
+    for lesson_id in passed_lessons:
+      unlocked.extend(await self._gamification.unlock_next_lessons(session, lesson_id, user.id))
+    for learning_path_id in xp_by_path:
+      await self._frontier.rebuild(session, user_id=user.id, learning_path_id=learning_path_id)
+
+    before: dict[str, float] = {}
+    after: dict[str, float] = {}
+    for learning_path_id, delta in completed_delta.items():
+      if delta:
+        key = lessons_completed_key(learning_path_id)
+        before[key], after[key] = await self._achievements.increment(session, user.id, key, delta)
+    if batch.math_rows:
+      before[MATH_ATTEMPTS], after[MATH_ATTEMPTS] = await self._achievements.increment(
+          session, user.id, MATH_ATTEMPTS, len(batch.math_rows)
+      )
+      after[MATH_ACCURACY] = max(
+          row["correct_count"] / row["total_questions"] if row["total_questions"] else 0 for row in batch.math_rows
+      )
+
+    xp_awarded = sum(batch.xp_by_attempt[row["id"]] for row in batch.lesson_rows + batch.math_rows)
+    outcomes = [row["is_correct"] for row in batch.lesson_rows]
+    _, projected_peak = self._gamification.bulk_streak(user.current_streak, outcomes)
+    before |= {"xp": user.xp, "level": user.level, "streak": user.current_streak}
+    after |= self._gamification.projected(user, xp=xp_awarded, streak=projected_peak)
+    # achievements go first and the users row is written last, so its lock is held only briefly before commit
+    achievements = await self._achievements.evaluate(session, user.id, before=before, after=after)
+    if outcomes:
+      xp, level, streak, peak_streak = await self._gamification.apply_bulk_rewards(
+          session, user, xp=xp_awarded, outcomes=outcomes
+      )
+    else:
+      xp, level, streak, _ = await self._gamification.apply_rewards(session, user, xp=xp_awarded)
+      peak_streak = streak
+    achievements += await self._achievements.evaluate(
+        session, user.id, before=after, after=after | {"xp": xp, "level": level, "streak": peak_streak}
+    )
+
+    for learning_path_id, path_xp in xp_by_path.items():
+      self._leaderboards.record_xp(session, user, path_xp, learning_path_id=learning_path_id)
+    if not xp_by_path:
+      self._leaderboards.record_xp(session, user, xp_awarded)
+
+    return OfflineSyncUserResult(
+        user_id=user.id,
+        lesson_attempts=len(batch.lesson_rows),
+        math_attempts=len(batch.math_rows),
+        xp_awarded=xp_awarded,
+        xp=xp,
+        level=level,
+        streak=streak,
+        unlocked_lessons=unlocked,
+        achievements_awarded=achievements,
+    )
+
+
+def _unique(items: list[OfflineAttempt]) -> list[OfflineAttempt]:
+  """Drop repeated ``client_id``s within one request, keeping the first."""
+  unique: dict[UUID, OfflineAttempt] = {}
+  for item in items:
+    unique.setdefault(item.client_id, item)
+  return list(unique.values())
+
+
+def _recorded_at(recorded_at: datetime) -> datetime:
+  """Naive UTC like the other timestamps, never later than now: tablet clocks drift."""
+  if recorded_at.tzinfo is not None:
+    recorded_at = recorded_at.astimezone(timezone.utc).replace(tzinfo=None)
+  return min(recorded_at, datetime.utcnow())
+
+
+offline_sync_service = OfflineSyncService(
+    gamification_engine,
+    achievement_engine,
+    leaderboard_service,
+    frontier_service,
+    PhoneticScorer(accept_score=settings.phonetic_accept_score, reject_score=settings.phonetic_reject_score),
+    chunk_size=settings.offline_sync_chunk_size,
+)
@@ -0,0 +1,128 @@
+"""Benchmark memory of buffered base64 uploads against streamed audio uploads.
+
+Usage: python -m scripts.bench_audio_upload [--uploads 200] [--seconds 30] [--sample-rate 16000] [--upload-seconds 1.0]
+
+Each upload is a WAV clip of ``seconds`` arriving in 64 KiB chunks spread
+over ``upload-seconds``, all uploads at once. The buffered path collects the
+JSON body, decodes its ``audio_base64`` and posts the bytes with
+``MuxlisaClient.transcribe``. The streaming path feeds the chunks through
+the duration guard straight into ``MuxlisaClient.transcribe_stream``. A fake
+speech-to-text server runs in a child process so only this side's Python
+allocations are traced.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import multiprocessing
+import struct
+import time
+import tracemalloc
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.services.audio_probe import DurationGuard
+from app.services.muxlisa_service import MuxlisaClient
+
+CHUNK = 64 * 1024
+
+
+def _serve(port: int) -> None:
+  async def stt(request: Request) -> JSONResponse:
+    received = 0
+    async for chunk in request.stream():
+      received += len(chunk)
+    return JSONResponse({"text": "anor", "bytes": received})
+
+  app = Starlette(routes=[Route("/v2/stt", stt, methods=["POST"])])
+  uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def _wav(seconds: float, sample_rate: int) -> bytes:
+  data_size = int(seconds * sample_rate) * 2
+  header = (
+      b"RIFF" + struct.pack("<I", 36 + data_size) + b"WAVE"
+      + b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16)
+      + b"data" + struct.pack("<I", data_size)
+  )
+  return header + bytes(data_size)
+
+
+async def _arriving(body: bytes, upload_seconds: float):
+  """The request body as a server receives it: chunk by chunk over the upload time."""
+  chunks = range(0, len(body), CHUNK)
+  delay = upload_seconds / max(len(chunks), 1)
+  for offset in chunks:
+    await asyncio.sleep(delay)
+    yield body[offset:offset + CHUNK]
+
+
+async def _buffered(client: MuxlisaClient, body: bytes, upload_seconds: float) -> None:
+  received = bytearray()
+  async for chunk in _arriving(body, upload_seconds):
+    received += chunk
+  audio = base64.b64decode(json.loads(bytes(received))["audio_base64"])
+  await client.transcribe(audio_file=audio)
+
+
+async def _streamed(client: MuxlisaClient, body: bytes, upload_seconds: float, max_seconds: float) -> None:
+  guard = DurationGuard.for_content_type("audio/wav", max_seconds)
+
+  async def audio():
+    async for chunk in _arriving(body, upload_seconds):
+      guard.feed(chunk)
+      yield chunk
+    guard.finish()
+
+  await client.transcribe_stream(audio(), filename=guard.filename, content_type=guard.content_type)
+
+
+async def _measure(label: str, uploads, count: int, clip_bytes: int) -> None:
+  tracemalloc.start()
+  started = time.perf_counter()
+  await asyncio.gather(*uploads)
+  elapsed = time.perf_counter() - started
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  print(f"  {label:<10} peak {peak / 2**20:8.1f} MiB  ({peak / count / 1024:7.1f} KiB/upload, "
+        f"clip {clip_bytes / 1024:.0f} KiB)  {elapsed:5.2f}s")
+
+
+async def main(arguments: argparse.Namespace) -> None:
+  clip = _wav(arguments.seconds, arguments.sample_rate)
+  body = json.dumps({"audio_base64": base64.b64encode(clip).decode()}).encode()
+  client = MuxlisaClient(base_url=f"http://127.0.0.1:{arguments.port}", api_key="bench")
+  print(f"{arguments.uploads} concurrent uploads of {arguments.seconds:g}s WAV at {arguments.sample_rate} Hz")
+  await _measure(
+      "buffered",
+      [_buffered(client, body, arguments.upload_seconds) for _ in range(arguments.uploads)],
+      arguments.uploads,
+      len(clip),
+  )
+  await _measure(
+      "streamed",
+      [_streamed(client, clip, arguments.upload_seconds, arguments.seconds) for _ in range(arguments.uploads)],
+      arguments.uploads,
+      len(clip),
+  )
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--uploads", type=int, default=200)
+  parser.add_argument("--seconds", type=float, default=30.0)
+  parser.add_argument("--sample-rate", type=int, default=16000)
+  parser.add_argument("--upload-seconds", type=float, default=1.0, help="time each upload takes to arrive")
+  parser.add_argument("--port", type=int, default=8766)
+  arguments = parser.parse_args()
+  server = multiprocessing.Process(target=_serve, args=(arguments.port,), daemon=True)
+  server.start()
+  time.sleep(1.0)
+  try:
+    asyncio.run(main(arguments))
+  finally:
+    server.terminate()
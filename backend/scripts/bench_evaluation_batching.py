@@ -0,0 +1,153 @@
+"""Benchmark pronunciation evaluation throughput with and without micro-batching.
+
+Usage: python -m scripts.bench_evaluation_batching [--attempts 2000] [--concurrency 200]
+       [--latency-ms 400] [--per-item-ms 15] [--server-slots 16] [--batch-sizes 1,4,8,16] [--wait-ms 20]
+
+A fake model server is started on a local port. Each request takes
+``latency-ms`` plus ``per-item-ms`` per scored attempt, and at most
+``server-slots`` requests are served at once, like a rate-limited upstream.
+The adapter is pointed at it for every batch size and ``attempts`` distinct
+evaluations are sent from ``concurrency`` callers. No API key or database
+is needed.
+"""
+import argparse
+import asyncio
+import json
+import re
+import statistics
+import time
+from types import SimpleNamespace
+
+import httpx
+import uvicorn
+from openai import AsyncOpenAI
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.services.openai_service import OpenAIAdapter
+
+MODEL = "bench-model"
+_ATTEMPTS = re.compile(r"Urinishlar: (\[.*\])")
+
+
+def _fake_server(latency: float, per_item: float, slots: int) -> tuple[Starlette, dict[str, int]]:
+  counters = {"requests": 0, "items": 0}
+  semaphore = asyncio.Semaphore(slots)
+
+  async def responses(request: Request) -> JSONResponse:
+    prompt = (await request.json())["input"]
+    match = _ATTEMPTS.search(prompt)
+    attempts = json.loads(match.group(1)) if match else None
+    items = len(attempts) if attempts else 1
+    async with semaphore:
+      await asyncio.sleep(latency + per_item * items)
+    counters["requests"] += 1
+    counters["items"] += items
+    if attempts:
+      text = json.dumps([{"id": attempt["id"], "score": 0.8, "issues": [], "encouragement": "Barakalla!"} for attempt in attempts])
+    else:
+      text = json.dumps({"score": 0.8, "issues": [], "encouragement": "Barakalla!"})
+    return JSONResponse({
+        "id": "resp_bench",
+        "object": "response",
+        "created_at": 0,
+        "model": MODEL,
+        "status": "completed",
+        "output": [{
+            "type": "message",
+            "id": "msg_bench",
+            "role": "assistant",
+            "status": "completed",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }],
+    })
+
+  return Starlette(routes=[Route("/v1/responses", responses, methods=["POST"])]), counters
+
+
+class _ResponsesOverHttp:
+  """Posts to ``/responses`` for SDK versions without the Responses API."""
+
+  def __init__(self, base_url: str) -> None:
+    self._client = httpx.AsyncClient(base_url=base_url, timeout=60.0, limits=httpx.Limits(max_connections=None))
+
+  async def create(self, **payload) -> SimpleNamespace:
+    response = await self._client.post("/responses", json=payload)
+    response.raise_for_status()
+    content = response.json()["output"][0]["content"][0]["text"]
+    return SimpleNamespace(output_text=content)
+
+
+def _client(base_url: str):
+  client = AsyncOpenAI(api_key="bench", base_url=base_url, max_retries=0)
+  if hasattr(client, "responses"):
+    return client
+  return SimpleNamespace(responses=_ResponsesOverHttp(base_url))
+
+
+async def _run(adapter: OpenAIAdapter, attempts: int, concurrency: int) -> tuple[float, list[float]]:
+  latencies: list[float] = []
+  next_attempt = iter(range(attempts))
+
+  async def caller() -> None:
+    for index in next_attempt:
+      started = time.perf_counter()
+      await adapter.evaluate_pronunciation(
+          transcript=f"olma {index}",
+          target_letter="O",
+          example_words=["Olma", "O'rik"],
+          user_age=6,
+      )
+      latencies.append(time.perf_counter() - started)
+
+  started = time.perf_counter()
+  await asyncio.gather(*(caller() for _ in range(concurrency)))
+  return time.perf_counter() - started, latencies
+
+
+async def main(arguments: argparse.Namespace) -> None:
+  app, counters = _fake_server(arguments.latency_ms / 1000, arguments.per_item_ms / 1000, arguments.server_slots)
+  server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=arguments.port, log_level="warning"))
+  serving = asyncio.create_task(server.serve())
+  while not server.started:
+    await asyncio.sleep(0.01)
+  base_url = f"http://127.0.0.1:{arguments.port}/v1"
+
+  print(f"{arguments.attempts} attempts, {arguments.concurrency} callers, upstream {arguments.latency_ms:.0f} ms "
+        f"+ {arguments.per_item_ms:.0f} ms/attempt, {arguments.server_slots} slots")
+  try:
+    for batch_size in arguments.batch_sizes:
+      adapter = OpenAIAdapter(
+          api_key="bench",
+          model=MODEL,
+          batch_size=batch_size,
+          batch_wait=arguments.wait_ms / 1000,
+          # every caller may wait; shed attempts would get the instant fallback and skew the numbers
+          max_queue=arguments.concurrency,
+      )
+      adapter._client = _client(base_url)
+      counters.update(requests=0, items=0)
+      elapsed, latencies = await _run(adapter, arguments.attempts, arguments.concurrency)
+      latencies.sort()
+      print(f"  batch {batch_size:>3}: {arguments.attempts / elapsed:8.1f} attempts/s  "
+            f"p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+            f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.1f} ms  "
+            f"{counters['requests']} upstream requests")
+  finally:
+    server.should_exit = True
+    await serving
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--attempts", type=int, default=2000)
+  parser.add_argument("--concurrency", type=int, default=200)
+  parser.add_argument("--latency-ms", type=float, default=400.0, help="fixed cost of every upstream request")
+  parser.add_argument("--per-item-ms", type=float, default=15.0, help="extra cost per attempt in a request")
+  parser.add_argument("--server-slots", type=int, default=16, help="requests the fake upstream serves at once")
+  parser.add_argument("--batch-sizes", type=lambda value: [int(size) for size in value.split(",")], default=[1, 4, 8, 16])
+  parser.add_argument("--wait-ms", type=float, default=20.0)
+  parser.add_argument("--port", type=int, default=8765)
+  asyncio.run(main(parser.parse_args()))
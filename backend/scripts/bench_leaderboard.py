@@ -0,0 +1,66 @@
+"""Benchmark leaderboard updates, top-N and rank queries with synthetic users.
+
+Usage: python -m scripts.bench_leaderboard [--users 1000000] [--queries 10000] [--redis redis://localhost:6379/15]
+
+The in-process store is always measured; --redis also measures the sorted-set
+store against that server, using keys under ``bench:leaderboard:`` that are
+deleted afterwards. No database is needed.
+"""
+import argparse
+import asyncio
+import random
+import time
+from uuid import uuid4
+
+from redis import asyncio as redis_asyncio
+
+from app.services.leaderboard_service import MemoryLeaderboardStore, RedisLeaderboardStore
+
+BOARD = "global"
+
+
+async def _measure(label: str, store, members: list[str], queries: int) -> None:
+  started = time.perf_counter()
+  await store.replace(BOARD, ((member, random.randrange(0, 20_000)) for member in members))
+  load_seconds = time.perf_counter() - started
+
+  probes = random.choices(members, k=queries)
+  timings: dict[str, float] = {}
+  started = time.perf_counter()
+  for member in probes:
+    await store.increment(BOARD, member, random.randrange(1, 20))
+  timings["increment"] = time.perf_counter() - started
+  started = time.perf_counter()
+  for member in probes:
+    await store.rank(BOARD, member)
+  timings["rank"] = time.perf_counter() - started
+  started = time.perf_counter()
+  for _ in range(queries):
+    await store.top(BOARD, 10)
+  timings["top 10"] = time.perf_counter() - started
+
+  print(f"{label}: {len(members)} users loaded in {load_seconds:.1f}s")
+  for operation, seconds in timings.items():
+    print(f"  {operation:<10} {seconds / queries * 1_000_000:9.1f} us/op  ({queries / seconds:,.0f} ops/s)")
+
+
+async def main(user_count: int, queries: int, redis_url: str | None) -> None:
+  members = [str(uuid4()) for _ in range(user_count)]
+  await _measure("memory", MemoryLeaderboardStore(), members, queries)
+  if redis_url:
+    client = redis_asyncio.from_url(redis_url)
+    store = RedisLeaderboardStore(client, prefix="bench:leaderboard:")
+    try:
+      await _measure("redis", store, members, queries)
+    finally:
+      await client.delete(f"bench:leaderboard:{BOARD}")
+      await store.close()
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--users", type=int, default=1_000_000)
+  parser.add_argument("--queries", type=int, default=10_000)
+  parser.add_argument("--redis", dest="redis_url", help="also benchmark the Redis store at this URL")
+  arguments = parser.parse_args()
+  asyncio.run(main(arguments.users, arguments.queries, arguments.redis_url))
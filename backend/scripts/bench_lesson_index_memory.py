@@ -0,0 +1,84 @@
+"""Compare the memory cost of caching ORM lessons with the compact LessonIndex.
+
+Usage: python -m scripts.bench_lesson_index_memory [--lessons 100000]
+
+Lessons are synthesised in memory with the same fields `seed._ensure_minimum_lessons`
+writes for the alphabet module, so no database is needed.
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from uuid import uuid4
+
+from app.models import Lesson
+from app.services.lesson_index import LessonIndex
+
+
+def _measure(build):
+  gc.collect()
+  tracemalloc.start()
+  started = time.perf_counter()
+  value = build()
+  elapsed = time.perf_counter() - started
+  current, _ = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  return value, current / (1024 * 1024), elapsed
+
+
+def main(lesson_count: int) -> None:
+  learning_path_id = uuid4()
+  module_id = uuid4()
+
+  def build_orm() -> list[Lesson]:
+    return [
+        Lesson(
+            id=uuid4(),
+            module_id=module_id,
+            key=f"auto-lesson-{index:05d}",
+            title=f"Avto dars #{index + 1}",
+            description="Avtomatik generatsiya qilingan mashg'ulot.",
+            lesson_type="letter_practice",
+            target_letter=None,
+            target_sound=None,
+            difficulty="beginner",
+            order_index=index,
+            xp_reward=5,
+            media_assets={"generated": True},
+            example_words=[f"So'z {index + 1}"],
+            example_image_urls=[],
+            extra_metadata={"generated": True},
+        )
+        for index in range(lesson_count)
+    ]
+
+  lessons, orm_mb, orm_seconds = _measure(build_orm)
+  rows = [
+      (lesson.id, lesson.key, module_id, learning_path_id, 0, lesson.order_index, lesson.xp_reward)
+      for lesson in lessons
+  ]
+  lesson_ids = [row[0] for row in rows]
+  del lessons
+  gc.collect()
+
+  index, index_mb, index_seconds = _measure(lambda: LessonIndex(rows))
+
+  probes = random.sample(lesson_ids, min(10_000, len(lesson_ids)))
+  started = time.perf_counter()
+  for lesson_id in probes:
+    index.ref(index.position(lesson_id))
+  lookup_us = (time.perf_counter() - started) / len(probes) * 1_000_000
+
+  print(f"lessons:            {lesson_count}")
+  print(f"ORM objects:        {orm_mb:8.1f} MB  (built in {orm_seconds:.2f}s)")
+  print(f"LessonIndex:        {index_mb:8.1f} MB  (built in {index_seconds:.2f}s)")
+  print(f"ratio:              {orm_mb / index_mb:8.1f}x")
+  print(f"lookup id -> ref:   {lookup_us:8.2f} us")
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--lessons", type=int, default=100_000)
+  arguments = parser.parse_args()
+  main(arguments.lessons)
@@ -0,0 +1,92 @@
+"""Benchmark level calculation and bulk level recomputation over synthetic users.
+
+Usage: python -m scripts.bench_levels [--users 1000000] [--database] [--batch-size 5000]
+
+Without --database only the in-process ``calculate_level`` is timed, comparing
+the former linear scan with the bisect lookup. With --database the users are
+inserted and committed (tagged ``first_name='bench-levels'``), the thresholds
+are changed, ``recompute_levels`` is timed and the synthetic users are deleted
+again. It scans every user of the database, so point it at a development copy.
+"""
+import argparse
+import asyncio
+import random
+import time
+from uuid import uuid4
+
+from sqlalchemy import delete, insert
+
+from app.db.session import async_session_factory
+from app.models import User
+from app.services import gamification_engine
+
+BENCH_NAME = "bench-levels"
+
+
+def _linear_level(thresholds: tuple[int, ...], xp: int) -> int:
+  for idx, threshold in enumerate(thresholds, start=1):
+    if xp < threshold:
+      return max(1, idx - 1)
+  return len(thresholds)
+
+
+def _time_calculate_level(xp_values: list[int]) -> None:
+  thresholds = gamification_engine.thresholds
+  started = time.perf_counter()
+  for xp in xp_values:
+    _linear_level(thresholds, xp)
+  linear_seconds = time.perf_counter() - started
+  started = time.perf_counter()
+  for xp in xp_values:
+    gamification_engine.calculate_level(xp)
+  bisect_seconds = time.perf_counter() - started
+  per_call = 1_000_000_000 / len(xp_values)
+  print(f"calculate_level over {len(xp_values)} users ({len(thresholds)} thresholds)")
+  print(f"  linear scan:  {linear_seconds:6.2f}s  {linear_seconds * per_call:7.1f} ns/call")
+  print(f"  bisect:       {bisect_seconds:6.2f}s  {bisect_seconds * per_call:7.1f} ns/call")
+
+
+async def _time_recompute(xp_values: list[int], batch_size: int) -> None:
+  async with async_session_factory() as session:
+    rows = [
+        {"id": uuid4(), "first_name": BENCH_NAME, "xp": xp, "level": gamification_engine.calculate_level(xp)}
+        for xp in xp_values
+    ]
+    started = time.perf_counter()
+    for offset in range(0, len(rows), 10_000):
+      await session.execute(insert(User), rows[offset:offset + 10_000])
+    await session.commit()
+    print(f"inserted {len(rows)} users in {time.perf_counter() - started:.1f}s")
+
+    original = await gamification_engine.load_thresholds(session, force=True)
+    await gamification_engine.store_thresholds(session, [threshold * 2 for threshold in original])
+    await session.commit()
+    try:
+      started = time.perf_counter()
+      scanned, updated = await gamification_engine.recompute_levels(session, batch_size=batch_size)
+      elapsed = time.perf_counter() - started
+      print(f"recompute_levels: {scanned} scanned, {updated} updated in {elapsed:.1f}s "
+            f"({scanned / elapsed:,.0f} users/s, batch size {batch_size})")
+    finally:
+      await gamification_engine.store_thresholds(session, original)
+      await session.commit()
+      await gamification_engine.recompute_levels(session, batch_size=batch_size)
+      await session.execute(delete(User).where(User.first_name == BENCH_NAME))
+      await session.commit()
+
+
+async def main(user_count: int, database: bool, batch_size: int) -> None:
+  top = gamification_engine.thresholds[-1]
+  xp_values = [int(random.expovariate(3 / top)) for _ in range(user_count)]
+  _time_calculate_level(xp_values)
+  if database:
+    await _time_recompute(xp_values, batch_size)
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--users", type=int, default=1_000_000)
+  parser.add_argument("--database", action="store_true", help="also time recompute_levels against the database")
+  parser.add_argument("--batch-size", type=int, default=5000)
+  arguments = parser.parse_args()
+  asyncio.run(main(arguments.users, arguments.database, arguments.batch_size))
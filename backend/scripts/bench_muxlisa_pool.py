@@ -0,0 +1,122 @@
+"""Benchmark Muxlisa calls with a client per call against the shared pooled client.
+
+Usage: python -m scripts.bench_muxlisa_pool [--calls 500] [--concurrency 1 20] [--tls]
+
+A stub TTS server runs in a child process and counts the TCP connections
+it accepts. The per-call variant opens an ``httpx.AsyncClient`` for every
+request, as ``MuxlisaClient`` used to; the pooled variant goes through
+``MuxlisaClient.synthesize`` and its shared client. Texts are unique so
+request coalescing does not hide any call. ``--tls`` serves HTTPS with a
+throwaway self-signed certificate (needs the ``openssl`` binary), which is
+where a fresh connection per call costs the most.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from app.services.muxlisa_service import MuxlisaClient
+
+
+def _serve(port: int, certificate: tuple[str, str] | None) -> None:
+  connections: set[tuple[str, int]] = set()
+
+  async def tts(request: Request) -> Response:
+    connections.add(tuple(request.scope["client"]))
+    return Response(b"ID3" + (await request.json())["text"].encode(), media_type="audio/mpeg")
+
+  async def opened(request: Request) -> JSONResponse:
+    count = len(connections)
+    connections.clear()
+    return JSONResponse({"connections": count})
+
+  app = Starlette(routes=[Route("/v2/tts", tts, methods=["POST"]), Route("/connections", opened)])
+  keyfile, certfile = certificate if certificate else (None, None)
+  uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", ssl_keyfile=keyfile, ssl_certfile=certfile)
+
+
+def _self_signed(directory: str) -> tuple[str, str]:
+  keyfile, certfile = os.path.join(directory, "key.pem"), os.path.join(directory, "cert.pem")
+  subprocess.run(
+      [
+          "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+          "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+          "-keyout", keyfile, "-out", certfile,
+      ],
+      check=True,
+      capture_output=True,
+  )
+  return keyfile, certfile
+
+
+async def _per_call(base_url: str, text: str) -> None:
+  async with httpx.AsyncClient(timeout=30.0) as client:
+    response = await client.post(f"{base_url}/v2/tts", json={"text": text, "voice": "maftuna", "language": "uz"})
+    response.raise_for_status()
+
+
+async def _run(label: str, call, calls: int, concurrency: int, base_url: str) -> None:
+  latencies: list[float] = []
+  slots = asyncio.Semaphore(concurrency)
+
+  async def one(index: int) -> None:
+    async with slots:
+      started = time.perf_counter()
+      await call(f"{label} {concurrency} {index}")
+      latencies.append((time.perf_counter() - started) * 1000)
+
+  started = time.perf_counter()
+  await asyncio.gather(*(one(index) for index in range(calls)))
+  elapsed = time.perf_counter() - started
+  async with httpx.AsyncClient() as client:
+    opened = (await client.get(f"{base_url}/connections")).json()["connections"]
+  latencies.sort()
+  print(
+      f"  {label:<9} p50 {statistics.median(latencies):6.2f} ms  p95 {latencies[int(len(latencies) * 0.95)]:6.2f} ms"
+      f"  {calls / elapsed:7.0f} calls/s  {opened:5d} connections"
+  )
+
+
+async def main(arguments: argparse.Namespace, base_url: str) -> None:
+  for concurrency in arguments.concurrency:
+    print(f"{arguments.calls} TTS calls, {concurrency} at a time, {base_url.split(':')[0].upper()}")
+    await _run("per-call", lambda text: _per_call(base_url, text), arguments.calls, concurrency, base_url)
+    muxlisa = MuxlisaClient(base_url=base_url, api_key="bench")
+    await muxlisa.initialize()
+    try:
+      await _run("pooled", lambda text: muxlisa.synthesize(text=text), arguments.calls, concurrency, base_url)
+    finally:
+      await muxlisa.close()
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--calls", type=int, default=500)
+  parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 20])
+  parser.add_argument("--tls", action="store_true", help="serve HTTPS with a self-signed certificate")
+  parser.add_argument("--port", type=int, default=8767)
+  arguments = parser.parse_args()
+  with tempfile.TemporaryDirectory() as directory:
+    certificate = _self_signed(directory) if arguments.tls else None
+    if certificate:
+      # httpx reads the trusted roots from SSL_CERT_FILE
+      os.environ["SSL_CERT_FILE"] = certificate[1]
+    server = multiprocessing.Process(target=_serve, args=(arguments.port, certificate), daemon=True)
+    server.start()
+    time.sleep(1.0)
+    scheme = "https" if certificate else "http"
+    try:
+      asyncio.run(main(arguments, f"{scheme}://127.0.0.1:{arguments.port}"))
+    finally:
+      server.terminate()
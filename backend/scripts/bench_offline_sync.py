@@ -0,0 +1,127 @@
+"""Benchmark offline attempt sync: one attempt at a time against one bulk request.
+
+Usage: python -m scripts.bench_offline_sync [--attempts 10000] [--users 30] [--lessons 50]
+
+The same queued attempts, spread over ``--users`` children and ``--lessons``
+lessons, are applied twice: attempt by attempt, storing each one and running
+``apply_attempt_outcome`` and the unlock step as ``/api/lessons/attempt``
+does, and as a single ``/api/sync/attempts`` request through
+``OfflineSyncService.ingest``. Both score transcripts with the phonetic
+scorer so only the database work differs. Each variant runs in a savepoint
+that is rolled back, and the whole run is rolled back at the end.
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from app.db.session import async_session_factory
+from app.models import LearningPath, Lesson, LessonAttempt, Module, User
+from app.schemas import OfflineLessonAttempt, OfflineSyncRequest
+from app.services import curriculum_cache, gamification_engine, offline_sync_service
+from app.services.attempt_service import PASS_SCORE
+from app.services.phonetic_scorer import PhoneticScorer
+from scripts.bench_session_start import _grow_module
+
+
+def _queued_attempts(user_ids: list, lesson_ids: list, count: int) -> list[OfflineLessonAttempt]:
+  started = datetime.utcnow() - timedelta(days=7)
+  attempts = []
+  for index in range(count):
+    lesson_index = random.randrange(len(lesson_ids))
+    transcript = f"So'z {lesson_index + 1}" if random.random() < 0.7 else "kitob"
+    attempts.append(
+        OfflineLessonAttempt(
+            client_id=uuid4(),
+            user_id=random.choice(user_ids),
+            lesson_id=lesson_ids[lesson_index],
+            transcript=transcript,
+            recorded_at=started + timedelta(seconds=index),
+        )
+    )
+  return attempts
+
+
+async def _one_by_one(session, attempts: list[OfflineLessonAttempt]) -> float:
+  scorer = PhoneticScorer()
+  started = time.perf_counter()
+  for item in attempts:
+    user = await session.get(User, item.user_id)
+    lesson = await session.get(Lesson, item.lesson_id, options=[selectinload(Lesson.module)])
+    evaluation = scorer.score(
+        transcript=item.transcript,
+        target_letter=lesson.target_letter,
+        example_words=lesson.example_words or [],
+    ).feedback()
+    attempt = LessonAttempt(
+        user_id=user.id,
+        lesson_id=lesson.id,
+        transcript=item.transcript,
+        evaluation=evaluation,
+        score=evaluation["score"],
+        is_correct=evaluation["score"] >= PASS_SCORE,
+        created_at=item.recorded_at,
+    )
+    session.add(attempt)
+    await session.flush()
+    if attempt.is_correct:
+      await gamification_engine.unlock_next_lessons(session, lesson.id, user.id)
+    await gamification_engine.apply_attempt_outcome(session, user, lesson, attempt)
+    await session.flush()
+  return time.perf_counter() - started
+
+
+async def _bulk(session, attempts: list[OfflineLessonAttempt]) -> float:
+  started = time.perf_counter()
+  response = await offline_sync_service.ingest(session, OfflineSyncRequest(lesson_attempts=attempts))
+  await session.flush()
+  elapsed = time.perf_counter() - started
+  assert response.accepted == len(attempts), response.accepted
+  return elapsed
+
+
+async def main(attempt_count: int, user_count: int, lesson_count: int) -> None:
+  async with async_session_factory() as session:
+    learning_path = LearningPath(key=f"bench-{uuid4().hex[:8]}", title="Bench", description="Benchmark path")
+    session.add(learning_path)
+    await session.flush()
+    module = Module(learning_path_id=learning_path.id, key="bench-module", title="Bench", order_index=0)
+    session.add(module)
+    await session.flush()
+    lesson_ids = await _grow_module(session, module, 0, lesson_count)
+    users = [User(first_name=f"Bench {index}", age=6) for index in range(user_count)]
+    session.add_all(users)
+    await session.flush()
+    user_ids = [user.id for user in users]
+    # bumped inside this transaction so the graph picks up the uncommitted lessons
+    await curriculum_cache.bump_version(session)
+    await curriculum_cache.rebuild(session)
+
+    attempts = _queued_attempts(user_ids, lesson_ids, attempt_count)
+    print(f"{attempt_count} queued attempts of {user_count} users over {lesson_count} lessons")
+    timings = []
+    for label, variant in (("one by one", _one_by_one), ("bulk", _bulk)):
+      savepoint = await session.begin_nested()
+      elapsed = await variant(session, attempts)
+      await savepoint.rollback()
+      session.expunge_all()
+      timings.append(elapsed)
+      print(f"  {label:<11} {elapsed:8.2f}s  {attempt_count / elapsed:9.0f} attempts/s")
+    print(f"  speedup     {timings[0] / timings[1]:8.1f}x")
+    stored = (await session.execute(select(LessonAttempt.id).where(LessonAttempt.lesson_id.in_(lesson_ids)))).first()
+    assert stored is None, "savepoints should have discarded every attempt"
+    await session.rollback()
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--attempts", type=int, default=10_000)
+  parser.add_argument("--users", type=int, default=30)
+  parser.add_argument("--lessons", type=int, default=50)
+  arguments = parser.parse_args()
+  asyncio.run(main(arguments.attempts, arguments.users, arguments.lessons))
@@ -0,0 +1,70 @@
+"""Benchmark the local phonetic scorer and how many attempts it resolves without the LLM.
+
+Usage: python -m scripts.bench_phonetic [--attempts 100000] [--accept 0.9] [--reject 0.35]
+
+Transcripts are generated from example words of typical alphabet lessons:
+exact, with common sound swaps (o/o‘, g/g‘, s/sh, k/q, h/x), with a random
+letter dropped, or an unrelated word. No database or API key is needed.
+"""
+import argparse
+import random
+import time
+
+from app.services.phonetic_scorer import PhoneticScorer
+
+LESSONS = [
+    ("A", ["Anor", "Olma", "Ari"]),
+    ("O‘", ["O‘rik", "O‘t", "O‘rdak"]),
+    ("G‘", ["G‘oz", "G‘isht", "Bog‘"]),
+    ("Sh", ["Shaftoli", "Osh", "Shox"]),
+    ("Ch", ["Choy", "Chumchuq", "Qalampir"]),
+    ("Ng", ["Tong", "Ming", "Qo‘ng‘iroq"]),
+    ("Q", ["Qovun", "Qush", "Qalam"]),
+    ("X", ["Xo‘roz", "Xat", "Xurmo"]),
+]
+SWAPS = [("o‘", "o"), ("g‘", "g"), ("sh", "s"), ("q", "k"), ("x", "h"), ("ch", "sh")]
+UNRELATED = ["kitob", "mushuk", "daraxt", "uy", "nima", "bilmadim"]
+
+
+def _transcript(words: list[str]) -> str:
+  word = random.choice(words)
+  kind = random.random()
+  if kind < 0.45:
+    return word
+  if kind < 0.7:
+    lowered = word.lower()
+    for source, replacement in random.sample(SWAPS, len(SWAPS)):
+      if source in lowered:
+        return lowered.replace(source, replacement, 1)
+    return lowered
+  if kind < 0.85 and len(word) > 2:
+    index = random.randrange(len(word))
+    return word[:index] + word[index + 1:]
+  return random.choice(UNRELATED)
+
+
+def main(attempts: int, accept: float, reject: float) -> None:
+  scorer = PhoneticScorer(accept_score=accept, reject_score=reject)
+  cases = []
+  for _ in range(attempts):
+    letter, words = random.choice(LESSONS)
+    cases.append((_transcript(words), letter, words))
+
+  started = time.perf_counter()
+  for transcript, letter, words in cases:
+    scorer.resolve(transcript=transcript, target_letter=letter, example_words=words)
+  elapsed = time.perf_counter() - started
+
+  metrics = scorer.metrics()
+  print(f"{attempts} attempts scored in {elapsed:.2f}s ({elapsed / attempts * 1_000_000:.1f} us/attempt)")
+  print(f"  accepted {metrics['accepted']}, rejected {metrics['rejected']}, sent to the LLM {metrics['ambiguous']} "
+        f"(resolved locally: {metrics['resolved_ratio']:.1%})")
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--attempts", type=int, default=100_000)
+  parser.add_argument("--accept", type=float, default=0.9)
+  parser.add_argument("--reject", type=float, default=0.35)
+  arguments = parser.parse_args()
+  main(arguments.attempts, arguments.accept, arguments.reject)
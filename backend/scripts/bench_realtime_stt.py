@@ -0,0 +1,112 @@
+"""Benchmark transcript latency after the child stops speaking: full-file STT against streamed STT.
+
+Usage: python -m scripts.bench_realtime_stt [--utterances 20] [--seconds 4] [--stt-factor 0.3]
+
+Each utterance is WAV audio arriving in 100 ms frames in real time, as from
+the realtime WebSocket. The full-file variant collects the frames and then
+calls ``MuxlisaClient.transcribe``, like an upload followed by STT; the
+streamed variant hands the frames to ``MuxlisaStreamingTranscriber`` as they
+arrive. A stub STT server in a child process spends ``stt-factor`` seconds
+per second of audio on each chunk as it receives it, like a recogniser
+decoding while the upload runs. Latency is measured from the last frame to
+the final transcript.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import statistics
+import struct
+import time
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.services.muxlisa_service import MuxlisaClient
+from app.services.streaming_stt import MuxlisaStreamingTranscriber
+
+SAMPLE_RATE = 16000
+BYTE_RATE = SAMPLE_RATE * 2
+FRAME = BYTE_RATE // 10
+
+
+def _serve(port: int, stt_factor: float) -> None:
+  async def stt(request: Request) -> JSONResponse:
+    async for chunk in request.stream():
+      # decoding keeps pace with the upload
+      await asyncio.sleep(len(chunk) / BYTE_RATE * stt_factor)
+    return JSONResponse({"text": "anor", "confidence": 0.9})
+
+  app = Starlette(routes=[Route("/v2/stt", stt, methods=["POST"])])
+  uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def _wav(seconds: float) -> bytes:
+  data_size = int(seconds * SAMPLE_RATE) * 2
+  header = (
+      b"RIFF" + struct.pack("<I", 36 + data_size) + b"WAVE"
+      + b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, SAMPLE_RATE, BYTE_RATE, 2, 16)
+      + b"data" + struct.pack("<I", data_size)
+  )
+  return header + bytes(data_size)
+
+
+async def _speaking(clip: bytes, ended: list[float]):
+  """Frames as the socket receives them: 100 ms of audio every 100 ms."""
+  for offset in range(0, len(clip), FRAME):
+    await asyncio.sleep(0.1)
+    yield clip[offset:offset + FRAME]
+  ended.append(time.perf_counter())
+
+
+async def _full_file(muxlisa: MuxlisaClient, clip: bytes) -> float:
+  ended: list[float] = []
+  audio = bytearray()
+  async for frame in _speaking(clip, ended):
+    audio += frame
+  await muxlisa.transcribe(audio_file=bytes(audio))
+  return time.perf_counter() - ended[0]
+
+
+async def _streamed(transcriber: MuxlisaStreamingTranscriber, clip: bytes) -> float:
+  ended: list[float] = []
+  async for event in transcriber.transcribe(_speaking(clip, ended), filename="audio.wav", content_type="audio/wav"):
+    if event.final:
+      break
+  return time.perf_counter() - ended[0]
+
+
+async def _measure(label: str, call, utterances: int) -> None:
+  latencies = sorted(1000 * latency for latency in await asyncio.gather(*(call() for _ in range(utterances))))
+  print(f"  {label:<9} after speech p50 {statistics.median(latencies):7.1f} ms  p95 {latencies[int(len(latencies) * 0.95)]:7.1f} ms")
+
+
+async def main(arguments: argparse.Namespace) -> None:
+  clip = _wav(arguments.seconds)
+  muxlisa = MuxlisaClient(base_url=f"http://127.0.0.1:{arguments.port}", api_key="bench")
+  await muxlisa.initialize()
+  transcriber = MuxlisaStreamingTranscriber(muxlisa)
+  print(f"{arguments.utterances} concurrent utterances of {arguments.seconds:g}s, STT at {arguments.stt_factor:g}x real time")
+  try:
+    await _measure("full-file", lambda: _full_file(muxlisa, clip), arguments.utterances)
+    await _measure("streamed", lambda: _streamed(transcriber, clip), arguments.utterances)
+  finally:
+    await muxlisa.close()
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--utterances", type=int, default=20)
+  parser.add_argument("--seconds", type=float, default=4.0)
+  parser.add_argument("--stt-factor", type=float, default=0.3, help="STT seconds per second of audio")
+  parser.add_argument("--port", type=int, default=8769)
+  arguments = parser.parse_args()
+  server = multiprocessing.Process(target=_serve, args=(arguments.port, arguments.stt_factor), daemon=True)
+  server.start()
+  time.sleep(1.0)
+  try:
+    asyncio.run(main(arguments))
+  finally:
+    server.terminate()
@@ -0,0 +1,99 @@
+"""Benchmark `/api/sessions/start` lesson resolution as the alphabet module grows.
+
+Usage: python -m scripts.bench_session_start [--sizes 1000 10000 100000] [--repeat 50]
+
+Everything is created inside one transaction that is rolled back at the end,
+so the benchmark can be pointed at a development database safely.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from uuid import uuid4
+
+from sqlalchemy import insert
+
+from app.db.session import async_session_factory
+from app.models import LearningPath, Lesson, Module, User, UserProgress
+from app.services import learning_service
+
+
+async def _grow_module(session, module: Module, start: int, stop: int) -> list:
+  rows = [
+      {
+          "id": uuid4(),
+          "module_id": module.id,
+          "key": f"bench-lesson-{index:06d}",
+          "title": f"Bench dars #{index + 1}",
+          "lesson_type": "letter_practice",
+          "difficulty": "beginner",
+          "order_index": index,
+          "xp_reward": 5,
+          "media_assets": {"generated": True},
+          "example_words": [f"So'z {index + 1}"],
+          "example_image_urls": [],
+          "extra_metadata": {"generated": True},
+      }
+      for index in range(start, stop)
+  ]
+  for offset in range(0, len(rows), 5000):
+    await session.execute(insert(Lesson), rows[offset:offset + 5000])
+  return [row["id"] for row in rows]
+
+
+async def _time_next_lesson(session, user_id, path_key: str, repeat: int) -> list[float]:
+  samples: list[float] = []
+  for _ in range(repeat):
+    started = time.perf_counter()
+    await learning_service.get_next_lesson(session, user_id=user_id, learning_path_key=path_key, resume=True)
+    samples.append((time.perf_counter() - started) * 1000)
+  return samples
+
+
+async def main(sizes: list[int], repeat: int, completed: int) -> None:
+  async with async_session_factory() as session:
+    path_key = f"bench-{uuid4().hex[:8]}"
+    learning_path = LearningPath(key=path_key, title="Bench", description="Benchmark path")
+    session.add(learning_path)
+    await session.flush()
+    module = Module(learning_path_id=learning_path.id, key="bench-module", title="Bench", order_index=0)
+    fresh_user = User(first_name="Fresh", age=6)
+    deep_user = User(first_name="Deep", age=6)
+    session.add_all([module, fresh_user, deep_user])
+    await session.flush()
+
+    lesson_ids: list = []
+    print(f"{'lessons':>10} {'user':>6} {'p50 ms':>8} {'p95 ms':>8}")
+    for size in sorted(sizes):
+      new_ids = await _grow_module(session, module, len(lesson_ids), size)
+      if len(lesson_ids) < completed:
+        await session.execute(
+            insert(UserProgress),
+            [
+                {
+                    "user_id": deep_user.id,
+                    "learning_path_id": learning_path.id,
+                    "module_id": module.id,
+                    "lesson_id": lesson_id,
+                    "status": "completed",
+                }
+                for lesson_id in new_ids[:completed - len(lesson_ids)]
+            ],
+        )
+      lesson_ids.extend(new_ids)
+      session.expunge_all()
+      for label, user_id in (("fresh", fresh_user.id), ("deep", deep_user.id)):
+        samples = sorted(await _time_next_lesson(session, user_id, path_key, repeat))
+        p95 = samples[max(0, int(len(samples) * 0.95) - 1)]
+        print(f"{size:>10} {label:>6} {statistics.median(samples):>8.2f} {p95:>8.2f}")
+
+    await session.rollback()
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+  parser.add_argument("--repeat", type=int, default=50)
+  parser.add_argument("--completed", type=int, default=500, help="lessons already completed by the 'deep' user")
+  arguments = parser.parse_args()
+  asyncio.run(main(arguments.sizes, arguments.repeat, arguments.completed))
@@ -0,0 +1,115 @@
+"""Benchmark time to first audio of buffered base64 TTS against the streaming relay.
+
+Usage: python -m scripts.bench_tts_stream [--requests 50] [--clip-kib 480] [--synthesis-seconds 1.5]
+
+A stub TTS server runs in a child process and sends each clip in 16 KiB
+chunks spread over ``synthesis-seconds``, the way a synthesiser produces
+audio. The buffered variant waits for the whole clip and wraps it in a
+base64 JSON body, as ``synthesize`` used to answer; the streamed variant
+relays chunks through ``SpeechService.stream`` into a throwaway cache
+directory. Texts are unique so every request reaches the stub.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import multiprocessing
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+from starlette.routing import Route
+
+from app.services.audio_cache import AudioCache
+from app.services.muxlisa_service import MuxlisaClient
+from app.services.speech_service import SpeechService
+
+CHUNK = 16 * 1024
+
+
+def _serve(port: int, clip_bytes: int, synthesis_seconds: float) -> None:
+  chunks = max(clip_bytes // CHUNK, 1)
+
+  async def tts(request: Request) -> StreamingResponse:
+    await request.body()
+
+    async def audio():
+      yield b"ID3" + bytes(CHUNK - 3)
+      for _ in range(chunks - 1):
+        await asyncio.sleep(synthesis_seconds / chunks)
+        yield bytes(CHUNK)
+
+    return StreamingResponse(audio(), media_type="audio/mpeg")
+
+  app = Starlette(routes=[Route("/v2/tts", tts, methods=["POST"])])
+  uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+async def _buffered(muxlisa: MuxlisaClient, text: str) -> tuple[float, float]:
+  started = time.perf_counter()
+  audio = await muxlisa.synthesize(text=text)
+  json.dumps({"audio_base64": base64.b64encode(audio).decode(), "text": text}).encode()
+  # nothing is playable before the whole body has been produced
+  elapsed = time.perf_counter() - started
+  return elapsed, elapsed
+
+
+async def _streamed(speech: SpeechService, text: str) -> tuple[float, float]:
+  started = time.perf_counter()
+  _, chunks = await speech.stream(text=text)
+  first = None
+  async for _ in chunks:
+    if first is None:
+      first = time.perf_counter() - started
+  return first, time.perf_counter() - started
+
+
+async def _measure(label: str, call, requests: int) -> None:
+  tracemalloc.start()
+  timings = await asyncio.gather(*(call(f"{label} {index}") for index in range(requests)))
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  first = sorted(timing[0] * 1000 for timing in timings)
+  last = sorted(timing[1] * 1000 for timing in timings)
+  print(
+      f"  {label:<9} first audio p50 {statistics.median(first):7.1f} ms  p95 {first[int(len(first) * 0.95)]:7.1f} ms"
+      f"  complete p50 {statistics.median(last):7.1f} ms  peak {peak / 2**20:6.1f} MiB"
+  )
+
+
+async def main(arguments: argparse.Namespace) -> None:
+  muxlisa = MuxlisaClient(base_url=f"http://127.0.0.1:{arguments.port}", api_key="bench")
+  await muxlisa.initialize()
+  print(f"{arguments.requests} concurrent clips of {arguments.clip_kib} KiB synthesised over {arguments.synthesis_seconds:g}s")
+  try:
+    with tempfile.TemporaryDirectory() as directory:
+      cache = AudioCache(directory, memory_bytes=0, disk_bytes=2**30)
+      await cache.initialize()
+      speech = SpeechService(muxlisa, cache)
+      await _measure("buffered", lambda text: _buffered(muxlisa, text), arguments.requests)
+      await _measure("streamed", lambda text: _streamed(speech, text), arguments.requests)
+  finally:
+    await muxlisa.close()
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--requests", type=int, default=50)
+  parser.add_argument("--clip-kib", type=int, default=480)
+  parser.add_argument("--synthesis-seconds", type=float, default=1.5)
+  parser.add_argument("--port", type=int, default=8768)
+  arguments = parser.parse_args()
+  server = multiprocessing.Process(
+      target=_serve, args=(arguments.port, arguments.clip_kib * 1024, arguments.synthesis_seconds), daemon=True
+  )
+  server.start()
+  time.sleep(1.0)
+  try:
+    asyncio.run(main(arguments))
+  finally:
+    server.terminate()
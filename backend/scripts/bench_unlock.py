@@ -0,0 +1,115 @@
+"""Benchmark correct-attempt throughput with the full-scan and the neighbour-only unlock.
+
+Usage: python -m scripts.bench_unlock [--sizes 1000 10000 100000] [--attempts 200]
+
+For every module size a user completes ``--attempts`` lessons in order; each
+attempt runs ``apply_attempt_outcome`` and the unlock step, as
+``/api/lessons/attempt`` does. The legacy unlock, which loaded every lesson of
+the module and every completed lesson of the user, is kept inline below for
+comparison. Everything runs in one transaction that is rolled back at the end.
+"""
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+
+from sqlalchemy import and_, select
+from sqlalchemy.orm import selectinload
+
+from app.db.session import async_session_factory
+from app.models import LearningPath, Lesson, LessonAttempt, Module, User, UserProgress
+from app.services import curriculum_cache, gamification_engine
+from scripts.bench_session_start import _grow_module
+
+
+async def _legacy_unlock(session, module: Module, user_id) -> list[str]:
+  lessons = (
+      await session.execute(select(Lesson).where(Lesson.module_id == module.id).order_by(Lesson.order_index))
+  ).scalars().all()
+  completed_ids = set(
+      (
+          await session.execute(
+              select(UserProgress.lesson_id).where(
+                  and_(UserProgress.user_id == user_id, UserProgress.status == "completed"),
+              )
+          )
+      ).scalars()
+  )
+  for idx, lesson in enumerate(lessons):
+    if lesson.id in completed_ids:
+      continue
+    if idx == 0 or lessons[idx - 1].id in completed_ids:
+      progress = (
+          await session.execute(
+              select(UserProgress).where(
+                  and_(UserProgress.user_id == user_id, UserProgress.lesson_id == lesson.id),
+              )
+          )
+      ).scalar_one_or_none()
+      if progress is None:
+        progress = UserProgress(
+            user_id=user_id,
+            learning_path_id=module.learning_path_id,
+            module_id=module.id,
+            lesson_id=lesson.id,
+            status="available",
+        )
+      else:
+        progress.status = "available"
+      session.add(progress)
+      return [lesson.key]
+    break
+  return []
+
+
+async def _run_attempts(session, user: User, lesson_ids: list, legacy: bool) -> float:
+  started = time.perf_counter()
+  for lesson_id in lesson_ids:
+    lesson = await session.get(Lesson, lesson_id, options=[selectinload(Lesson.module)])
+    attempt = LessonAttempt(user_id=user.id, lesson_id=lesson.id, is_correct=True, score=1.0, evaluation={})
+    session.add(attempt)
+    await session.flush()
+    await gamification_engine.apply_attempt_outcome(session, user, lesson, attempt)
+    if legacy:
+      await _legacy_unlock(session, lesson.module, user.id)
+    else:
+      await gamification_engine.unlock_next_lessons(session, lesson.id, user.id)
+    await session.flush()
+  return len(lesson_ids) / (time.perf_counter() - started)
+
+
+async def main(sizes: list[int], attempts: int) -> None:
+  async with async_session_factory() as session:
+    learning_path = LearningPath(key=f"bench-{uuid4().hex[:8]}", title="Bench", description="Benchmark path")
+    session.add(learning_path)
+    await session.flush()
+    module = Module(learning_path_id=learning_path.id, key="bench-module", title="Bench", order_index=0)
+    session.add(module)
+    await session.flush()
+
+    lesson_ids: list = []
+    print(f"{'lessons':>10} {'legacy/s':>10} {'neighbour/s':>12} {'speedup':>8}")
+    for size in sorted(sizes):
+      lesson_ids.extend(await _grow_module(session, module, len(lesson_ids), size))
+      # bumped inside this transaction so the graph picks up the uncommitted lessons
+      await curriculum_cache.bump_version(session)
+      await curriculum_cache.rebuild(session)
+      targets = lesson_ids[:min(attempts, size)]
+      rates: list[float] = []
+      for legacy in (True, False):
+        user = User(first_name="Bench", age=6)
+        session.add(user)
+        await session.flush()
+        rates.append(await _run_attempts(session, user, targets, legacy))
+        session.expunge_all()
+      print(f"{size:>10} {rates[0]:>10.1f} {rates[1]:>12.1f} {rates[1] / rates[0]:>7.1f}x")
+
+    await session.rollback()
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+  parser.add_argument("--attempts", type=int, default=200, help="correct attempts per variant and size")
+  arguments = parser.parse_args()
+  asyncio.run(main(arguments.sizes, arguments.attempts))
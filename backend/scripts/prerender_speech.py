@@ -0,0 +1,51 @@
+"""Render the speech of every lesson into the TTS cache ahead of time.
+
+Usage: python -m scripts.prerender_speech [--restart] [--concurrency 8] [--batch-size 200]
+
+Lessons whose title and example words did not change since their last render
+are skipped. An interrupted run continues from its checkpoint unless
+--restart is given.
+"""
+import argparse
+import asyncio
+
+from app.core.config import settings
+from app.db.session import async_session_factory
+from app.schemas import SpeechPrerenderStatus
+from app.services import audio_cache, muxlisa_client, speech_service
+from app.services.prerender_service import SpeechPrerenderService
+
+
+def report(status: SpeechPrerenderStatus) -> None:
+  print(
+      f"  {status.scanned:>8} lessons scanned, {status.rendered:>8} rendered,"
+      f" {status.skipped:>8} unchanged, {status.failed:>6} failed",
+      flush=True,
+  )
+
+
+async def render(*, resume: bool, concurrency: int, batch_size: int) -> SpeechPrerenderStatus:
+  prerender = SpeechPrerenderService(
+      speech_service,
+      async_session_factory,
+      concurrency=concurrency,
+      batch_size=batch_size,
+      checkpoint_path=settings.tts_prerender_checkpoint,
+  )
+  await audio_cache.initialize()
+  try:
+    async with async_session_factory() as session:
+      status = await prerender.run(session, resume=resume, progress=report)
+  finally:
+    await muxlisa_client.close()
+  print(f"done: {status.rendered} lessons rendered, {status.failed} failed, {status.phrases} feedback phrases cached")
+  return status
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--restart", action="store_true", help="ignore the checkpoint of an interrupted run")
+  parser.add_argument("--concurrency", type=int, default=settings.tts_prerender_concurrency)
+  parser.add_argument("--batch-size", type=int, default=settings.tts_prerender_batch_size)
+  arguments = parser.parse_args()
+  asyncio.run(render(resume=not arguments.restart, concurrency=arguments.concurrency, batch_size=arguments.batch_size))
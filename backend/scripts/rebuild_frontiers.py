@@ -0,0 +1,35 @@
+"""Backfill or repair lesson frontiers from recorded user progress.
+
+Usage: python -m scripts.rebuild_frontiers [--path alphabet] [--user <uuid>] [--batch-size 500]
+"""
+import argparse
+import asyncio
+from uuid import UUID
+
+from app.core.logging import logger
+from app.db.session import async_session_factory
+from app.services import frontier_service, learning_service
+
+
+async def main(path_key: str | None, user_id: UUID | None, batch_size: int) -> None:
+  async with async_session_factory() as session:
+    learning_path_id = None
+    if path_key:
+      learning_path_id = (await learning_service.get_learning_path(session, path_key)).id
+    pairs = await frontier_service.tracked_pairs(session, learning_path_id=learning_path_id, user_id=user_id)
+    logger.info("Rebuilding %s lesson frontiers...", len(pairs))
+
+    for offset in range(0, len(pairs), batch_size):
+      for pair_user_id, pair_path_id in pairs[offset:offset + batch_size]:
+        await frontier_service.rebuild(session, user_id=pair_user_id, learning_path_id=pair_path_id)
+      await session.commit()
+      logger.info("Rebuilt %s/%s frontiers.", min(offset + batch_size, len(pairs)), len(pairs))
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--path", dest="path_key", help="only rebuild frontiers of this learning path key")
+  parser.add_argument("--user", dest="user_id", type=UUID, help="only rebuild frontiers of this user")
+  parser.add_argument("--batch-size", type=int, default=500)
+  arguments = parser.parse_args()
+  asyncio.run(main(arguments.path_key, arguments.user_id, arguments.batch_size))
@@ -0,0 +1,28 @@
+"""Rebuild the XP leaderboards from users and user_progress.
+
+Usage: python -m scripts.rebuild_leaderboards [--batch-size 10000]
+
+With REDIS_URL set the rebuilt boards replace the shared sorted sets; without
+it the in-process boards of the API workers rebuild themselves on first read,
+so this only reports what they would contain.
+"""
+import argparse
+import asyncio
+
+from app.db.session import async_session_factory
+from app.services import leaderboard_service
+
+
+async def main(batch_size: int) -> None:
+  async with async_session_factory() as session:
+    counts = await leaderboard_service.rebuild(session, batch_size=batch_size)
+  for board, entries in sorted(counts.items()):
+    print(f"{board:<50} {entries:>10}")
+  await leaderboard_service.close()
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--batch-size", type=int, default=10_000)
+  arguments = parser.parse_args()
+  asyncio.run(main(arguments.batch_size))
@@ -0,0 +1,35 @@
+"""Recompute every user's stored level, optionally after changing the XP thresholds.
+
+Usage: python -m scripts.recompute_levels [--thresholds 0 40 120 ...] [--batch-size 5000]
+
+--thresholds are stored in the database, so the API workers pick them up too,
+within XP_THRESHOLDS_CHECK_SECONDS.
+"""
+import argparse
+import asyncio
+
+from app.core.config import settings
+from app.db.session import async_session_factory
+from app.services import gamification_engine
+
+
+async def main(thresholds: list[int] | None, batch_size: int) -> None:
+  async with async_session_factory() as session:
+    if thresholds:
+      await gamification_engine.store_thresholds(session, thresholds)
+      await session.commit()
+    print(f"thresholds: {list(await gamification_engine.load_thresholds(session, force=True))}")
+    scanned, updated = await gamification_engine.recompute_levels(
+        session,
+        batch_size=batch_size,
+        progress=lambda scanned, updated: print(f"  {scanned:>10} users scanned, {updated:>10} updated", flush=True),
+    )
+  print(f"done: {scanned} users scanned, {updated} levels changed")
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--thresholds", type=int, nargs="+")
+  parser.add_argument("--batch-size", type=int, default=settings.level_recompute_batch_size)
+  arguments = parser.parse_args()
+  asyncio.run(main(arguments.thresholds, arguments.batch_size))
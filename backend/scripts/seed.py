@@ -1,16 +1,30 @@
+"""Seed the baseline learning content, then render its speech into the TTS cache.
+
+Usage: python -m scripts.seed [--skip-speech]
+"""
+import argparse
 import asyncio
 
+from app.core.config import settings
 from app.db.seed import seed_initial_data
 from app.db.session import async_session_factory
+from scripts.prerender_speech import render
 
 
-async def main() -> None:
+async def main(skip_speech: bool) -> None:
   async with async_session_factory() as session:
     await seed_initial_data(session)
     await session.commit()
+  if not skip_speech:
+    await render(
+        resume=True,
+        concurrency=settings.tts_prerender_concurrency,
+        batch_size=settings.tts_prerender_batch_size,
+    )
 
 
 if __name__ == "__main__":
-  asyncio.run(main())
-
-
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--skip-speech", action="store_true", help="do not pre-render lesson speech")
+  arguments = parser.parse_args()
+  asyncio.run(main(arguments.skip_speech))